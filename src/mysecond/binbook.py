@@ -0,0 +1,208 @@
+"""Compact binary opening books for featured players.
+
+The JSON books written by :func:`mysecond.bot_trainer.train_bot` map every
+position to its moves, so using them means loading the whole file.  A binary
+book holds the same data as fixed-size records sorted by position key, so a
+lookup is a binary search over a memory-mapped file and only touches the few
+pages it needs.
+
+Format
+------
+The file is a standard Polyglot book: 16-byte big-endian records of
+``(key u64, move u16, weight u16, learn u32)`` sorted by key, where *key* is
+the Polyglot Zobrist hash of the position.  *weight* is the move's game count
+capped at 65535 (so other Polyglot tools rank moves sensibly) and *learn*
+holds the uncapped count, which is what :class:`BinaryBook` reports.
+
+Positions are hashed from the normalised FEN used as cache key throughout the
+project (en-passant dropped), so lookups must normalise the same way —
+:meth:`BinaryBook.moves` does this.
+
+Curated Polyglot books from other tools can drive the theory walk too:
+:class:`PolyglotExplorer` answers explorer lookups from any ``.bin`` book.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+import chess
+import chess.polyglot
+
+from .models import ExplorerData, MoveStats
+
+_RECORD = struct.Struct(">QHHI")
+
+_PROMOTION_CODES = {
+    None: 0,
+    chess.KNIGHT: 1,
+    chess.BISHOP: 2,
+    chess.ROOK: 3,
+    chess.QUEEN: 4,
+}
+
+
+def _norm_board(fen: str) -> chess.Board:
+    """Return a board for *fen* with the en-passant square dropped."""
+    parts = fen.split(" ")
+    return chess.Board(" ".join(parts[:3]) + " - 0 1")
+
+
+def _encode_move(board: chess.Board, move: chess.Move) -> int:
+    to_square = move.to_square
+    if board.is_castling(move):
+        # Polyglot encodes castling as the king capturing its own rook.
+        rook_file = 7 if chess.square_file(to_square) > chess.square_file(move.from_square) else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    return to_square | (move.from_square << 6) | (_PROMOTION_CODES[move.promotion] << 12)
+
+
+def write_binary_book(
+    path: Path,
+    positions: dict[str, list[dict[str, Any]]],
+) -> int:
+    """Write *positions* (``{fen: [{"uci", "games"}, ...]}``) as a binary book.
+
+    Moves that are illegal in their position are skipped.  The file is
+    written to a temporary name and renamed into place, so readers never see
+    a partial book.
+
+    Returns the number of records written.
+    """
+    records: list[tuple[int, int, int, int]] = []
+    for fen, moves in positions.items():
+        try:
+            board = _norm_board(fen)
+        except ValueError:
+            continue
+        key = chess.polyglot.zobrist_hash(board)
+        for m in moves:
+            try:
+                move = chess.Move.from_uci(m["uci"])
+            except (KeyError, ValueError):
+                continue
+            if not board.is_legal(move):
+                continue
+            games = int(m.get("games", 0))
+            records.append((
+                key,
+                _encode_move(board, move),
+                min(games, 0xFFFF),
+                min(games, 0xFFFFFFFF),
+            ))
+    # Polyglot order: by key, most-played move first within a position.
+    records.sort(key=lambda r: (r[0], -r[3]))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as fh:
+        for record in records:
+            fh.write(_RECORD.pack(*record))
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+def binary_book_path(json_path: Path) -> Path:
+    """Return the binary book path that accompanies a JSON book."""
+    return json_path.with_suffix(".bin")
+
+
+def ensure_binary_book(json_path: Path) -> Path:
+    """Return the binary book for *json_path*, (re)building it if it is stale.
+
+    Books exported before binary books existed are converted on first use.
+    """
+    bin_path = binary_book_path(json_path)
+    if not bin_path.exists() or bin_path.stat().st_mtime < json_path.stat().st_mtime:
+        with open(json_path, encoding="utf-8") as fh:
+            positions = json.load(fh).get("positions", {})
+        write_binary_book(bin_path, positions)
+    return bin_path
+
+
+class BinaryBook:
+    """Read-only, memory-mapped view of a binary book.
+
+    Safe to share between threads: lookups only read the mapping.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._reader = chess.polyglot.MemoryMappedReader(str(path))
+
+    def __len__(self) -> int:
+        return len(self._reader)
+
+    def moves(self, fen: str) -> list[dict[str, Any]]:
+        """Return ``[{"uci", "games"}, ...]`` for *fen*, most-played first."""
+        try:
+            board = _norm_board(fen)
+        except ValueError:
+            return []
+        return [
+            {"uci": entry.move.uci(), "games": entry.learn}
+            for entry in self._reader.find_all(board, minimum_weight=0)
+        ]
+
+    def close(self) -> None:
+        self._reader.close()
+
+    def __enter__(self) -> "BinaryBook":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+
+class PolyglotExplorer:
+    """Drop-in replacement for :class:`~mysecond.explorer.LichessExplorer`
+    backed by a Polyglot book (``SearchConfig.polyglot_book``).
+
+    Lookups are a binary search over the memory-mapped book and never touch
+    the network or the cache.  Polyglot books carry a weight per move rather
+    than results, so each move is reported as that many drawn games — its
+    *learn* value when set (books written by :func:`write_binary_book`
+    store the real game count there), otherwise its *weight*.  Positions
+    missing from the book are reported with zero games, which the walk
+    treats as out of book.
+    """
+
+    def __init__(self, path: Path) -> None:
+        if not path.exists():
+            raise FileNotFoundError(f"Polyglot book not found: {path}")
+        self.path = path
+        self._reader = chess.polyglot.MemoryMappedReader(str(path))
+
+    def get_data(self, fen: str) -> ExplorerData:
+        """Return the book moves for *fen* as explorer data."""
+        board = chess.Board(fen)
+        entries = list(self._reader.find_all(board, minimum_weight=0))
+        if not entries and board.ep_square is not None:
+            # Books built from normalised FENs hash without the e.p. square.
+            entries = list(self._reader.find_all(_norm_board(fen), minimum_weight=0))
+        counts: dict[str, int] = {}
+        for entry in entries:
+            uci = entry.move.uci()
+            counts[uci] = counts.get(uci, 0) + (entry.learn or entry.weight)
+        moves = [
+            MoveStats(uci=uci, white=0, draws=games, black=0)
+            for uci, games in counts.items()
+        ]
+        return ExplorerData(white=0, draws=sum(counts.values()), black=0, moves=moves)
+
+    def prefetch(self, fens: Iterable[str]) -> None:
+        """No-op: lookups are local."""
+
+    def close(self) -> None:
+        self._reader.close()
+
+    def __enter__(self) -> "PolyglotExplorer":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
@@ -26,6 +26,8 @@ from pathlib import Path
 import chess
 import requests
 
+from . import netmode, ratelimit
+from .binbook import binary_book_path, write_binary_book
 from .cache import Cache
 from .eval_cache import EvalCache
 from .fetcher import _backend_key, fetch_player_games, fetch_player_games_chesscom
@@ -94,11 +96,11 @@ def train_bot(
     def _emit(scaled_n: int) -> None:
         print(f"[progress:train-bot] {scaled_n}/{total_scaled}", flush=True)
 
-    def _stage_progress_fn(stage_idx: int):
+    def _stage_progress_fn(stage_idx: int, span: int = 1):
         """Return a callback that maps sub-step (n, total) into the global scale."""
         base = stage_idx * SCALE
         def fn(n: int, total: int) -> None:
-            sub = round(n / total * SCALE) if total > 0 else SCALE
+            sub = round(n / total * SCALE * span) if total > 0 else SCALE * span
             _emit(base + sub)
         return fn
 
@@ -106,9 +108,12 @@ def train_bot(
     _emit(0)
 
     # ------------------------------------------------------------------
-    # Step 1: Fetch games for each color.
+    # Step 1: Fetch games for each color — both books from one download
+    # when training both sides.
     # ------------------------------------------------------------------
-    for color in colors:
+    fetch_colors = ["both"] if set(colors) == {"white", "black"} else list(colors)
+    for color in fetch_colors:
+        span = 2 if color == "both" else 1
         if verbose:
             print(
                 f"{tag} Fetching {color} games from {opponent_platform} ({speeds}) …",
@@ -122,7 +127,7 @@ def train_bot(
                 speeds=speeds,
                 verbose=verbose,
                 show_progress=False,
-                progress_fn=_stage_progress_fn(stage),
+                progress_fn=_stage_progress_fn(stage, span),
             )
         else:
             fetch_player_games(
@@ -132,7 +137,7 @@ def train_bot(
                 speeds=speeds,
                 verbose=verbose,
             )
-        stage += 1
+        stage += span
         _emit(stage * SCALE)
 
     # ------------------------------------------------------------------
@@ -202,14 +207,15 @@ def train_bot(
     out_path.write_text(json.dumps(model, indent=2), encoding="utf-8")
 
     # ------------------------------------------------------------------
-    # Step 5 (optional): Export slim opening-book JSON files.
+    # Step 5 (optional): Export slim opening-book JSON + binary files.
     # ------------------------------------------------------------------
     for color in colors:
         book_out = white_book_out if color == "white" else black_book_out
         if book_out is None:
             continue
         backend = _backend_key(opponent_username, color, speeds, platform=opponent_platform)
-        entries = cache.scan_backend(backend)
+        # A move needs >= 3 games to be exported, so its position must too.
+        entries = cache.iter_backend(backend, min_games=3, skip_meta=True)
         positions: dict = {}
         for fen, payload in entries:
             moves = [
@@ -224,9 +230,11 @@ def train_bot(
             json.dumps({"positions": positions}, separators=(",", ":")),
             encoding="utf-8",
         )
+        # Memory-mapped copy for per-position lookups by the web server.
+        records = write_binary_book(binary_book_path(book_out), positions)
         if verbose:
             print(f"{tag} Opening book ({color}) written to {book_out} "
-                  f"({len(positions)} positions)", flush=True)
+                  f"({len(positions)} positions, {records} binary records)", flush=True)
 
     stage += 1
     _emit(stage * SCALE)
@@ -247,8 +255,7 @@ def train_bot(
         start_norm = " ".join(chess.STARTING_FEN.split()[:3]) + " -"
         for color in colors:
             backend = _backend_key(opponent_username, color, speeds, platform=opponent_platform)
-            entries = cache.scan_backend(backend)
-            cache_index: dict = {fen: payload for fen, payload in entries}
+            cache_index: dict = dict(cache.iter_backend(backend, skip_meta=True))
             cache_indices[color] = cache_index
             profile_style = _compute_style_profile(cache_index, color)
 
@@ -387,17 +394,21 @@ def _fetch_avatar_url(username: str, platform: str) -> str | None:
     headers = {"User-Agent": "mysecond/0.1.0"}
     try:
         if platform in ("chesscom", "chess.com"):
-            resp = requests.get(
+            ratelimit.acquire("chesscom")
+            resp = netmode.get(
                 f"https://api.chess.com/pub/player/{username.lower()}",
                 headers=headers, timeout=5,
             )
+            ratelimit.record_response("chesscom", resp)
             if resp.status_code == 200:
                 return resp.json().get("avatar")
         elif platform == "lichess":
-            resp = requests.get(
+            ratelimit.acquire("lichess-api")
+            resp = netmode.get(
                 f"https://lichess.org/api/user/{username.lower()}",
                 headers=headers, timeout=5,
             )
+            ratelimit.record_response("lichess-api", resp)
             if resp.status_code == 200:
                 return resp.json().get("profile", {}).get("imageUrl")
     except Exception:
@@ -415,11 +426,13 @@ def _fetch_elo(username: str, platform: str, speeds: str) -> int | None:
     headers = {"User-Agent": "mysecond/0.1.0"}
     try:
         if platform == "lichess":
-            resp = requests.get(
+            ratelimit.acquire("lichess-api")
+            resp = netmode.get(
                 _LICHESS_USER_URL.format(username=username),
                 headers=headers,
                 timeout=10,
             )
+            ratelimit.record_response("lichess-api", resp)
             if resp.status_code != 200:
                 return None
             data = resp.json()
@@ -437,11 +450,13 @@ def _fetch_elo(username: str, platform: str, speeds: str) -> int | None:
                         ratings = [r]
                         break
         else:
-            resp = requests.get(
+            ratelimit.acquire("chesscom")
+            resp = netmode.get(
                 _CHESSCOM_STATS_URL.format(username=username),
                 headers=headers,
                 timeout=10,
             )
+            ratelimit.record_response("chesscom", resp)
             if resp.status_code != 200:
                 return None
             data = resp.json()
@@ -1,13 +1,69 @@
-"""SQLite-backed cache for opening-explorer API responses."""
+"""SQLite-backed cache for opening-explorer API responses.
+
+Storage layout
+--------------
+Shared responses (e.g. the Lichess masters explorer) live in one
+``explorer_cache`` table inside the main database file.  Player opening books
+(backends named ``{platform}_player_…``, see
+:func:`mysecond.fetcher._backend_key`) are instead stored one backend per
+*shard* file under ``<db stem>-shards/`` next to the main database:
+
+* scanning one player's book reads only that player's shard, and
+* fetches for different players write to different files, so they never wait
+  on each other's write lock.
+
+New shards store each position as a JSON payload.  With
+``MYSECOND_BOOK_LAYOUT=relational`` (or ``Cache(book_layout="relational")``)
+they are instead created as normalised ``positions`` / ``moves`` tables:
+incremental fetches then merge counts with SQL upserts, and ``min_games``
+filters read plain columns.  Reads return the same explorer-shaped dicts
+either way, and an existing shard always keeps the layout it was created with.
+
+Rows a player backend still has in the main table (written before sharding)
+are moved into its shard the first time the shard is opened.
+
+Speed partitions
+----------------
+A player's book is stored per speed: ``lichess_player_alice_white_blitz``
+and ``…_rapid`` are separate backends.  Reading a backend whose speed part
+lists several speeds (``…_white_blitz,rapid``) adds the entries of its
+partitions together (see :func:`speed_partitions`), so any combination of
+indexed speeds is answered without indexing it again.  Games imported from
+PGN files live in partitions of their own (``…_white_blitz:import``, see
+:data:`IMPORTED_SUFFIX`) that are added in the same way, so a later fetch
+never shadows them.  A book stored under a combined backend before
+partitioning is read, whole, only while none of its partitions has entries;
+it is never mixed with them position by position.
+
+Shards that have not been written for a while can be gzip-compressed with
+:func:`compress_cold_shards`; a compressed shard is decompressed on demand the
+next time its backend is accessed.  A :class:`Cache` holds a shared lock on
+each shard it has open (``<shard>.lock``, POSIX only), and shards locked by
+any process are left alone.
+"""
 
 from __future__ import annotations
 
+import gzip
+import hashlib
+import heapq
 import json
+import os
+import re
+import shutil
 import sqlite3
 import threading
 import time
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Callable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: shards are not locked
+    fcntl = None  # type: ignore[assignment]
 
 
 def _norm_fen(fen: str) -> str:
@@ -23,90 +79,1109 @@ def _norm_fen(fen: str) -> str:
     return " ".join(parts[:3]) + " -"
 
 
-class Cache:
-    """Persistent key-value store keyed by (fen, backend).
+# Rows fetched per round trip by iter_backend().
+_SCAN_BATCH = 1_000
+
+# Shard files a Cache keeps open at once; the least recently used is closed
+# beyond this, so long-lived caches do not run out of file descriptors.
+_MAX_OPEN_SHARDS = 64
+
+# How long a Cache trusts what it found out about a partition (whether its
+# shard exists, whether it has entries) before looking again.  Its own writes
+# reset it at once; this bounds how long another process's go unnoticed.
+_PARTITION_STATE_TTL = 30.0
+
+# Read-side tuning applied to every per-thread reader connection.  Readers
+# never write, so they can map the file and keep a larger page cache.
+_READER_MMAP_BYTES = 256 * 1024 * 1024
+_READER_CACHE_KIB = 64 * 1024
+
+# Backends matching this are stored in per-backend shard files.
+_SHARDED_BACKEND_RE = re.compile(r"^[a-z]+_player_")
+
+# Appended to a single-speed player backend to name its imported-games
+# partition.
+IMPORTED_SUFFIX = ":import"
+
+_MAIN_DDL = """
+CREATE TABLE IF NOT EXISTS explorer_cache (
+    fen     TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    ts      REAL NOT NULL,
+    PRIMARY KEY (fen, backend)
+)
+"""
+
+# Lets a new shard find (and migrate) its legacy rows without a full scan.
+_MAIN_INDEX_DDL = """
+CREATE INDEX IF NOT EXISTS explorer_cache_backend ON explorer_cache (backend)
+"""
+
+# Cross-process "one fetch in flight per key" leases (see Cache.try_fetch_lease).
+_LEASE_DDL = """
+CREATE TABLE IF NOT EXISTS fetch_leases (
+    fen     TEXT    NOT NULL,
+    backend TEXT    NOT NULL,
+    expires REAL    NOT NULL,
+    waiters INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (fen, backend)
+)
+"""
+
+_SHARD_DDL = """
+CREATE TABLE IF NOT EXISTS book (
+    fen     TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    ts      REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+# Normalised shard layout (MYSECOND_BOOK_LAYOUT=relational).
+_RELATIONAL_DDL = """
+CREATE TABLE IF NOT EXISTS positions (
+    fen   TEXT PRIMARY KEY,
+    white INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    black INTEGER NOT NULL,
+    ts    REAL    NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS moves (
+    fen            TEXT    NOT NULL,
+    uci            TEXT    NOT NULL,
+    white          INTEGER NOT NULL,
+    draws          INTEGER NOT NULL,
+    black          INTEGER NOT NULL,
+    average_rating INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (fen, uci)
+) WITHOUT ROWID;
+"""
+
+_BOOK_LAYOUTS = ("json", "relational")
+
+
+def is_sharded_backend(backend: str) -> bool:
+    """Return True if *backend* is stored in its own shard file."""
+    return bool(_SHARDED_BACKEND_RE.match(backend))
+
+
+def speed_partitions(backend: str) -> list[str]:
+    """Return the single-speed backends a player *backend* is read from.
 
-    Thread-safe: a threading.Lock serialises all connection access so the
-    single sqlite3.Connection can be safely shared across threads.
+    Player backends end in ``_{speeds}``; each distinct (lower-cased) speed
+    contributes two partitions, its fetched book and its imported book
+    (:data:`IMPORTED_SUFFIX`).  Any other backend — including a partition's
+    own name with a suffix — is its own only partition.
     """
+    if not is_sharded_backend(backend) or ":" in backend:
+        return [backend]
+    prefix, _, speeds = backend.rpartition("_")
+    names = sorted({s.strip().lower() for s in speeds.split(",") if s.strip()})
+    return [
+        f"{prefix}_{name}{kind}" for name in names for kind in ("", IMPORTED_SUFFIX)
+    ] or [backend]
 
-    def __init__(self, db_path: Path) -> None:
-        db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = sqlite3.connect(
-            str(db_path),
-            check_same_thread=False,
-            timeout=60,
-        )
-        self._lock = threading.Lock()
-        self._conn.execute("PRAGMA journal_mode=WAL")
-        self._create_table()
 
-    def _create_table(self) -> None:
-        with self._lock:
-            self._conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS explorer_cache (
-                    fen     TEXT NOT NULL,
-                    backend TEXT NOT NULL,
-                    payload TEXT NOT NULL,
-                    ts      REAL NOT NULL,
-                    PRIMARY KEY (fen, backend)
+def shard_dir_for(db_path: Path) -> Path:
+    """Return the directory holding the shard files for *db_path*."""
+    return db_path.parent / f"{db_path.stem}-shards"
+
+
+def _shard_filename(backend: str) -> str:
+    """Map a backend key to a safe, collision-free shard file name."""
+    safe = re.sub(r"[^A-Za-z0-9_.,-]", "_", backend)
+    if safe != backend:
+        safe += "-" + hashlib.sha1(backend.encode("utf-8")).hexdigest()[:8]
+    return f"{safe}.sqlite"
+
+
+# ---------------------------------------------------------------------------
+# Storage files
+# ---------------------------------------------------------------------------
+
+
+class _Store:
+    """One SQLite file: a locked writer connection plus per-thread readers.
+
+    Layouts
+    -------
+    ``main``
+        The main file: JSON payloads keyed by ``(fen, backend)``.
+    ``json``
+        A shard holding one backend: JSON payloads keyed by ``fen``.
+    ``relational``
+        A shard holding one backend as ``positions`` / ``moves`` count
+        tables, so merges are SQL upserts and game totals are plain columns.
+        Payloads are rebuilt in explorer shape on read.
+    """
+
+    def __init__(self, path: Path, layout: str, hold: IO[bytes] | None = None) -> None:
+        self.path = path
+        # Shard lock (see _hold_shard), released on close.
+        self._hold = hold
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        # (owning thread, connection) for every reader handed out.
+        self._readers: list[tuple[threading.Thread, sqlite3.Connection]] = []
+        self._readers_lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if layout != "main":
+            # An existing shard keeps the layout it was created with.
+            tables = {
+                row[0] for row in self.conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
                 )
-                """
-            )
-            self._conn.commit()
+            }
+            if "positions" in tables:
+                layout = "relational"
+            elif "book" in tables:
+                layout = "json"
+        self.layout = layout
+        with self.lock:
+            if layout == "main":
+                self.conn.execute(_MAIN_DDL)
+                self.conn.execute(_MAIN_INDEX_DDL)
+                self.conn.execute(_LEASE_DDL)
+            elif layout == "json":
+                self.conn.execute(_SHARD_DDL)
+            else:
+                self.conn.executescript(_RELATIONAL_DDL)
+            self.conn.commit()
 
-    def get(self, fen: str, backend: str) -> dict[str, Any] | None:
-        """Return cached payload or *None* on a cache miss."""
-        with self._lock:
-            row = self._conn.execute(
-                "SELECT payload FROM explorer_cache WHERE fen = ? AND backend = ?",
-                (_norm_fen(fen), backend),
+    def reader(self) -> sqlite3.Connection:
+        """Return (or create) this thread's read-only connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=60)
+            conn.execute("PRAGMA query_only=ON")
+            conn.execute(f"PRAGMA mmap_size={_READER_MMAP_BYTES}")
+            conn.execute(f"PRAGMA cache_size=-{_READER_CACHE_KIB}")
+            self._local.conn = conn
+            with self._readers_lock:
+                # Pools that replace their threads (the web runner) would
+                # otherwise leave a handle behind for every thread they retire.
+                dead = [c for t, c in self._readers if not t.is_alive()]
+                self._readers = [(t, c) for t, c in self._readers if t.is_alive()]
+                self._readers.append((threading.current_thread(), conn))
+            for stale in dead:
+                stale.close()
+        return conn
+
+    # -- Reads --------------------------------------------------------------
+
+    def get(self, fen: str, backend: str) -> tuple[dict[str, Any], float] | None:
+        """Return ``(payload, ts)`` or None."""
+        conn = self.reader()
+        if self.layout == "relational":
+            pos = conn.execute(
+                "SELECT white, draws, black, ts FROM positions WHERE fen = ?", (fen,),
             ).fetchone()
-        return json.loads(row[0]) if row else None
+            if pos is None:
+                return None
+            moves = conn.execute(
+                "SELECT uci, white, draws, black, average_rating FROM moves WHERE fen = ?",
+                (fen,),
+            ).fetchall()
+            return _relational_payload(pos[0], pos[1], pos[2], moves), pos[3]
+        if self.layout == "json":
+            row = conn.execute(
+                "SELECT payload, ts FROM book WHERE fen = ?", (fen,),
+            ).fetchone()
+        else:
+            row = conn.execute(
+                "SELECT payload, ts FROM explorer_cache WHERE fen = ? AND backend = ?",
+                (fen, backend),
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
 
-    def set(self, fen: str, backend: str, data: dict[str, Any]) -> None:
-        """Insert or replace a cache entry."""
-        with self._lock:
-            self._conn.execute(
-                """
-                INSERT OR REPLACE INTO explorer_cache (fen, backend, payload, ts)
-                VALUES (?, ?, ?, ?)
-                """,
-                (_norm_fen(fen), backend, json.dumps(data), time.time()),
+    def has_rows(self, backend: str) -> bool:
+        """Return True if *backend* has any non-metadata entry in this file."""
+        not_meta = "fen NOT LIKE '\\_%' ESCAPE '\\'"
+        if self.layout == "main":
+            row = self.reader().execute(
+                f"SELECT 1 FROM explorer_cache WHERE backend = ? AND {not_meta} LIMIT 1",
+                (backend,),
+            ).fetchone()
+        else:
+            table = "positions" if self.layout == "relational" else "book"
+            row = self.reader().execute(
+                f"SELECT 1 FROM {table} WHERE {not_meta} LIMIT 1",
+            ).fetchone()
+        return row is not None
+
+    def fens_sql(self, schema: str, backend: str) -> tuple[str, list[Any]]:
+        """``SELECT`` of *backend*'s non-metadata FENs with this file attached as *schema*."""
+        not_meta = "fen NOT LIKE '\\_%' ESCAPE '\\'"
+        if self.layout == "main":
+            return (
+                f"SELECT fen FROM {schema}.explorer_cache WHERE backend = ? AND {not_meta}",
+                [backend],
             )
-            self._conn.commit()
+        table = "positions" if self.layout == "relational" else "book"
+        return f"SELECT fen FROM {schema}.{table} WHERE {not_meta}", []
 
-    def set_many(self, entries: list[tuple[str, str, dict[str, Any]]]) -> None:
-        """Insert or replace many entries in a single transaction.
+    def iter_rows(
+        self,
+        backend: str,
+        min_games: int,
+        turn: str | None,
+        skip_meta: bool,
+        ordered: bool = False,
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Stream (fen, payload) pairs for *backend*; see :meth:`Cache.iter_backend`.
 
-        *entries* is a list of (fen, backend, data) tuples.
+        With *ordered* the pairs come in FEN order (the relational layout
+        always returns them so).
+        """
+        conditions: list[str] = []
+        params: list[Any] = []
+        if self.layout == "main":
+            conditions.append("backend = ?")
+            params.append(backend)
+        if skip_meta:
+            conditions.append("fen NOT LIKE '\\_%' ESCAPE '\\'")
+        if turn is not None:
+            conditions.append("fen LIKE ?")
+            params.append("% w %" if turn == "white" else "% b %")
+        if min_games > 0:
+            if self.layout == "relational":
+                conditions.append("white + draws + black >= ?")
+            else:
+                conditions.append(
+                    "COALESCE(json_extract(payload, '$.white'), 0)"
+                    " + COALESCE(json_extract(payload, '$.draws'), 0)"
+                    " + COALESCE(json_extract(payload, '$.black'), 0) >= ?"
+                )
+            params.append(min_games)
+        where = " AND ".join(conditions) or "1 = 1"
+
+        if self.layout == "relational":
+            yield from self._iter_relational(where, params)
+            return
+
+        table = "book" if self.layout == "json" else "explorer_cache"
+        order = " ORDER BY fen" if ordered else ""
+        cursor = self.reader().execute(
+            f"SELECT fen, payload FROM {table} WHERE {where}{order}", params,
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(_SCAN_BATCH)
+                if not rows:
+                    break
+                for fen, payload in rows:
+                    yield fen, json.loads(payload)
+        finally:
+            cursor.close()
+
+    def _iter_relational(
+        self, where: str, params: list[Any],
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        # One pass over positions in key order, joined to their moves, so
+        # each position is assembled from consecutive rows.
+        cursor = self.reader().execute(
+            f"""
+            SELECT p.fen, p.white, p.draws, p.black,
+                   m.uci, m.white, m.draws, m.black, m.average_rating
+            FROM (SELECT fen, white, draws, black FROM positions WHERE {where}) AS p
+            LEFT JOIN moves AS m ON m.fen = p.fen
+            ORDER BY p.fen
+            """,
+            params,
+        )
+        try:
+            current: tuple[str, int, int, int] | None = None
+            moves: list[tuple[str, int, int, int, int]] = []
+            while True:
+                rows = cursor.fetchmany(_SCAN_BATCH)
+                if not rows:
+                    break
+                for fen, w, d, b, uci, mw, md, mb, rating in rows:
+                    if current is None or current[0] != fen:
+                        if current is not None:
+                            yield current[0], _relational_payload(*current[1:], moves)
+                        current, moves = (fen, w, d, b), []
+                    if uci is not None:
+                        moves.append((uci, mw, md, mb, rating))
+            if current is not None:
+                yield current[0], _relational_payload(*current[1:], moves)
+        finally:
+            cursor.close()
+
+    # -- Writes -------------------------------------------------------------
+
+    def write(
+        self,
+        rows: list[tuple[str, str, str, float]],
+        released: list[tuple[str, str]] | None = None,
+    ) -> None:
+        """INSERT OR REPLACE (fen, backend, payload_json, ts) rows in one transaction.
+
+        The fetch leases keyed ``(fen, backend)`` in *released* (main file
+        only) are deleted in the same transaction.
         """
-        rows = [(_norm_fen(fen), backend, json.dumps(data), time.time()) for fen, backend, data in entries]
-        with self._lock:
-            self._conn.executemany(
+        with self.lock:
+            self._upsert(rows)
+            if released:
+                self.conn.executemany(
+                    "DELETE FROM fetch_leases WHERE fen = ? AND backend = ?", released,
+                )
+            self.conn.commit()
+
+    def _upsert(self, rows: list[tuple[str, str, str, float]]) -> None:
+        if self.layout == "relational":
+            fens = [(fen,) for fen, _, _, _ in rows]
+            self.conn.executemany("DELETE FROM moves WHERE fen = ?", fens)
+            self._upsert_counts(
+                [(fen, json.loads(payload), ts) for fen, _, payload, ts in rows],
+                add=False,
+            )
+        elif self.layout == "json":
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO book (fen, payload, ts) VALUES (?, ?, ?)",
+                [(fen, payload, ts) for fen, _, payload, ts in rows],
+            )
+        else:
+            self.conn.executemany(
                 """
                 INSERT OR REPLACE INTO explorer_cache (fen, backend, payload, ts)
                 VALUES (?, ?, ?, ?)
                 """,
                 rows,
             )
-            self._conn.commit()
+
+    def clear(self, backend: str, older_than: float | None = None) -> int:
+        """Delete every non-metadata entry of *backend*; return the positions removed.
+
+        With *older_than*, only entries written before that Unix time.
+        """
+        where = "fen NOT LIKE '\\_%' ESCAPE '\\'"
+        params: list[Any] = []
+        if older_than is not None:
+            where += " AND ts < ?"
+            params.append(older_than)
+        with self.lock:
+            if self.layout == "relational":
+                self.conn.execute(
+                    f"DELETE FROM moves WHERE fen IN (SELECT fen FROM positions WHERE {where})",
+                    params,
+                )
+                cur = self.conn.execute(f"DELETE FROM positions WHERE {where}", params)
+            elif self.layout == "json":
+                cur = self.conn.execute(f"DELETE FROM book WHERE {where}", params)
+            else:
+                cur = self.conn.execute(
+                    f"DELETE FROM explorer_cache WHERE backend = ? AND {where}",
+                    [backend, *params],
+                )
+            self.conn.commit()
+            return cur.rowcount
+
+    def delete(self, fen: str, backend: str) -> None:
+        """Delete the entry for (fen, backend), if any."""
+        with self.lock:
+            if self.layout == "relational":
+                self.conn.execute("DELETE FROM moves WHERE fen = ?", (fen,))
+                self.conn.execute("DELETE FROM positions WHERE fen = ?", (fen,))
+            elif self.layout == "json":
+                self.conn.execute("DELETE FROM book WHERE fen = ?", (fen,))
+            else:
+                self.conn.execute(
+                    "DELETE FROM explorer_cache WHERE fen = ? AND backend = ?", (fen, backend),
+                )
+            self.conn.commit()
+
+    def merge(self, entries: list[tuple[str, dict[str, Any]]], ts: float) -> None:
+        """Add the counts in (fen, payload) *entries* to the stored ones (relational only)."""
+        with self.lock:
+            self._upsert_counts([(fen, payload, ts) for fen, payload in entries], add=True)
+            self.conn.commit()
+
+    def _upsert_counts(
+        self,
+        entries: list[tuple[str, dict[str, Any], float]],
+        add: bool,
+    ) -> None:
+        op = "{col} + excluded.{col}" if add else "excluded.{col}"
+        counts = ", ".join(
+            f"{col} = " + op.format(col=col) for col in ("white", "draws", "black")
+        )
+        self.conn.executemany(
+            f"""
+            INSERT INTO positions (fen, white, draws, black, ts) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(fen) DO UPDATE SET {counts}, ts = excluded.ts
+            """,
+            [
+                (fen, int(p.get("white", 0)), int(p.get("draws", 0)), int(p.get("black", 0)), ts)
+                for fen, p, ts in entries
+            ],
+        )
+        self.conn.executemany(
+            f"""
+            INSERT INTO moves (fen, uci, white, draws, black, average_rating)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(fen, uci) DO UPDATE SET {counts},
+                average_rating = excluded.average_rating
+            """,
+            [
+                (
+                    fen, m["uci"],
+                    int(m.get("white", 0)), int(m.get("draws", 0)), int(m.get("black", 0)),
+                    int(m.get("averageRating", 0)),
+                )
+                for fen, p, _ in entries
+                for m in p.get("moves", [])
+                if m.get("uci")
+            ],
+        )
+
+    def close(self) -> None:
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for _, conn in readers:
+            conn.close()
+        self._local = threading.local()
+        self.conn.close()
+        if self._hold is not None:
+            self._hold.close()
+
+
+def _relational_payload(
+    white: int,
+    draws: int,
+    black: int,
+    moves: list[tuple[str, int, int, int, int]],
+) -> dict[str, Any]:
+    """Build an explorer-shaped payload from relational rows (moves most-played first)."""
+    return {
+        "white": white,
+        "draws": draws,
+        "black": black,
+        "moves": [
+            {"uci": uci, "white": w, "draws": d, "black": b, "averageRating": rating}
+            for uci, w, d, b, rating in sorted(moves, key=lambda m: -(m[1] + m[2] + m[3]))
+        ],
+    }
+
+
+def _sum_payloads(payloads: list[dict[str, Any]]) -> dict[str, Any]:
+    """Add up explorer-shaped payloads; move ratings are averaged over games."""
+    white = draws = black = 0
+    moves: dict[str, list[int]] = {}   # uci → [white, draws, black, rating × games]
+    for payload in payloads:
+        white += int(payload.get("white", 0))
+        draws += int(payload.get("draws", 0))
+        black += int(payload.get("black", 0))
+        for m in payload.get("moves", []):
+            counts = moves.setdefault(m["uci"], [0, 0, 0, 0])
+            w, d, b = int(m.get("white", 0)), int(m.get("draws", 0)), int(m.get("black", 0))
+            counts[0] += w
+            counts[1] += d
+            counts[2] += b
+            counts[3] += int(m.get("averageRating", 0)) * (w + d + b)
+    return _relational_payload(white, draws, black, [
+        (uci, w, d, b, rated // (w + d + b) if w + d + b else 0)
+        for uci, (w, d, b, rated) in moves.items()
+    ])
+
+
+# ---------------------------------------------------------------------------
+# Public cache
+# ---------------------------------------------------------------------------
+
+
+class Cache:
+    """Persistent key-value store keyed by (fen, backend).
+
+    Thread-safe: each thread reads through its own SQLite connection (via
+    threading.local) so lookups run concurrently under WAL; all writes to a
+    file go through a single writer connection serialised with a
+    threading.Lock.  Player backends are stored in per-backend shard files
+    (see the module docstring).
+
+    Write-behind
+    ------------
+    With ``write_batch > 0``, :meth:`set` buffers entries in memory and
+    commits them in one transaction once ``write_batch`` entries are pending
+    or ``flush_interval`` seconds have passed since the last flush (checked on
+    each :meth:`set`).  :meth:`get` reads through the buffer, and the buffer
+    is flushed by :meth:`flush`, :meth:`close` and on context exit.
+
+    Open shards
+    -----------
+    At most ``max_open_shards`` shard files are kept open; opening another
+    one drops the least recently used.  A dropped shard's connections close
+    as soon as no read in progress still holds them, and the file is opened
+    again on its next access.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        write_batch: int = 0,
+        flush_interval: float = 5.0,
+        book_layout: str | None = None,
+        max_open_shards: int = _MAX_OPEN_SHARDS,
+    ) -> None:
+        book_layout = book_layout or os.environ.get("MYSECOND_BOOK_LAYOUT", "json")
+        if book_layout not in _BOOK_LAYOUTS:
+            raise ValueError(f"book_layout must be one of {_BOOK_LAYOUTS}, got {book_layout!r}")
+        self._book_layout = book_layout
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db_path = db_path
+        self._shard_dir = shard_dir_for(db_path)
+        self._write_batch = write_batch
+        self._flush_interval = flush_interval
+        # (norm_fen, backend) → (payload_json, ts), awaiting flush.
+        self._pending: dict[tuple[str, str], tuple[str, float]] = {}
+        # Fetch leases whose result is buffered: dropped by the next flush.
+        self._released: set[tuple[str, str]] = set()
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._main = _Store(db_path, layout="main")
+        # backend → open shard, least recently used first.
+        self._shards: OrderedDict[str, _Store] = OrderedDict()
+        self._shards_lock = threading.Lock()
+        self._max_open_shards = max(1, max_open_shards)
+        # backend → (has a store / has entries, monotonic time found out);
+        # spares combined-speed reads a stat and a query per partition.
+        self._store_state: dict[str, tuple[bool, float]] = {}
+        self._live_state: dict[str, tuple[bool, float]] = {}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, fen: str, backend: str) -> dict[str, Any] | None:
+        """Return cached payload or *None* on a cache miss."""
+        hit = self.get_with_ts(fen, backend)
+        return hit[0] if hit is not None else None
+
+    def get_with_ts(self, fen: str, backend: str) -> tuple[dict[str, Any], float] | None:
+        """Return ``(payload, ts)`` — *ts* being the Unix time it was written — or None.
+
+        A player backend returns the sum of its partitions' entries (see the
+        module docstring); *ts* is then the newest of them.
+        """
+        key = _norm_fen(fen)
+        partitions = speed_partitions(backend)
+        if partitions != [backend]:
+            hits = [
+                hit for p in partitions
+                if (hit := self._get(key, p, open_shard=False)) is not None
+            ]
+            if len(hits) == 1:
+                return hits[0]
+            if hits:
+                return _sum_payloads([h[0] for h in hits]), max(h[1] for h in hits)
+            if backend in partitions or self._live_partitions(partitions):
+                return None
+        return self._get(key, backend)
+
+    def _get(
+        self, key: str, backend: str, open_shard: bool = True,
+    ) -> tuple[dict[str, Any], float] | None:
+        if self._write_batch > 0:
+            with self._pending_lock:
+                buffered = self._pending.get((key, backend))
+            if buffered is not None:
+                return json.loads(buffered[0]), buffered[1]
+        if not open_shard and not self._has_store(backend):
+            return None
+        return self._store(backend).get(key, backend)
+
+    def set(self, fen: str, backend: str, data: dict[str, Any]) -> None:
+        """Insert or replace a cache entry (buffered when write-behind is on)."""
+        row = (_norm_fen(fen), backend, json.dumps(data), time.time())
+        self._forget_state(backend)
+        if self._write_batch > 0:
+            with self._pending_lock:
+                self._pending[(row[0], backend)] = (row[2], row[3])
+                due = (
+                    len(self._pending) >= self._write_batch
+                    or time.monotonic() - self._last_flush >= self._flush_interval
+                )
+            if due:
+                self.flush()
+            return
+        self._store(backend).write([row])
+
+    def set_many(self, entries: list[tuple[str, str, dict[str, Any]]]) -> None:
+        """Insert or replace many entries in a single transaction per file.
+
+        *entries* is a list of (fen, backend, data) tuples.
+        """
+        self.flush()
+        now = time.time()
+        self._write_rows([
+            (_norm_fen(fen), backend, json.dumps(data), now)
+            for fen, backend, data in entries
+        ])
 
     def scan_backend(self, backend: str) -> list[tuple[str, dict[str, Any]]]:
-        """Return all (fen, payload) pairs stored for *backend*."""
-        with self._lock:
-            rows = self._conn.execute(
-                "SELECT fen, payload FROM explorer_cache WHERE backend = ?",
-                (backend,),
-            ).fetchall()
-        return [(row[0], json.loads(row[1])) for row in rows]
+        """Return all (fen, payload) pairs stored for *backend*.
+
+        Prefer :meth:`iter_backend` for large backends.
+        """
+        return list(self.iter_backend(backend))
+
+    def iter_backend(
+        self,
+        backend: str,
+        min_games: int = 0,
+        turn: str | None = None,
+        skip_meta: bool = False,
+        exact: bool = False,
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Stream (fen, payload) pairs stored for *backend*.
+
+        Unlike :meth:`scan_backend` rows are decoded one batch at a time, so
+        memory stays bounded by what the caller keeps.  Filters run in SQL:
+
+        min_games:
+            Skip positions whose ``white + draws + black`` is below this.
+        turn:
+            ``'white'`` or ``'black'`` — keep only positions with that side
+            to move.
+        skip_meta:
+            Skip metadata keys (FENs starting with ``_``).
+        exact:
+            Read the rows of *backend* itself, without adding up its speed
+            partitions — for writers updating one partition.
+
+        A player backend streams the sum of its partitions, merged in FEN
+        order; *min_games* then applies to the summed counts.
+        """
+        if turn is not None and turn not in ("white", "black"):
+            raise ValueError(f"turn must be 'white' or 'black', got {turn!r}")
+        self.flush()
+        partitions = speed_partitions(backend)
+        if partitions != [backend] and not exact:
+            live = self._live_partitions(partitions)
+            if len(live) == 1:
+                return self._store(live[0]).iter_rows(live[0], min_games, turn, skip_meta)
+            if live:
+                return self._iter_partitions(live, min_games, turn, skip_meta)
+        return self._store(backend).iter_rows(backend, min_games, turn, skip_meta)
+
+    def supports_merge(self, backend: str) -> bool:
+        """Return True if :meth:`merge_many` can add counts in SQL for *backend*."""
+        return self._store(backend).layout == "relational"
+
+    def merge_many(self, backend: str, entries: list[tuple[str, dict[str, Any]]]) -> None:
+        """Add the game counts of explorer-shaped (fen, payload) *entries* to *backend*.
+
+        Only available when :meth:`supports_merge` is True; callers merge in
+        Python otherwise.
+        """
+        store = self._store(backend)
+        if store.layout != "relational":
+            raise ValueError(f"backend {backend!r} does not support SQL merges")
+        self.flush()
+        store.merge([(_norm_fen(fen), payload) for fen, payload in entries], time.time())
+        self._forget_state(backend)
+
+    def delete(self, fen: str, backend: str) -> None:
+        """Delete the entry for (fen, backend), buffered or stored."""
+        key = _norm_fen(fen)
+        with self._pending_lock:
+            self._pending.pop((key, backend), None)
+        self._store(backend).delete(key, backend)
+        self._forget_state(backend)
+
+    def clear_backend(self, backend: str, older_than: float | None = None) -> int:
+        """Delete all positions stored for *backend* (metadata keys are kept).
+
+        With *older_than*, only entries written before that Unix time go —
+        for expiring short-lived entries such as failed lookups.
+
+        Returns the number of positions removed.
+        """
+        self.flush()
+        removed = self._store(backend).clear(backend, older_than)
+        self._forget_state(backend)
+        return removed
+
+    # -- Fetch leases -------------------------------------------------------
+    #
+    # Processes sharing this file use a lease row so only one of them fetches
+    # a given (fen, backend) from the network at a time; the others wait and
+    # then read the result from the cache.  Leases always live in the main
+    # file and expire on their own if the holder dies.  With write-behind, a
+    # released lease is dropped by the flush that commits its result, so a
+    # miss costs one write of its own (taking the lease).
+
+    def try_fetch_lease(self, fen: str, backend: str, ttl: float) -> bool:
+        """Take the fetch lease for (fen, backend); False if another caller holds it."""
+        key = (_norm_fen(fen), backend)
+        with self._pending_lock:
+            if key in self._released:
+                # Released by this cache but not yet dropped: still ours.
+                self._released.discard(key)
+                return True
+        now = time.time()
+        with self._main.lock:
+            conn = self._main.conn
+            conn.execute(
+                "DELETE FROM fetch_leases WHERE fen = ? AND backend = ? AND expires <= ?",
+                (*key, now),
+            )
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO fetch_leases (fen, backend, expires) VALUES (?, ?, ?)",
+                (*key, now + ttl),
+            )
+            conn.commit()
+            return cur.rowcount == 1
+
+    def wait_on_fetch_lease(self, fen: str, backend: str) -> bool:
+        """Register as a waiter on a live lease; False if there is none any more."""
+        with self._main.lock:
+            cur = self._main.conn.execute(
+                "UPDATE fetch_leases SET waiters = 1"
+                " WHERE fen = ? AND backend = ? AND expires > ?",
+                (_norm_fen(fen), backend, time.time()),
+            )
+            self._main.conn.commit()
+            return cur.rowcount == 1
+
+    def fetch_lease_active(self, fen: str, backend: str) -> bool:
+        """True while an unexpired lease exists for (fen, backend)."""
+        row = self._main.reader().execute(
+            "SELECT 1 FROM fetch_leases WHERE fen = ? AND backend = ? AND expires > ?",
+            (_norm_fen(fen), backend, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def release_fetch_lease(
+        self, fen: str, backend: str, data: dict[str, Any] | None = None,
+    ) -> None:
+        """Release a lease taken with :meth:`try_fetch_lease`.
+
+        *data*, the fetched result if there is one, is stored as by
+        :meth:`set`, and the lease row is deleted in the transaction that
+        commits it, so waiters never see the lease gone before the result.
+        With write-behind that is the next :meth:`flush`; it happens at once
+        only if another process has registered as a waiter.
+        """
+        key = (_norm_fen(fen), backend)
+        if self._write_batch > 0:
+            if data is not None:
+                self.set(fen, backend, data)
+            with self._pending_lock:
+                self._released.add(key)
+            row = self._main.reader().execute(
+                "SELECT waiters FROM fetch_leases WHERE fen = ? AND backend = ?", key,
+            ).fetchone()
+            if row is not None and row[0]:
+                self.flush()
+            return
+        rows = [] if data is None else [(*key, json.dumps(data), time.time())]
+        if rows and is_sharded_backend(backend):
+            self._store(backend).write(rows)
+            rows = []
+        self._main.write(rows, [key])
+
+    def has_backend(self, backend: str) -> bool:
+        """Return True if any non-metadata entry is stored for *backend*.
+
+        For a combined-speed player backend, an entry in any of its
+        partitions counts.
+        """
+        self.flush()
+        return any(
+            self._store(b).has_rows(b) for b in (*speed_partitions(backend), backend)
+            if b == backend or self._has_store(b)
+        )
+
+    def count_positions(self, backends: list[str]) -> int:
+        """Return the number of distinct positions stored across *backends*.
+
+        Metadata keys are not counted.  SQLite counts them in one query over
+        the backends' files attached to a scratch connection, so no FEN is
+        loaded into Python.
+        """
+        self.flush()
+        schemas: dict[Path, str] = {}
+        selects: list[str] = []
+        params: list[Any] = []
+        for backend in backends:
+            if not self._has_store(backend):
+                continue
+            store = self._store(backend)
+            schema = schemas.setdefault(store.path, f"s{len(schemas)}")
+            sql, sql_params = store.fens_sql(schema, backend)
+            selects.append(sql)
+            params.extend(sql_params)
+        if not selects:
+            return 0
+        conn = sqlite3.connect(":memory:")
+        try:
+            for path, schema in schemas.items():
+                conn.execute(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+            return conn.execute(
+                f"SELECT COUNT(*) FROM ({' UNION '.join(selects)})", params,
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def flush(self) -> None:
+        """Commit any write-behind entries in a single transaction per file."""
+        with self._pending_lock:
+            self._last_flush = time.monotonic()
+            if not self._pending and not self._released:
+                return
+            pending, self._pending = self._pending, {}
+            released, self._released = list(self._released), set()
+            # Written while still holding the buffer lock so concurrent get()
+            # calls never miss an entry that has left the buffer but is not
+            # yet committed.
+            self._write_rows(
+                [
+                    (fen, backend, payload, ts)
+                    for (fen, backend), (payload, ts) in pending.items()
+                ],
+                released,
+            )
 
     def close(self) -> None:
-        self._conn.close()
+        self.flush()
+        with self._shards_lock:
+            shards, self._shards = self._shards, OrderedDict()
+        for store in shards.values():
+            store.close()
+        self._main.close()
 
     def __enter__(self) -> "Cache":
         return self
 
     def __exit__(self, *_: object) -> None:
         self.close()
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _iter_partitions(
+        self,
+        partitions: list[str],
+        min_games: int,
+        turn: str | None,
+        skip_meta: bool,
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Merge the FEN-ordered rows of *partitions*, adding up entries per FEN."""
+        streams = [
+            self._store(p).iter_rows(p, 0, turn, skip_meta, ordered=True)
+            for p in partitions
+        ]
+        rows = heapq.merge(*streams, key=itemgetter(0))
+        for fen, group in groupby(rows, key=itemgetter(0)):
+            payloads = [payload for _, payload in group]
+            payload = payloads[0] if len(payloads) == 1 else _sum_payloads(payloads)
+            if min_games > 0 and (
+                payload.get("white", 0) + payload.get("draws", 0) + payload.get("black", 0)
+            ) < min_games:
+                continue
+            yield fen, payload
+
+    def _write_rows(
+        self,
+        rows: list[tuple[str, str, str, float]],
+        released: list[tuple[str, str]] | None = None,
+    ) -> None:
+        """Route (fen, backend, payload_json, ts) rows to their files and write them.
+
+        The main file is written last, deleting the *released* fetch leases,
+        so a lease outlives the commit of its result in any shard.
+        """
+        by_store: dict[int, tuple[_Store, list[tuple[str, str, str, float]]]] = {}
+        for row in rows:
+            store = self._store(row[1])
+            by_store.setdefault(id(store), (store, []))[1].append(row)
+            self._forget_state(row[1])
+        _, main_rows = by_store.pop(id(self._main), (self._main, []))
+        for store, store_rows in by_store.values():
+            store.write(store_rows)
+        if main_rows or released:
+            self._main.write(main_rows, released)
+
+    def _store(self, backend: str) -> _Store:
+        """Return the file that holds *backend*, opening its shard if needed."""
+        if not is_sharded_backend(backend):
+            return self._main
+        with self._shards_lock:
+            store = self._shards.get(backend)
+            if store is not None:
+                self._shards.move_to_end(backend)
+                return store
+            store = self._shards[backend] = self._open_shard(backend)
+            while len(self._shards) > self._max_open_shards:
+                # Not closed here: another thread may be streaming from it.
+                # Its connections close when the last reference goes away.
+                self._shards.popitem(last=False)
+        return store
+
+    def _live_partitions(self, partitions: list[str]) -> list[str]:
+        """The *partitions* holding at least one entry, without creating any."""
+        return [
+            p for p in partitions
+            if self._known(
+                self._live_state, p, lambda: self._has_store(p) and self._store(p).has_rows(p),
+            )
+        ]
+
+    def _has_store(self, backend: str) -> bool:
+        """False if *backend* is a shard that was never created and has no legacy rows.
+
+        Lets combined-speed reads skip partitions without creating them.
+        """
+        if not is_sharded_backend(backend) or backend in self._shards:
+            return True
+        path = self._shard_dir / _shard_filename(backend)
+        return self._known(self._store_state, backend, lambda: (
+            path.exists()
+            or path.with_name(path.name + ".gz").exists()
+            or self._main.has_rows(backend)
+        ))
+
+    @staticmethod
+    def _known(
+        state: dict[str, tuple[bool, float]], backend: str, probe: Callable[[], bool],
+    ) -> bool:
+        """*backend*'s entry in *state*, probed again once older than the TTL."""
+        now = time.monotonic()
+        known = state.get(backend)
+        if known is None or now - known[1] > _PARTITION_STATE_TTL:
+            known = state[backend] = (probe(), now)
+        return known[0]
+
+    def _forget_state(self, backend: str) -> None:
+        """Drop what is known about *backend* after writing or clearing it."""
+        self._store_state.pop(backend, None)
+        self._live_state.pop(backend, None)
+
+    def _open_shard(self, backend: str) -> _Store:
+        self._shard_dir.mkdir(parents=True, exist_ok=True)
+        path = self._shard_dir / _shard_filename(backend)
+        hold = _hold_shard(path)
+        try:
+            _decompress_if_cold(path)
+            store = _Store(path, layout=self._book_layout, hold=hold)
+        except BaseException:
+            if hold is not None:
+                hold.close()
+            raise
+        self._migrate_legacy_rows(backend, store)
+        return store
+
+    def _migrate_legacy_rows(self, backend: str, shard: _Store) -> None:
+        """Move any rows for *backend* left in the main table into its shard.
+
+        An indexed lookup, so it is cheap once the rows have been moved.
+        """
+        rows = self._main.reader().execute(
+            "SELECT fen, backend, payload, ts FROM explorer_cache WHERE backend = ?",
+            (backend,),
+        ).fetchall()
+        if not rows:
+            return
+        shard.write(rows)
+        with self._main.lock:
+            self._main.conn.execute(
+                "DELETE FROM explorer_cache WHERE backend = ?", (backend,),
+            )
+            self._main.conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# Cold shards
+# ---------------------------------------------------------------------------
+
+
+def _hold_shard(path: Path) -> IO[bytes] | None:
+    """Take a shared lock on shard *path*, waiting out a compression in progress.
+
+    The lock lasts until the returned file is closed; None where files
+    cannot be locked.
+    """
+    if fcntl is None:
+        return None
+    handle = open(path.with_name(path.name + ".lock"), "ab")
+    fcntl.flock(handle, fcntl.LOCK_SH)
+    return handle
+
+
+def _claim_idle_shard(path: Path) -> IO[bytes] | None:
+    """Lock shard *path* exclusively; None if a process has it open.
+
+    Where files cannot be locked, the shard is assumed idle.
+    """
+    handle = open(path.with_name(path.name + ".lock"), "ab")
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            handle.close()
+            return None
+    return handle
+
+
+def _decompress_if_cold(path: Path) -> None:
+    """Restore *path* from its ``.gz`` copy if only the compressed shard exists."""
+    gz_path = path.with_name(path.name + ".gz")
+    if path.exists() or not gz_path.exists():
+        return
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with gzip.open(gz_path, "rb") as src, open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    # Atomic: a concurrent process decompressing the same shard just wins or loses the race.
+    os.replace(tmp_path, path)
+    gz_path.unlink(missing_ok=True)
+
+
+def compress_cold_shards(db_path: Path, max_idle_days: float = 30.0) -> list[Path]:
+    """Gzip shard files under *db_path*'s shard directory not written recently.
+
+    A shard is cold when neither it nor its WAL has been modified for
+    *max_idle_days*.  Each cold shard is checkpointed, compressed to
+    ``<name>.sqlite.gz`` and removed; :class:`Cache` restores it on the next
+    access.  Shards a :class:`Cache` in any process has open are skipped, so
+    this is safe to run while the web server is up — except on platforms
+    without ``fcntl`` (Windows), where it must not be.
+
+    Returns the paths of the compressed files written.
+    """
+    shard_dir = shard_dir_for(db_path)
+    if not shard_dir.exists():
+        return []
+    cutoff = time.time() - max_idle_days * 86_400
+    written: list[Path] = []
+    for path in sorted(shard_dir.glob("*.sqlite")):
+        wal = path.with_name(path.name + "-wal")
+        mtime = max(
+            path.stat().st_mtime,
+            wal.stat().st_mtime if wal.exists() else 0.0,
+        )
+        if mtime >= cutoff:
+            continue
+        claim = _claim_idle_shard(path)
+        if claim is None:
+            continue                      # open in some process
+        with claim:
+            conn = sqlite3.connect(str(path), timeout=60)
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                conn.close()
+            gz_path = path.with_name(path.name + ".gz")
+            tmp_path = gz_path.with_name(gz_path.name + ".tmp")
+            with open(path, "rb") as src, gzip.open(tmp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, gz_path)
+            path.unlink()
+            for suffix in ("-wal", "-shm"):
+                path.with_name(path.name + suffix).unlink(missing_ok=True)
+        written.append(gz_path)
+    return written
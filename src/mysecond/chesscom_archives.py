@@ -0,0 +1,136 @@
+"""Local store of downloaded Chess.com monthly game archives.
+
+Chess.com publishes each player's games as one archive per month
+(``/pub/player/{user}/games/{YYYY}/{MM}``).  A month that has ended never
+changes again, so once downloaded it is kept here and marked *immutable*:
+later fetches, game-phase downloads and bot training read it from disk
+without a request.  Archives of the current month are stored with their
+``ETag`` / ``Last-Modified`` validators and revalidated with a conditional
+GET, which costs a ``304 Not Modified`` when nothing new was played.
+
+The store is a SQLite file (``MYSECOND_CHESSCOM_ARCHIVE_DB``, default
+``data/chesscom-archives.sqlite``) keyed by ``(username, year, month)``;
+bodies are zlib-compressed JSON.  It is safe to share between threads and
+processes.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_DEFAULT_ARCHIVE_DB = Path("data/chesscom-archives.sqlite")
+
+# A month is treated as complete this long after it ends, so games that are
+# filed late (e.g. daily games finishing at midnight) are not missed.
+_SETTLE_TIME = timedelta(days=1)
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS archives (
+    username      TEXT    NOT NULL,
+    year          INTEGER NOT NULL,
+    month         INTEGER NOT NULL,
+    body          BLOB    NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    immutable     INTEGER NOT NULL,
+    fetched_at    REAL    NOT NULL,
+    PRIMARY KEY (username, year, month)
+)
+"""
+
+
+@dataclass(slots=True)
+class StoredArchive:
+    body: bytes                 # archive JSON as served
+    etag: str | None
+    last_modified: str | None
+    immutable: bool             # month complete: never re-fetched
+
+
+def archive_key(url: str) -> tuple[str, int, int] | None:
+    """Return ``(username, year, month)`` for a monthly archive URL, or None."""
+    parts = url.rstrip("/").split("/")
+    try:
+        if parts[-3] != "games":
+            return None
+        return parts[-4].lower(), int(parts[-2]), int(parts[-1])
+    except (IndexError, ValueError):
+        return None
+
+
+def month_complete(year: int, month: int, now: datetime | None = None) -> bool:
+    """True once the month has ended (plus a settling margin) in UTC."""
+    now = now or datetime.now(timezone.utc)
+    next_month = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+    return now >= next_month + _SETTLE_TIME
+
+
+class ArchiveStore:
+    """Monthly archives keyed by ``(username, year, month)``."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(str(path), timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_DDL)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, username: str, year: int, month: int) -> StoredArchive | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, immutable FROM archives"
+                " WHERE username = ? AND year = ? AND month = ?",
+                (username.lower(), year, month),
+            ).fetchone()
+        if row is None:
+            return None
+        body, etag, last_modified, immutable = row
+        return StoredArchive(zlib.decompress(body), etag, last_modified, bool(immutable))
+
+    def put(
+        self,
+        username: str,
+        year: int,
+        month: int,
+        body: bytes,
+        etag: str | None,
+        last_modified: str | None,
+    ) -> None:
+        """Store an archive; it is immutable if its month is complete."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archives"
+                " (username, year, month, body, etag, last_modified, immutable, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    username.lower(), year, month, zlib.compress(body), etag, last_modified,
+                    int(month_complete(year, month)), time.time(),
+                ),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_stores: dict[Path, ArchiveStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store() -> ArchiveStore:
+    """Return the process-wide store for the configured path."""
+    raw = os.environ.get("MYSECOND_CHESSCOM_ARCHIVE_DB", "").strip()
+    path = (Path(raw) if raw else _DEFAULT_ARCHIVE_DB).resolve()
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = ArchiveStore(path)
+        return store
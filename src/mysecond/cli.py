@@ -4,6 +4,9 @@ Usage
 -----
   mysecond search   --fen <FEN> --side white ...   (find novelties)
   mysecond fetch-player-games --username <U> --color white ...  (warm cache)
+  mysecond build-masters-db twic/*.pgn                           (offline masters)
+  mysecond eval-cache export --out evals.jsonl.gz                (share evals)
+  mysecond net-serve                                             (offline APIs)
 
 Run ``mysecond <command> --help`` for full option listings.
 """
@@ -18,13 +21,17 @@ from pathlib import Path
 import chess
 import click
 
-from .cache import Cache
+from .cache import Cache, compress_cold_shards
 from .engine import find_stockfish
-from .eval_cache import EvalCache
+from .eval_cache import EvalCache, read_snapshot_header
 from .export import export_pgn
 from .fetcher import _DEFAULT_DB as _FETCH_DB
 from .fetcher import fetch_player_games, fetch_player_games_chesscom, import_pgn_player, last_fetch_ts
 from .habits import analyze_habits, export_habits_pgn
+from .masters_db import _DEFAULT_MASTERS_DB as _MASTERS_DB
+from .masters_db import build_masters_db
+from .netmode import _DEFAULT_ARCHIVE as _NET_ARCHIVE
+from .netmode import serve as net_serve
 from .bot_trainer import train_bot as _train_bot
 from .repertoire_extract import RepertoireStats, export_repertoire_pgn, extract_repertoire
 from .strategise import strategise
@@ -40,6 +47,9 @@ def main() -> None:
     Commands:
       search              Walk opening theory and find novelties.
       fetch-player-games  Download a player's games to warm the local cache.
+      build-masters-db    Index bulk OTB PGN files for offline search.
+      eval-cache          Export/import Stockfish evaluations between hosts.
+      net-serve           Local stand-in for the Lichess/Chess.com APIs.
     """
 
 
@@ -227,6 +237,24 @@ def main() -> None:
         "Default: True when --player/--opponent are set, False otherwise."
     ),
 )
+@click.option(
+    "--masters-db",
+    "masters_db",
+    default=None,
+    help=(
+        "Read master-game statistics from this local index (built with "
+        "'mysecond build-masters-db') instead of the Lichess masters API."
+    ),
+)
+@click.option(
+    "--book",
+    "polyglot_book",
+    default=None,
+    help=(
+        "Walk theory from this Polyglot .bin book (e.g. a house repertoire) "
+        "instead of master games; book weights count as games."
+    ),
+)
 def search_cmd(
     fen: str,
     side: str,
@@ -252,6 +280,8 @@ def search_cmd(
     player_speeds: str,
     opponent_speeds: str,
     player_local_only: bool | None,
+    masters_db: str | None,
+    polyglot_book: str | None,
 ) -> None:
     """Walk opening theory and find novelties for ChessBase import.
 
@@ -287,6 +317,19 @@ def search_cmd(
     click.echo(f"  Workers:            {workers}")
     click.echo(f"  Max candidates:     {max_candidates}")
     click.echo(f"  Output:             {output}")
+    if masters_db and polyglot_book:
+        click.echo("Error: --masters-db and --book are mutually exclusive.", err=True)
+        sys.exit(1)
+    if polyglot_book:
+        click.echo(f"  Polyglot book:      {polyglot_book}")
+        if not Path(polyglot_book).exists():
+            click.echo(f"Error: Polyglot book not found: {polyglot_book}", err=True)
+            sys.exit(1)
+    if masters_db:
+        click.echo(f"  Masters DB:         {masters_db} (local)")
+        if not Path(masters_db).exists():
+            click.echo(f"Error: masters index not found: {masters_db}", err=True)
+            sys.exit(1)
 
     try:
         engine_path = find_stockfish()
@@ -326,6 +369,8 @@ def search_cmd(
         player_speeds=player_speeds,
         opponent_speeds=opponent_speeds,
         player_local_only=effective_local_only,
+        masters_db=Path(masters_db) if masters_db else None,
+        polyglot_book=Path(polyglot_book) if polyglot_book else None,
     )
 
     click.echo("\n[mysecond] Walking theory …")
@@ -396,8 +441,8 @@ def search_cmd(
 @click.option(
     "--color",
     required=True,
-    type=click.Choice(["white", "black"]),
-    help="Fetch games where the player was this colour.",
+    type=click.Choice(["white", "black", "both"]),
+    help="Fetch games where the player was this colour (both = one download for both books).",
 )
 @click.option(
     "--platform",
@@ -424,7 +469,7 @@ def search_cmd(
     "max_games",
     default=10_000,
     show_default=True,
-    help="Maximum number of games to download.",
+    help="Maximum number of games to download, across all of --speeds.",
 )
 @click.option(
     "--max-plies",
@@ -478,6 +523,9 @@ def fetch_cmd(
       mysecond fetch-player-games --username Hikaru --platform chesscom \\
           --color white --speeds blitz,rapid
 
+      # Both colours from a single download:
+      mysecond fetch-player-games --username GothamChess --color both
+
       # Incremental update (merge new games into existing cache):
       mysecond fetch-player-games --username GothamChess --color white \\
           --since 2024-01-01
@@ -566,8 +614,16 @@ def fetch_cmd(
 @click.option(
     "--color",
     required=True,
-    type=click.Choice(["white", "black"]),
-    help="Index games where the player was this colour.",
+    type=click.Choice(["white", "black", "both"]),
+    help="Index games where the player was this colour (both needs --player).",
+)
+@click.option(
+    "--player",
+    default=None,
+    help=(
+        "Only index games of this player, matched against the White/Black "
+        "tags (e.g. 'Carlsen, Magnus') — for large databases such as TWIC."
+    ),
 )
 @click.option(
     "--max-plies",
@@ -587,6 +643,7 @@ def import_pgn_cmd(
     pgn_path: str,
     username: str,
     color: str,
+    player: str | None,
     max_plies: int,
     db_path: str,
 ) -> None:
@@ -594,7 +651,8 @@ def import_pgn_cmd(
 
     Use this instead of fetch-player-games when the player's Lichess
     account is inactive or you want to use OTB games from another source
-    (chessgames.com, FIDE, TWIC, etc.).
+    (chessgames.com, FIDE, TWIC, etc.).  Imported games are added to any
+    fetched ones; importing again replaces the previous import.
 
     \b
     Example workflow:
@@ -602,11 +660,17 @@ def import_pgn_cmd(
       mysecond import-pgn-player --pgn levy.pgn --username GothamChess --color white
       # 2. Now search using his real repertoire:
       mysecond search --player GothamChess --opponent im_eric_rosen --side white ...
+
+      # One player's games from a multi-gigabyte database (.pgn, .gz or .bz2):
+      mysecond import-pgn-player --pgn twic.pgn.gz --username Carlsen \\
+          --player "Carlsen, Magnus" --color both
     """
     p = Path(pgn_path)
     if not p.exists():
         click.echo(f"Error: PGN file not found: {p}", err=True)
         sys.exit(1)
+    if color == "both" and not player:
+        raise click.BadParameter("--color both needs --player", param_hint="--color")
 
     db = Path(db_path)
     with Cache(db) as cache:
@@ -617,6 +681,7 @@ def import_pgn_cmd(
             cache=cache,
             max_plies=max_plies,
             verbose=True,
+            player=player,
         )
 
     if count == 0:
@@ -624,6 +689,78 @@ def import_pgn_cmd(
         sys.exit(1)
 
 
+# ---------------------------------------------------------------------------
+# build-masters-db
+# ---------------------------------------------------------------------------
+
+
+@main.command("build-masters-db")
+@click.argument("pgn_paths", nargs=-1, required=True)
+@click.option(
+    "--db",
+    "db_path",
+    default=str(_MASTERS_DB),
+    show_default=True,
+    help="Path to the local masters index (created if missing).",
+)
+@click.option(
+    "--max-plies",
+    "max_plies",
+    default=30,
+    show_default=True,
+    help="Index each game's first N half-moves.",
+)
+@click.option(
+    "--min-elo",
+    "min_elo",
+    default=2200,
+    show_default=True,
+    help="Skip games where either player is rated below this (0 = keep all).",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    default=False,
+    help="Re-import files that were already imported (counts their games again).",
+)
+def build_masters_db_cmd(
+    pgn_paths: tuple[str, ...],
+    db_path: str,
+    max_plies: int,
+    min_elo: int,
+    force: bool,
+) -> None:
+    """Index bulk OTB PGN files (TWIC, federation exports) for offline search.
+
+    Accepts plain, .gz and .bz2 PGN files and directories of them.  Files
+    already in the index are skipped, so the command can be re-run as new
+    TWIC issues arrive.
+
+    \b
+    Example:
+      mysecond build-masters-db twic/*.pgn
+      mysecond search --masters-db data/masters.sqlite --side white ...
+    """
+    paths: list[Path] = []
+    for raw in pgn_paths:
+        p = Path(raw)
+        if p.is_dir():
+            paths.extend(sorted(
+                f for f in p.iterdir()
+                if f.suffix in (".pgn", ".gz", ".bz2") and f.is_file()
+            ))
+        elif p.exists():
+            paths.append(p)
+        else:
+            click.echo(f"Error: PGN file not found: {p}", err=True)
+            sys.exit(1)
+
+    games = build_masters_db(
+        paths, Path(db_path), max_plies=max_plies, min_elo=min_elo, force=force,
+    )
+    click.echo(f"[masters-db] Added {games:,} games to {db_path}")
+
+
 # ---------------------------------------------------------------------------
 # analyse-habits
 # ---------------------------------------------------------------------------
@@ -1076,3 +1213,171 @@ def train_bot_cmd(
         )
 
     click.echo("\n[train-bot] Done.")
+
+
+# ---------------------------------------------------------------------------
+# compress-shards
+# ---------------------------------------------------------------------------
+
+
+@main.command("compress-shards")
+@click.option(
+    "--idle-days",
+    "idle_days",
+    default=30.0,
+    show_default=True,
+    help="Compress player-book shards not written for this many days.",
+)
+@click.option(
+    "--db",
+    "db_path",
+    default=str(_FETCH_DB),
+    show_default=True,
+    help="Path to the SQLite cache database.",
+)
+def compress_shards_cmd(idle_days: float, db_path: str) -> None:
+    """Gzip cold per-player opening-book shards to save disk space.
+
+    Compressed shards are restored automatically the next time the player's
+    book is read.  Run from a maintenance job (e.g. nightly cron); shards
+    open in a running process (such as the web server) are skipped.
+    """
+    written = compress_cold_shards(Path(db_path), max_idle_days=idle_days)
+    for path in written:
+        click.echo(f"[shards] Compressed {path.name}")
+    click.echo(f"[shards] {len(written)} cold shard(s) compressed.")
+
+
+# ---------------------------------------------------------------------------
+# eval-cache
+# ---------------------------------------------------------------------------
+
+
+@main.group("eval-cache")
+def eval_cache_group() -> None:
+    """Share Stockfish evaluations between hosts via snapshot files."""
+
+
+@eval_cache_group.command("export")
+@click.option(
+    "--out",
+    "out_path",
+    required=True,
+    help="Snapshot file to write (gzip-compressed JSON lines, sorted by FEN).",
+)
+@click.option(
+    "--since-ts",
+    "since_ts",
+    type=float,
+    default=None,
+    help="Only export rows written after this Unix timestamp (incremental).",
+)
+@click.option(
+    "--after",
+    "after_path",
+    default=None,
+    help="Only export rows newer than the watermark of this earlier snapshot.",
+)
+@click.option(
+    "--db",
+    "db_path",
+    default="data/evals.sqlite",
+    show_default=True,
+    help="Path to the eval-cache SQLite database.",
+)
+def eval_cache_export_cmd(
+    out_path: str,
+    since_ts: float | None,
+    after_path: str | None,
+    db_path: str,
+) -> None:
+    """Export the eval cache to a portable snapshot file.
+
+    \b
+    Example (nightly incremental sync):
+      mysecond eval-cache export --out evals-full.jsonl.gz
+      mysecond eval-cache export --after evals-full.jsonl.gz --out evals-delta.jsonl.gz
+    """
+    if since_ts is not None and after_path is not None:
+        raise click.UsageError("--since-ts and --after are mutually exclusive.")
+    if after_path is not None:
+        try:
+            since_ts = read_snapshot_header(Path(after_path)).get("watermark")
+        except (OSError, EOFError, ValueError) as exc:   # EOFError: truncated gzip
+            click.echo(f"Error: cannot read {after_path}: {exc}", err=True)
+            sys.exit(1)
+
+    eval_cache = EvalCache(Path(db_path))
+    result = eval_cache.export_snapshot(Path(out_path), since_ts=since_ts)
+    click.echo(
+        f"[eval-cache] Exported {result['rows']:,} positions → {out_path}  "
+        f"(watermark={result['watermark']})"
+    )
+
+
+@eval_cache_group.command("import")
+@click.argument("snapshots", nargs=-1, required=True)
+@click.option(
+    "--db",
+    "db_path",
+    default="data/evals.sqlite",
+    show_default=True,
+    help="Path to the eval-cache SQLite database.",
+)
+def eval_cache_import_cmd(snapshots: tuple[str, ...], db_path: str) -> None:
+    """Merge one or more snapshot files into the local eval cache.
+
+    Deeper evaluations win; on equal depth the one with more lines, and on a
+    full tie the local row is kept.
+    """
+    eval_cache = EvalCache(Path(db_path))
+    for snapshot in snapshots:
+        try:
+            result = eval_cache.import_snapshot(Path(snapshot))
+        except (OSError, EOFError, ValueError) as exc:   # EOFError: truncated gzip
+            click.echo(f"Error: cannot import {snapshot}: {exc}", err=True)
+            sys.exit(1)
+        click.echo(f"[eval-cache] Merged {result['rows']:,} positions from {snapshot}")
+    stats = eval_cache.stats()
+    click.echo(
+        f"[eval-cache] Cache now holds {stats['positions']:,} positions "
+        f"(max depth {stats['max_depth']})."
+    )
+
+
+# ---------------------------------------------------------------------------
+# net-serve
+# ---------------------------------------------------------------------------
+
+
+@main.command("net-serve")
+@click.option(
+    "--archive",
+    "archive_path",
+    default=str(_NET_ARCHIVE),
+    show_default=True,
+    help="Recorded exchanges to serve (from MYSECOND_NET_MODE=record).",
+)
+@click.option("--host", default="127.0.0.1", show_default=True, help="Interface to bind.")
+@click.option("--port", default=8765, show_default=True, help="Port to listen on.")
+def net_serve_cmd(archive_path: str, host: str, port: int) -> None:
+    """Run a local stand-in for the Lichess and Chess.com endpoints.
+
+    Requests are answered from the archive; anything not recorded gets an
+    empty but valid answer (no explorer games, no archived games).  Point
+    other commands at it with MYSECOND_NET_SERVER.
+
+    \b
+    Example:
+      MYSECOND_NET_MODE=record mysecond search ...      (capture once)
+      mysecond net-serve &
+      MYSECOND_NET_SERVER=http://127.0.0.1:8765 mysecond search ...
+    """
+    server = net_serve(Path(archive_path), host=host, port=port)
+    click.echo(f"[net-serve] Serving {archive_path} on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -6,10 +6,20 @@ Keyed on FEN string. Stores the top N best moves with their centipawn scores
 Thread-safe: each thread gets its own SQLite connection (via threading.local);
 writes are serialised with a threading.Lock so concurrent workers don't
 corrupt the on-disk WAL.
+
+Snapshots
+---------
+:meth:`EvalCache.export_snapshot` and :meth:`EvalCache.import_snapshot` move
+evaluations between hosts as a gzip-compressed JSON-lines file sorted by FEN.
+The first line is a header carrying the format version and a *watermark* (the
+newest ``ts`` in the file); passing it back as ``since_ts`` exports only rows
+written after the previous snapshot.  Imports follow the same "deeper wins"
+rule as :meth:`EvalCache.put`, breaking depth ties on the number of lines.
 """
 
 from __future__ import annotations
 
+import gzip
 import json
 import sqlite3
 import threading
@@ -30,6 +40,45 @@ CREATE TABLE IF NOT EXISTS eval_cache (
 # qualifying-move count in habits analysis (capped at 20 in habits.py).
 MAX_MULTIPV = 20
 
+# Snapshot file format version (first-line header).
+SNAPSHOT_VERSION = 1
+
+# Rows per executemany() batch when importing a snapshot.
+_IMPORT_BATCH = 5_000
+
+# When an incoming row replaces the stored one in put(): it is deeper, or as
+# deep with at least as many lines (a corrupt stored row always loses).
+_PUT_WINS = """(
+    excluded.depth > eval_cache.depth
+    OR (excluded.depth = eval_cache.depth
+        AND (NOT json_valid(eval_cache.moves_json)
+             OR json_array_length(excluded.moves_json)
+                >= json_array_length(eval_cache.moves_json)))
+)"""
+
+# Deeper-wins merge used by snapshot imports: on equal depth the row with
+# more lines wins, and the local row on a full tie.  Unlike put(), the
+# incoming ts is kept only when the incoming row wins, so re-importing a
+# snapshot does not make unchanged rows look new to the next incremental
+# export.
+_IMPORT_WINS = """(
+    excluded.depth > eval_cache.depth
+    OR (excluded.depth = eval_cache.depth
+        AND (NOT json_valid(eval_cache.moves_json)
+             OR json_array_length(excluded.moves_json)
+                > json_array_length(eval_cache.moves_json)))
+)"""
+_MERGE_SQL = f"""
+INSERT INTO eval_cache (fen, depth, moves_json, ts)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(fen) DO UPDATE SET
+    moves_json = CASE WHEN {_IMPORT_WINS}
+                      THEN excluded.moves_json ELSE eval_cache.moves_json END,
+    ts         = CASE WHEN {_IMPORT_WINS}
+                      THEN excluded.ts         ELSE eval_cache.ts         END,
+    depth      = MAX(excluded.depth, eval_cache.depth)
+"""
+
 
 class EvalCache:
     """Read/write cache for Stockfish MultiPV evaluations.
@@ -88,8 +137,9 @@ class EvalCache:
     def put(self, fen: str, depth: int, moves: list[dict]) -> None:
         """Store a list of ``{"uci", "white_cp"}`` dicts.
 
-        Only overwrites an existing entry if *depth* >= the stored depth,
-        ensuring we never replace a deeper result with a shallower one.
+        Only overwrites an existing entry if *depth* is greater than the
+        stored depth, or equal with at least as many lines, ensuring we never
+        replace a deeper or wider result with a poorer one.
         """
         if not moves:
             return
@@ -101,12 +151,11 @@ class EvalCache:
                     INSERT INTO eval_cache (fen, depth, moves_json, ts)
                     VALUES (?, ?, ?, ?)
                     ON CONFLICT(fen) DO UPDATE SET
-                        depth      = CASE WHEN excluded.depth >= eval_cache.depth
-                                          THEN excluded.depth      ELSE eval_cache.depth      END,
-                        moves_json = CASE WHEN excluded.depth >= eval_cache.depth
+                        moves_json = CASE WHEN {wins}
                                           THEN excluded.moves_json ELSE eval_cache.moves_json END,
+                        depth      = MAX(excluded.depth, eval_cache.depth),
                         ts         = excluded.ts
-                    """,
+                    """.format(wins=_PUT_WINS),
                     (fen, depth, moves_json, time.time()),
                 )
                 self._conn().commit()
@@ -124,10 +173,102 @@ class EvalCache:
         except sqlite3.Error:
             return {"positions": 0, "max_depth": None}
 
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def export_snapshot(self, out_path: Path, since_ts: float | None = None) -> dict:
+        """Write a sorted, gzip-compressed snapshot of the cache to *out_path*.
+
+        When *since_ts* is given only rows written after that Unix timestamp
+        are exported (incremental mode).
+
+        Returns ``{"rows": int, "watermark": float | None}`` where
+        *watermark* is the newest ``ts`` written; pass it as *since_ts* on the
+        next export to continue from this snapshot.
+        """
+        query = "SELECT fen, depth, moves_json, ts FROM eval_cache"
+        params: tuple = ()
+        if since_ts is not None:
+            query += " WHERE ts > ?"
+            params = (since_ts,)
+        query += " ORDER BY fen"
+
+        conn = self._conn()
+        watermark_row = conn.execute(
+            "SELECT MAX(ts) FROM eval_cache" + (" WHERE ts > ?" if since_ts is not None else ""),
+            params,
+        ).fetchone()
+        watermark = watermark_row[0] if watermark_row else None
+        if watermark is None:
+            watermark = since_ts
+
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = out_path.with_name(out_path.name + ".tmp")
+        rows = 0
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+            header = {
+                "format": "mysecond-evals",
+                "version": SNAPSHOT_VERSION,
+                "since": since_ts,
+                "watermark": watermark,
+            }
+            fh.write(json.dumps(header, separators=(",", ":")) + "\n")
+            for fen, depth, moves_json, ts in conn.execute(query, params):
+                try:
+                    moves = json.loads(moves_json)
+                except (json.JSONDecodeError, TypeError):
+                    continue  # corrupt row — get() would ignore it too
+                fh.write(json.dumps([fen, depth, moves, ts], separators=(",", ":")) + "\n")
+                rows += 1
+        tmp_path.replace(out_path)
+        return {"rows": rows, "watermark": watermark}
+
+    def import_snapshot(self, in_path: Path) -> dict:
+        """Merge a snapshot written by :meth:`export_snapshot` into the cache.
+
+        Rows are merged with the "deeper wins" rule of :meth:`put`; on equal
+        depth the row with more lines wins, and on a full tie the local row
+        (and its ``ts``) is kept.
+
+        Returns ``{"rows": int, "watermark": float | None}``.
+
+        Raises ``ValueError`` if *in_path* is not a snapshot file.
+        """
+        rows = 0
+        with gzip.open(in_path, "rt", encoding="utf-8") as fh:
+            header = _parse_snapshot_header(fh.readline())
+            batch: list[tuple[str, int, str, float]] = []
+            for line in fh:
+                if not line.strip():
+                    continue
+                fen, depth, moves, ts = json.loads(line)
+                if not moves:
+                    continue
+                batch.append((
+                    fen,
+                    int(depth),
+                    json.dumps(moves[:MAX_MULTIPV], separators=(",", ":")),
+                    float(ts),
+                ))
+                if len(batch) >= _IMPORT_BATCH:
+                    rows += self._merge_rows(batch)
+                    batch = []
+            if batch:
+                rows += self._merge_rows(batch)
+        return {"rows": rows, "watermark": header.get("watermark")}
+
     # ------------------------------------------------------------------
     # Internals
     # ------------------------------------------------------------------
 
+    def _merge_rows(self, batch: list[tuple[str, int, str, float]]) -> int:
+        with self._write_lock:
+            conn = self._conn()
+            conn.executemany(_MERGE_SQL, batch)
+            conn.commit()
+        return len(batch)
+
     def _conn(self) -> sqlite3.Connection:
         """Return (or create) a per-thread SQLite connection."""
         conn = getattr(self._local, "conn", None)
@@ -147,3 +288,25 @@ class EvalCache:
         conn = self._conn()
         conn.execute(_DDL)
         conn.commit()
+
+
+def read_snapshot_header(path: Path) -> dict:
+    """Return the header dict of the snapshot file at *path*."""
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return _parse_snapshot_header(fh.readline())
+
+
+def _parse_snapshot_header(line: str) -> dict:
+    """Parse and validate the first line of a snapshot file."""
+    try:
+        header = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError("not an eval-cache snapshot (bad header)") from exc
+    if not isinstance(header, dict) or header.get("format") != "mysecond-evals":
+        raise ValueError("not an eval-cache snapshot")
+    if header.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"unsupported snapshot version {header.get('version')!r} "
+            f"(expected {SNAPSHOT_VERSION})"
+        )
+    return header
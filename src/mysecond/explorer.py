@@ -18,17 +18,48 @@ cross-checked against Mega before committing a novelty to serious play.
 from __future__ import annotations
 
 import os
+import threading
 import time
-from typing import Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable
 
 import requests
 
-from .cache import Cache
+from . import netmode, ratelimit
+from .cache import Cache, _norm_fen
 from .models import ExplorerData, MoveStats
 
 _LICHESS_MASTERS_URL = "https://explorer.lichess.ovh/masters"
 _DEFAULT_BACKEND = "lichess_masters"
 
+# Per-backend freshness: seconds after which a cached response is stale.  A
+# stale entry is still returned immediately and refreshed in the background.
+# Backends not listed (or mapped to None) never go stale.
+_TTL_RULES: dict[str, float | None] = {
+    _DEFAULT_BACKEND: 30 * 86_400,   # masters DB gains new games ~monthly
+}
+
+# How long a refused lookup (a 4xx answer other than 429) is remembered.
+# Within this window get_data() returns None without touching the network.
+# Rate limiting, server and network errors are never remembered: the position
+# itself is fine and the next lookup may well succeed.
+_NEGATIVE_TTL = 15 * 60
+
+# Failed lookups are recorded under "<backend>:failed" so they never shadow
+# real responses in the backend itself.  A later successful fetch deletes the
+# record; expired ones are purged whenever an explorer is created.
+_NEGATIVE_SUFFIX = ":failed"
+
+# Singleflight: how long a fetch may hold its (fen, backend) lease before
+# waiters give up on it, and how often cross-process waiters poll the cache.
+_LEASE_TTL = 60.0
+_LEASE_POLL = 0.1
+
+# Background prefetch workers per explorer.  Their requests share the
+# endpoint's rate-limit bucket with everything else (see ratelimit.py).
+_PREFETCH_WORKERS = 2
+
+
 def _build_headers() -> dict[str, str]:
     h = {
         "Accept": "application/json",
@@ -40,18 +71,213 @@ def _build_headers() -> dict[str, str]:
     return h
 
 
+def _new_session() -> requests.Session:
+    session = netmode.session()
+    session.headers.update(_build_headers())
+    return session
+
+
+class Prefetcher:
+    """Fetch positions in the background before a caller asks for them.
+
+    Used by the explorers so the theory walk can request the children it is
+    about to visit while it is busy with the engine.  Concurrency is bounded
+    two ways: at most *workers* requests are in flight, and every request —
+    foreground ones included, via :meth:`pace` — takes a token from the
+    shared *endpoint* bucket in :mod:`mysecond.ratelimit`, so prefetching
+    never raises the request rate above the endpoint's limit.
+
+    Parameters
+    ----------
+    fetch:
+        ``fetch(fen, session)`` — fetches and caches *fen*.  Called with one
+        :class:`requests.Session` per worker thread.
+    make_session:
+        Factory for the worker sessions.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, requests.Session], object],
+        make_session: Callable[[], requests.Session],
+        endpoint: str = "lichess-explorer",
+        workers: int = _PREFETCH_WORKERS,
+        name: str = "explorer-prefetch",
+    ) -> None:
+        self._fetch = fetch
+        self._make_session = make_session
+        self._endpoint = endpoint
+        self._workers = workers
+        self._name = name
+        self._pool: ThreadPoolExecutor | None = None
+        self._inflight: dict[str, Future[None]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sessions: list[requests.Session] = []
+
+    def pace(self) -> None:
+        """Block until the next request to the endpoint may start."""
+        ratelimit.acquire(self._endpoint)
+
+    def submit(self, fens: Iterable[str]) -> None:
+        """Queue background fetches for *fens* not already in flight."""
+        with self._lock:
+            for fen in fens:
+                if fen in self._inflight:
+                    continue
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self._workers, thread_name_prefix=self._name,
+                    )
+                self._inflight[fen] = self._pool.submit(self._run, fen)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        for session in self._sessions:
+            session.close()
+        self._sessions = []
+
+    def _run(self, fen: str) -> None:
+        try:
+            session = getattr(self._local, "session", None)
+            if session is None:
+                session = self._make_session()
+                self._local.session = session
+                with self._lock:
+                    self._sessions.append(session)
+            self._fetch(fen, session)
+        finally:
+            with self._lock:
+                self._inflight.pop(fen, None)
+
+
+# (normalised fen, backend) → event set when this process's fetch of it ends.
+_inflight: dict[tuple[str, str], threading.Event] = {}
+_inflight_lock = threading.Lock()
+
+
+def fetch_once(
+    cache: Cache,
+    fen: str,
+    backend: str,
+    fetch: Callable[[], dict[str, Any] | None],
+) -> dict[str, Any] | None:
+    """Fetch and cache (fen, backend) with *fetch*, unless someone already is.
+
+    Singleflight: at most one fetch per key is in flight.  Within a process,
+    concurrent callers wait for the first one's result; across processes
+    sharing *cache*'s file, a lease row (:meth:`Cache.try_fetch_lease`) does
+    the same and waiters poll the cache for the result.  If the fetch they
+    waited for failed, waiters fetch for themselves.
+
+    Returns the response (also written to *cache*), or None on failure.
+    """
+    key = (_norm_fen(fen), backend)
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _inflight[key] = threading.Event()
+    if not leader:
+        event.wait(_LEASE_TTL)
+        cached = cache.get(fen, backend)
+        return cached if cached is not None else _fetch_and_store(cache, fen, backend, fetch)
+    try:
+        return _fetch_leased(cache, fen, backend, fetch)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
+
+
+def _fetch_leased(
+    cache: Cache,
+    fen: str,
+    backend: str,
+    fetch: Callable[[], dict[str, Any] | None],
+) -> dict[str, Any] | None:
+    if not cache.try_fetch_lease(fen, backend, _LEASE_TTL):
+        # Another process is fetching this position: wait for its result.
+        deadline = time.monotonic() + _LEASE_TTL
+        waiting = cache.wait_on_fetch_lease(fen, backend)
+        while waiting and time.monotonic() < deadline:
+            time.sleep(_LEASE_POLL)
+            cached = cache.get(fen, backend)
+            if cached is not None:
+                return cached
+            waiting = cache.fetch_lease_active(fen, backend)
+        cached = cache.get(fen, backend)
+        return cached if cached is not None else _fetch_and_store(cache, fen, backend, fetch)
+    raw = None
+    try:
+        raw = fetch()
+        return raw
+    finally:
+        # Stores the result and drops the lease in one write.
+        cache.release_fetch_lease(fen, backend, raw)
+
+
+def _fetch_and_store(
+    cache: Cache,
+    fen: str,
+    backend: str,
+    fetch: Callable[[], dict[str, Any] | None],
+) -> dict[str, Any] | None:
+    raw = fetch()
+    if raw is not None:
+        cache.set(fen, backend, raw)
+    return raw
+
+
 class LichessExplorer:
     """Fetches full opening-explorer data (aggregate + per-move) for a position.
 
     Responses are cached in SQLite, keyed by ``(fen, backend)``.
-    HTTP 429 responses are retried with exponential back-off.
+    Requests go through the shared ``lichess-explorer`` rate limit
+    (:mod:`mysecond.ratelimit`); HTTP 429 responses are retried once it allows.
+
+    Cached responses older than the backend's TTL (see ``_TTL_RULES``) are
+    served as-is while one background thread re-fetches them
+    (stale-while-revalidate).  Lookups the service refuses (4xx other
+    than 429) are cached for *negative_ttl* seconds so a walk never asks
+    for the same position twice.
+
+    :meth:`prefetch` fetches positions the caller is about to ask for on
+    background threads, sharing the request pacing of the foreground
+    fetches (see :class:`Prefetcher`).  Every network fetch goes through
+    :func:`fetch_once`, so concurrent jobs asking for the same position
+    share one request.
     """
 
-    def __init__(self, cache: Cache, backend: str = _DEFAULT_BACKEND) -> None:
+    def __init__(
+        self,
+        cache: Cache,
+        backend: str = _DEFAULT_BACKEND,
+        negative_ttl: float = _NEGATIVE_TTL,
+        revalidate: bool = True,
+    ) -> None:
         self._cache = cache
         self._backend = backend
-        self._session = requests.Session()
-        self._session.headers.update(_build_headers())
+        self._ttl = _TTL_RULES.get(backend)
+        self._negative_ttl = negative_ttl
+        self._negative_backend = backend + _NEGATIVE_SUFFIX
+        if negative_ttl > 0:
+            cache.clear_backend(self._negative_backend, older_than=time.time() - negative_ttl)
+        self._session = _new_session()
+        self._revalidate = revalidate
+        self._revalidator: ThreadPoolExecutor | None = None
+        self._bg_session: requests.Session | None = None   # revalidator thread only
+        self._revalidating: set[str] = set()
+        self._revalidating_lock = threading.Lock()
+        self._prefetcher = Prefetcher(
+            fetch=lambda fen, session: fetch_once(
+                cache, fen, backend,
+                lambda: self._fetch(fen, max_retries=1, session=session)[0],
+            ),
+            make_session=_new_session,
+        )
 
     # ------------------------------------------------------------------
     # Public API
@@ -59,40 +285,123 @@ class LichessExplorer:
 
     def get_data(self, fen: str) -> ExplorerData | None:
         """Return full explorer data for *fen*, using the cache first."""
-        cached = self._cache.get(fen, self._backend)
-        if cached is not None:
+        hit = self._cache.get_with_ts(fen, self._backend)
+        if hit is not None:
+            cached, ts = hit
+            if self._ttl is not None and time.time() - ts > self._ttl:
+                self._schedule_revalidation(fen)
             return self._parse(cached)
 
-        raw = self._fetch(fen)
-        if raw is None:
+        failed = self._failed_at(fen)
+        if failed is not None and time.time() - failed < self._negative_ttl:
             return None
 
-        self._cache.set(fen, self._backend, raw)
+        # Joins an in-flight prefetch (or another job's fetch) of this FEN.
+        raw = fetch_once(self._cache, fen, self._backend, lambda: self._fetch_or_fail(fen))
+        if raw is None:
+            return None
+        if failed is not None:
+            self._cache.delete(fen, self._negative_backend)
         return self._parse(raw)
 
+    def prefetch(self, fens: Iterable[str]) -> None:
+        """Start fetching uncached *fens* in the background."""
+        self._prefetcher.submit(
+            fen for fen in fens
+            if self._cache.get_with_ts(fen, self._backend) is None
+            and not self._is_negative(fen)
+        )
+
     # ------------------------------------------------------------------
     # Internals
     # ------------------------------------------------------------------
 
-    def _fetch(self, fen: str, max_retries: int = 5) -> dict[str, Any] | None:
+    def _is_negative(self, fen: str) -> bool:
+        """True if a recent lookup of *fen* failed (see *negative_ttl*)."""
+        failed = self._failed_at(fen)
+        return failed is not None and time.time() - failed < self._negative_ttl
+
+    def _failed_at(self, fen: str) -> float | None:
+        """When the recorded failed lookup of *fen* happened, if there is one."""
+        if self._negative_ttl <= 0:
+            return None
+        failed = self._cache.get_with_ts(fen, self._negative_backend)
+        return failed[1] if failed is not None else None
+
+    def _fetch_or_fail(self, fen: str) -> dict[str, Any] | None:
+        """:meth:`_fetch` *fen*, unless a recent lookup was refused; record a refusal.
+
+        Callers that waited on another fetch of *fen* get here when it
+        produced nothing; they find its refusal instead of retrying.  The
+        refusal is recorded before :func:`fetch_once` releases the lease, so
+        waiting processes see it too.
+        """
+        if self._is_negative(fen):
+            return None
+        raw, refused = self._fetch(fen)
+        if refused and self._negative_ttl > 0:
+            self._cache.set(fen, self._negative_backend, {"failed": True})
+        return raw
+
+    def _fetch(
+        self,
+        fen: str,
+        max_retries: int = 5,
+        session: requests.Session | None = None,
+    ) -> tuple[dict[str, Any] | None, bool]:
+        """Return ``(payload, refused)`` for *fen*.
+
+        *payload* is None on any failure; *refused* is True only if the
+        service answered with a client error other than 429, i.e. it has no
+        data for this request.  Running out of retries on 429s, server
+        errors and network errors leave it False.
+        """
+        session = session or self._session
         params: dict[str, str] = {"fen": fen}
         for attempt in range(max_retries):
+            self._prefetcher.pace()
             try:
-                resp = self._session.get(
+                resp = session.get(
                     _LICHESS_MASTERS_URL,
                     params=params,
                     timeout=10,
                 )
+                ratelimit.record_response("lichess-explorer", resp)
                 if resp.status_code == 200:
-                    return resp.json()
+                    return resp.json(), False
                 if resp.status_code == 429:
-                    time.sleep(2 ** attempt)
-                    continue
-                return None
+                    continue   # the shared bucket now holds every caller back
+                return None, 400 <= resp.status_code < 500
             except requests.RequestException:
                 if attempt < max_retries - 1:
                     time.sleep(2 ** attempt)
-        return None
+        return None, False
+
+    def _schedule_revalidation(self, fen: str) -> None:
+        """Queue a background refresh of a stale entry (at most one per FEN)."""
+        if not self._revalidate:
+            return
+        with self._revalidating_lock:
+            if fen in self._revalidating:
+                return
+            self._revalidating.add(fen)
+            if self._revalidator is None:
+                self._revalidator = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="explorer-revalidate",
+                )
+        self._revalidator.submit(self._revalidate_one, fen)
+
+    def _revalidate_one(self, fen: str) -> None:
+        try:
+            # A single attempt: on failure the stale entry simply stays put.
+            if self._bg_session is None:
+                self._bg_session = _new_session()
+            raw, _ = self._fetch(fen, max_retries=1, session=self._bg_session)
+            if raw is not None:
+                self._cache.set(fen, self._backend, raw)
+        finally:
+            with self._revalidating_lock:
+                self._revalidating.discard(fen)
 
     @staticmethod
     def _parse(data: dict[str, Any]) -> ExplorerData:
@@ -119,6 +428,13 @@ class LichessExplorer:
     # ------------------------------------------------------------------
 
     def close(self) -> None:
+        self._prefetcher.close()
+        if self._revalidator is not None:
+            # Drop queued refreshes; let an in-flight one finish its write.
+            self._revalidator.shutdown(wait=True, cancel_futures=True)
+            self._revalidator = None
+        if self._bg_session is not None:
+            self._bg_session.close()
         self._session.close()
 
     def __enter__(self) -> "LichessExplorer":
@@ -8,23 +8,46 @@ HTTP requests to the rate-limited ``/player`` endpoint.
 
 How it works
 ------------
-1. The Lichess games export API (``GET /api/games/user/{username}``) streams
-   all games for a player in PGN format, optionally filtered by time control,
-   colour, and date range.
-2. python-chess parses each game.  We walk every game's moves up to
+1. :func:`sync_player_games` adds the player's games that are missing from
+   the local :mod:`~mysecond.game_store` — streamed from the Lichess games
+   export API (``GET /api/games/user/{username}``) or read from the Chess.com
+   monthly archives.  Games of both colours are downloaded, so every command
+   that needs the player's games afterwards starts from local data.
+2. The book is built from the stored games: python-chess parses each game.  We walk every game's moves up to
    ``max_plies`` half-moves, recording statistics only for positions where
    it is **the player's turn** (i.e. the colour we care about).
-3. The resulting per-position dict is converted to Lichess-explorer-compatible
-   JSON and written into the shared SQLite cache under the key
-   ``lichess_player_{username}_{color}_{speeds}``.  This is the exact backend
-   key that :class:`~mysecond.repertoire.PlayerExplorer` reads, so the cache
-   transparently shadows the network endpoint.
+3. The per-position counts, accumulated in packed form (:class:`_CompactBook`),
+   are converted to Lichess-explorer-compatible JSON and written into the
+   shared SQLite cache, one book per speed, under the keys
+   ``lichess_player_{username}_{color}_{speed}``.  Reading the key of a
+   speed set (``…_{color}_blitz,rapid``, what
+   :class:`~mysecond.repertoire.PlayerExplorer` reads) adds up the books of
+   its speeds, so the cache transparently shadows the network endpoint for
+   any combination of indexed speeds.
+
+Both colours
+------------
+``color='both'`` routes each stored game by the colour the player had to
+that colour's book.  The two books are parsed in the same pass and written
+together, under the usual per-colour backend keys.
+
+Syncing and resuming
+--------------------
+Downloads are streamed newest first and added to the game store every
+``_CHECKPOINT_GAMES`` games, together with a resume point.  A download that
+is interrupted (network drop, crash) resumes on the next run with ``until``
+set to the oldest game stored so far and fetches only the games it had not
+reached yet.  Later syncs download only games played since the newest
+stored one, plus older games when a request needs more than are stored.
 
 Incremental updates
 -------------------
 Pass ``--since YYYY-MM-DD`` to fetch only games played since that date and
-**merge** their counts into any existing cache entries.  Without ``--since``
-a full rebuild is performed and existing entries are replaced.
+**merge** their counts into any existing cache entries.  Each speed's book
+records its newest game, and a merge adds only newer ones, so fetches for
+overlapping speed sets never count a game twice.  Without ``--since`` a
+full rebuild of the requested speeds is performed: their existing entries
+are cleared first.
 
 Daily cron example::
 
@@ -36,11 +59,16 @@ from __future__ import annotations
 
 import io
 import json
+import os
+import re
 import sys
+import threading
 import time
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
 
 import chess
 import chess.pgn
@@ -52,7 +80,10 @@ except ImportError:
     _CurlSession = None
     _CURL_CFFI_AVAILABLE = False
 
-from .cache import Cache
+from . import chesscom_archives, game_store, netmode, ratelimit
+from .cache import IMPORTED_SUFFIX, Cache
+from .mainline import MainlineGame, iter_mainlines
+from .masters_db import _open_pgn
 
 _LICHESS_GAMES_URL = "https://lichess.org/api/games/user/{username}"
 _CHESSCOM_ARCHIVES_URL = "https://api.chess.com/pub/player/{username}/games/archives"
@@ -66,6 +97,24 @@ _CHESSCOM_HEADERS = {
     "User-Agent": "mysecond/0.1.0 (chess analysis tool; contact@mysecond.app)",
 }
 
+# Games between game-store writes (and resume points) while downloading.
+_CHECKPOINT_GAMES = 1_000
+
+# Upper bound on concurrent Chess.com archive downloads (see _iter_archives).
+_CHESSCOM_MAX_CONCURRENCY = 6
+
+# Games per parse task handed to a worker process.
+_PARSE_CHUNK_GAMES = 250
+
+# A PGN tag line ("[Event ..."); clock comments such as "[%clk" do not match.
+_TAG_LINE = re.compile(r'^\[[A-Za-z0-9_]+\s+"')
+_WHITE_TAG = re.compile(r'^\[White\s+"(.*)"\]\s*$', re.MULTILINE)
+_BLACK_TAG = re.compile(r'^\[Black\s+"(.*)"\]\s*$', re.MULTILINE)
+_TIME_CONTROL_TAG = re.compile(r'^\[TimeControl\s+"(.*)"\]\s*$', re.MULTILINE)
+
+# Games parsed between book writes while importing a PGN file.
+_IMPORT_BATCH_GAMES = 20_000
+
 
 # ---------------------------------------------------------------------------
 # Public API
@@ -74,7 +123,7 @@ _CHESSCOM_HEADERS = {
 
 def fetch_player_games(
     username: str,
-    color: str,                          # 'white' or 'black'
+    color: str,                          # 'white', 'black' or 'both'
     cache: Cache,
     speeds: str = "blitz,rapid,classical",
     max_plies: int = 30,
@@ -85,12 +134,17 @@ def fetch_player_games(
 ) -> int:
     """Download games and populate the cache with per-position statistics.
 
+    Missing games are added to the local game store first
+    (:func:`sync_player_games`); the book is built from the stored games.
+
     Parameters
     ----------
     username:
         Lichess username.
     color:
-        ``'white'`` or ``'black'`` — the colour to index.
+        ``'white'`` or ``'black'`` — the colour to index.  ``'both'``
+        downloads the player's games once and routes each one to the book of
+        the colour they played, filling both colours' backends.
     cache:
         Shared :class:`~mysecond.cache.Cache` instance.
     speeds:
@@ -98,9 +152,10 @@ def fetch_player_games(
     max_plies:
         Walk each game at most this many half-moves deep.
     max_games:
-        Maximum games to download.
+        Index at most this many of the player's latest games, counting all
+        of *speeds* together (and either colour with ``'both'``).
     since_ts:
-        If set, only download games played after this Unix-millisecond timestamp
+        If set, only index games played after this Unix-millisecond timestamp
         and merge into existing cache entries (incremental update).
     verbose:
         Print progress messages.
@@ -108,55 +163,17 @@ def fetch_player_games(
     Returns
     -------
     int
-        Number of unique positions indexed.
+        Number of unique positions indexed (summed over colours).
     """
-    backend = _backend_key(username, color, speeds, platform="lichess")
-
-    if verbose:
-        print(
-            f"[fetch] Downloading {username}'s games as {color} "
-            f"({speeds}) – up to {max_games} games …",
-            flush=True,
-        )
-
-    pgn_text = _download_pgn(username, color, speeds, max_games, since_ts)
-
-    if not pgn_text.strip():
-        if verbose:
-            print("[fetch] No games returned (check username / colour / speeds).")
-        return 0
-
-    if pgn_out is not None:
-        pgn_out.parent.mkdir(parents=True, exist_ok=True)
-        pgn_out.write_text(pgn_text, encoding="utf-8")
-
-    if verbose:
-        print("[fetch] Parsing games and building opening book …", flush=True)
-
-    book = _build_book(pgn_text, color, max_plies, verbose=verbose)
-
-    if not book:
-        if verbose:
-            print("[fetch] No positions extracted.")
-        return 0
-
-    if verbose:
-        print(f"[fetch] Writing {len(book)} positions to cache …", flush=True)
-
-    _store_book(book, cache, backend, merge=since_ts is not None)
-
-    # Record the fetch timestamp so --since can be omitted in future runs.
-    _write_fetch_meta(cache, backend)
-
-    if verbose:
-        print(f"[fetch] Done. {len(book)} positions cached for {username} ({color}).")
-
-    return len(book)
+    return _index_player_games(
+        "lichess", username, color, cache, speeds, max_plies, max_games, since_ts,
+        verbose, pgn_out,
+    )
 
 
 def fetch_player_games_chesscom(
     username: str,
-    color: str,                          # 'white' or 'black'
+    color: str,                          # 'white', 'black' or 'both'
     cache: Cache,
     speeds: str = "blitz,rapid",
     max_plies: int = 30,
@@ -174,7 +191,8 @@ def fetch_player_games_chesscom(
     username:
         Chess.com username (case-insensitive).
     color:
-        ``'white'`` or ``'black'`` — the colour to index.
+        ``'white'`` or ``'black'`` — the colour to index.  ``'both'``
+        downloads each monthly archive once and fills both colours' backends.
     cache:
         Shared :class:`~mysecond.cache.Cache` instance.
     speeds:
@@ -183,9 +201,10 @@ def fetch_player_games_chesscom(
     max_plies:
         Walk each game at most this many half-moves deep.
     max_games:
-        Maximum games to download.
+        Index at most this many of the player's latest games, counting all
+        of *speeds* together (and either colour with ``'both'``).
     since_ts:
-        If set, only download games played after this Unix-millisecond timestamp
+        If set, only index games played after this Unix-millisecond timestamp
         and merge into existing cache entries (incremental update).
     verbose:
         Print progress messages.
@@ -193,49 +212,124 @@ def fetch_player_games_chesscom(
     Returns
     -------
     int
-        Number of unique positions indexed.
+        Number of unique positions indexed (summed over colours).
+    """
+    return _index_player_games(
+        "chesscom", username, color, cache, speeds, max_plies, max_games, since_ts,
+        verbose, pgn_out, show_progress=show_progress, progress_fn=progress_fn,
+    )
+
+
+def _index_player_games(
+    platform: str,
+    username: str,
+    color: str,
+    cache: Cache,
+    speeds: str,
+    max_plies: int,
+    max_games: int,
+    since_ts: int | None,
+    verbose: bool,
+    pgn_out: Path | None,
+    show_progress: bool = True,
+    progress_fn=None,
+) -> int:
+    """Sync the game store, then build the player's book(s) from stored games.
+
+    One book is built per colour and speed (see :func:`_partitions`) from
+    the player's *max_games* latest stored games of the whole speed set.  A
+    merge adds only games newer than those a partition already holds, so
+    speed sets that share a speed never count its games twice.
     """
-    backend = _backend_key(username, color, speeds, platform="chesscom")
+    colors = _colors(color)
+    partitions = _partitions(username, colors, speeds, platform)
+    label = "Chess.com games" if platform == "chesscom" else "games"
 
     if verbose:
         print(
-            f"[fetch] Downloading {username}'s Chess.com games as {color} "
+            f"[fetch] Downloading {username}'s {label} as {color} "
             f"({speeds}) – up to {max_games} games …",
             flush=True,
         )
+    sync_player_games(
+        username, platform, color, speeds, max_games, since_ts, verbose=verbose,
+        show_progress=show_progress, progress_fn=progress_fn,
+    )
 
-    pgn_text = _download_chesscom_pgn(username, color, speeds, max_games, since_ts,
-                                      show_progress=show_progress, progress_fn=progress_fn)
+    merge = since_ts is not None
+    store = game_store.get_store()
+    newest: dict[str, int | None] = {}
 
-    if not pgn_text.strip():
+    # The stored games are handed to the parser pool as they are read.
+    pgn_fh = None
+    if pgn_out is not None:
+        pgn_out.parent.mkdir(parents=True, exist_ok=True)
+        pgn_fh = open(pgn_out, "w", encoding="utf-8")
+    games = 0
+    book_colors = {backend: c for backend, (c, _) in partitions.items()}
+    by_game = {(c, speed.lower()): backend for backend, (c, speed) in partitions.items()}
+    starts: dict[str, int] = {}
+    for backend, (c, speed) in partitions.items():
+        indexed = (_fetch_meta(cache, backend) or {}).get("games_ts") if merge else None
+        if indexed is not None:
+            starts[backend] = indexed + 1
+        newest[backend] = store.newest_ts(platform, username, c, speed)
+    name = username.lower()
+    with _ParallelParser(book_colors, max_plies, _parse_workers()) as parser:
+        try:
+            # One newest-first selection over every speed, so max_games caps
+            # the whole set; each game then goes to its partition's book.
+            for record in store.iter_records(
+                platform, username, color, speeds, since_ts, limit=max_games,
+            ):
+                side = "white" if record.white == name else "black"
+                backend = by_game.get((side, record.speed))
+                if backend is None or record.ts < starts.get(backend, 0):
+                    continue
+                games += 1
+                if pgn_fh is not None:
+                    pgn_fh.write(record.pgn + "\n\n")
+                parser.add(record.pgn, backend)
+        finally:
+            if pgn_fh is not None:
+                pgn_fh.close()
+        books = {b: builder.book for b, builder in parser.collect(verbose=verbose).items()}
+
+    if games == 0:
         if verbose:
             print("[fetch] No games returned (check username / colour / speeds).")
         return 0
 
-    if pgn_out is not None:
-        pgn_out.parent.mkdir(parents=True, exist_ok=True)
-        pgn_out.write_text(pgn_text, encoding="utf-8")
-
+    n_positions = sum(len(book) for book in books.values())
     if verbose:
-        print("[fetch] Parsing games and building opening book …", flush=True)
-
-    book = _build_book(pgn_text, color, max_plies, verbose=verbose)
+        print(
+            f"[fetch] {parser.processed} games parsed, {parser.skipped} skipped, "
+            f"{n_positions} unique positions.",
+            flush=True,
+        )
 
-    if not book:
+    if not n_positions:
         if verbose:
             print("[fetch] No positions extracted.")
         return 0
 
     if verbose:
-        print(f"[fetch] Writing {len(book)} positions to cache …", flush=True)
-
-    _store_book(book, cache, backend, merge=since_ts is not None)
-    _write_fetch_meta(cache, backend)
+        print(f"[fetch] Writing {n_positions} positions to cache …", flush=True)
+
+    if not merge:
+        # Full rebuild: drop positions from games no longer selected, and the
+        # book the combined speed set was stored as before partitioning.
+        combined = {_backend_key(username, c, speeds, platform=platform) for c in colors}
+        for backend in {*partitions, *combined}:
+            cache.clear_backend(backend)
+    _store_books({b: book for b, book in books.items() if book}, cache, merge=merge)
+    for backend in partitions:
+        _write_fetch_meta(cache, backend, newest[backend])
 
     if verbose:
-        print(f"[fetch] Done. {len(book)} positions cached for {username} ({color}).")
+        print(f"[fetch] Done. {n_positions} positions cached for {username} ({color}).")
 
-    return len(book)
+    return n_positions
 
 
 def download_raw_pgn(
@@ -245,23 +339,208 @@ def download_raw_pgn(
     speeds: str = "blitz,rapid,classical",
     max_games: int = 200,
 ) -> str:
-    """Download raw PGN text without building the opening-book cache.
+    """Return the PGN text of the player's latest games without building a book.
 
-    Useful for game-phase analysis that needs the full move sequence.
+    Useful for game-phase analysis that needs the full move sequence.  Games
+    come from the local game store, after :func:`sync_player_games` has
+    added any that are missing.  *color* may be ``'both'`` for the player's
+    games with either colour.
     """
-    if platform == "chesscom":
-        return _download_chesscom_pgn(username, color, speeds, max_games, since_ts=None)
-    return _download_pgn(username, color, speeds, max_games, since_ts=None)
+    sync_player_games(username, platform, color, speeds, max_games, verbose=False)
+    return "\n\n".join(
+        pgn for _, pgn in game_store.get_store().iter_games(
+            platform, username, color, speeds, limit=max_games,
+        )
+    )
+
+
+def sync_player_games(
+    username: str,
+    platform: str = "lichess",
+    color: str = "both",
+    speeds: str = "blitz,rapid,classical",
+    max_games: int = 10_000,
+    since_ts: int | None = None,
+    verbose: bool = True,
+    show_progress: bool = True,
+    progress_fn=None,                    # callable(n, total) → None (Chess.com archives)
+) -> int:
+    """Add the player's games that are missing from the local game store.
+
+    The download covers both colours, whatever *color* is: first an
+    interrupted download is finished, then the games played since the
+    newest stored one are fetched, then older games until the store holds
+    *max_games* games of *color* (or of either colour for ``'both'``) from
+    *since_ts* on, or the player's history is exhausted.
+
+    Each speed in *speeds* is synced separately, with its own record of what
+    has been downloaded, so speed sets that overlap never download the same
+    games twice.  *max_games* counts the games of all of *speeds* together:
+    older games are downloaded in rounds that split what is left of it among
+    the speeds whose history is not exhausted yet.
+
+    Returns
+    -------
+    int
+        Number of games added to the store.
+    """
+    store = game_store.get_store()
+    syncs = [
+        _SpeedSync(store, username, platform, speed, show_progress, progress_fn)
+        for speed in _speed_list(speeds)
+    ]
+    added = 0
+    for sync in syncs:
+        added += sync.newer(verbose)
+
+    active = [sync for sync in syncs if not sync.exhausted(since_ts)]
+    while active:
+        budget = max_games - store.count(platform, username, color, speeds, since_ts)
+        if budget <= 0:
+            break
+        share = -(-budget // len(active))
+        for sync in active:
+            budget = max_games - store.count(platform, username, color, speeds, since_ts)
+            if budget <= 0:
+                break
+            added += sync.older(color, since_ts, min(share, budget))
+        active = [sync for sync in active if not sync.exhausted(since_ts)]
+    if verbose:
+        print(f"[sync] {added} new games stored for {username} ({platform}).", flush=True)
+    return added
+
+
+class _SpeedSync:
+    """Download one speed's games into the store (see :func:`sync_player_games`)."""
+
+    def __init__(
+        self,
+        store: game_store.GameStore,
+        username: str,
+        platform: str,
+        speed: str,
+        show_progress: bool,
+        progress_fn,
+    ) -> None:
+        self._store = store
+        self._username = username
+        self._platform = platform
+        self._speed = speed
+        self._show_progress = show_progress
+        self._progress_fn = progress_fn
+        self.state = store.sync_state(platform, username, speed)
+
+    def newer(self, verbose: bool) -> int:
+        """Finish an interrupted download, then fetch games newer than the store's."""
+        added = 0
+        if self.state.resume is not None:
+            r = self.state.resume
+            if verbose:
+                print(f"[sync] Resuming an interrupted download for {self._username} …", flush=True)
+            added += self._run(r["kind"], r["since"], r["until"], r["limit"], r["newest"])
+        if self.state.newest_ts is not None:
+            added += self._run("newer", self.state.newest_ts, None, None)
+        return added
+
+    def older(self, color: str, since_ts: int | None, want: int) -> int:
+        """Download older games until *want* more games of *color* are stored, or none are left."""
+        target = self._count(color, since_ts) + want
+        added = 0
+        # Downloads hold both colours, so a single-colour request may come up
+        # short; each pass asks only for what is still missing.
+        while not self.exhausted(since_ts):
+            have = self._count(color, since_ts)
+            if have >= target:
+                break
+            until = self.state.oldest_ts - 1 if self.state.oldest_ts is not None else None
+            added += self._run("older", since_ts, until, target - have)
+        return added
+
+    def exhausted(self, since_ts: int | None) -> bool:
+        """True once the store holds this speed's games back to *since_ts* (or the first)."""
+        state = self.state
+        return state.complete or (
+            since_ts is not None and state.oldest_ts is not None and state.oldest_ts <= since_ts
+        )
+
+    def _count(self, color: str, since_ts: int | None) -> int:
+        return self._store.count(self._platform, self._username, color, self._speed, since_ts)
+
+    def _run(self, kind: str, since: int | None, until: int | None, limit: int | None,
+             newest: int | None = None) -> int:
+        """Download one range (newest first) into the store and update the sync state."""
+        store, platform, username, speed, state = (
+            self._store, self._platform, self._username, self._speed, self.state,
+        )
+        added = downloaded = 0
+        oldest: int | None = None
+        batch: list[game_store.GameRecord] = []
+
+        def flush() -> None:
+            nonlocal added
+            added += store.add(platform, batch)
+            batch.clear()
+            state.resume = {
+                "kind": kind, "since": since, "until": until if oldest is None else oldest,
+                "limit": None if limit is None else limit - downloaded, "newest": newest,
+            }
+            store.save_sync_state(platform, username, speed, state)
+
+        for pgn in _download_games(
+            platform, username, speed, limit, since, until,
+            show_progress=self._show_progress, progress_fn=self._progress_fn,
+        ):
+            record = game_store.game_record(platform, pgn)
+            if record is None:
+                continue
+            downloaded += 1
+            if record.ts:
+                newest = max(newest or record.ts, record.ts)
+                oldest = min(oldest or record.ts, record.ts)
+            batch.append(record)
+            if len(batch) >= _CHECKPOINT_GAMES:
+                flush()
+        added += store.add(platform, batch)
+
+        if newest is not None:
+            state.newest_ts = max(state.newest_ts or newest, newest)
+        if kind == "older":
+            if limit is not None and downloaded >= limit:
+                state.oldest_ts = oldest
+            elif since is not None:
+                state.oldest_ts = since          # covered down to the requested date
+            else:
+                state.complete = True            # reached the player's first game
+                state.oldest_ts = oldest if oldest is not None else state.oldest_ts
+        state.resume = None
+        store.save_sync_state(platform, username, speed, state)
+        return added
 
 
 def last_fetch_ts(username: str, color: str, speeds: str, cache: Cache, platform: str = "lichess") -> int | None:
-    """Return the Unix-ms timestamp of the last successful fetch, or None."""
-    backend = _backend_key(username, color, speeds, platform=platform)
-    meta_key = f"_fetch_meta_{backend}"
-    row = cache.get(meta_key, "meta")
-    if row is None:
-        return None
-    return int(row.get("ts_ms", 0)) or None
+    """Return the Unix-ms timestamp of the last successful fetch, or None.
+
+    This is the oldest fetch among the requested speeds (and, for
+    ``'both'``, colours); None while any of them has not been fetched.  A
+    PGN import counts as a fetch of the speeds it was imported under.  A
+    book stored under the combined speed set before speeds were indexed
+    separately still counts when none of the speeds has been fetched since.
+    """
+    if color == "both":
+        stamps = [last_fetch_ts(username, c, speeds, cache, platform) for c in ("white", "black")]
+        return None if None in stamps else min(stamps)
+    stamps = [
+        max(
+            (ts for b in (backend, backend + IMPORTED_SUFFIX)
+             if (ts := (_fetch_meta(cache, b) or {}).get("ts_ms")) is not None),
+            default=None,
+        )
+        for backend in _partitions(username, (color,), speeds, platform)
+    ]
+    if all(ts is None for ts in stamps):
+        legacy = _fetch_meta(cache, _backend_key(username, color, speeds, platform=platform))
+        return int((legacy or {}).get("ts_ms", 0)) or None
+    return None if None in stamps else int(min(stamps)) or None
 
 
 # ---------------------------------------------------------------------------
@@ -269,32 +548,66 @@ def last_fetch_ts(username: str, color: str, speeds: str, cache: Cache, platform
 # ---------------------------------------------------------------------------
 
 
-def _download_pgn(
+def _download_games(
+    platform: str,
+    username: str,
+    speeds: str,
+    max_games: int | None,
+    since_ts: int | None,
+    until_ts: int | None,
+    show_progress: bool = True,
+    progress_fn=None,
+) -> Iterator[str]:
+    """Yield the PGN of the player's games with either colour, newest first."""
+    if platform == "chesscom":
+        return _iter_chesscom_pgns(
+            username, "both", speeds, max_games, since_ts, until_ts=until_ts,
+            show_progress=show_progress, progress_fn=progress_fn,
+        )
+    return _stream_pgn(username, "both", speeds, max_games, since_ts, until_ts)
+
+
+def _stream_pgn(
     username: str,
     color: str,
     speeds: str,
-    max_games: int,
+    max_games: int | None,
     since_ts: int | None,
-) -> str:
-    session = requests.Session()
+    until_ts: int | None = None,
+) -> Iterator[str]:
+    """Yield the PGN text of each exported game as it arrives (newest first).
+
+    *until_ts* (Unix ms, inclusive) limits the export to games created at or
+    before it, which is how an interrupted download picks up where it
+    stopped.  ``max_games=None`` exports every matching game.
+    """
+    if max_games is not None and max_games <= 0:
+        return
+    session = netmode.session()
     session.headers.update(_HEADERS)
 
     params: dict[str, Any] = {
         "perfType": speeds,
-        "color": color,
-        "max": max_games,
         "format": "pgn",
         "evals": "false",
         "opening": "false",
         "clocks": "false",
         "moves": "true",
     }
+    if max_games is not None:
+        params["max"] = max_games
+    if color != "both":
+        params["color"] = color
     if since_ts is not None:
         params["since"] = since_ts
+    if until_ts is not None:
+        params["until"] = until_ts
 
     url = _LICHESS_GAMES_URL.format(username=username)
     try:
-        resp = session.get(url, params=params, timeout=180)
+        ratelimit.acquire("lichess-api")
+        resp = session.get(url, params=params, timeout=180, stream=True)
+        ratelimit.record_response("lichess-api", resp)
         if resp.status_code == 404:
             raise RuntimeError(
                 f"Lichess user '{username}' not found (404). "
@@ -302,7 +615,9 @@ def _download_pgn(
                 "but must match exactly (e.g. 'GothamChess', not 'Rozman_Levy')."
             )
         resp.raise_for_status()
-        return resp.text
+        resp.encoding = resp.encoding or "utf-8"
+
+        yield from _split_games(resp.iter_lines(decode_unicode=True))
     except requests.RequestException as exc:
         raise RuntimeError(
             f"Failed to download games for {username}: {exc}"
@@ -311,56 +626,89 @@ def _download_pgn(
         session.close()
 
 
-def _download_chesscom_pgn(
+def _split_games(lines: Iterable[str]) -> Iterator[str]:
+    """Group PGN *lines* into one text per game.
+
+    A game is its tag block followed by its movetext; the next tag line after
+    movetext starts a new game (the same boundary ``read_game`` uses).
+    """
+    game: list[str] = []
+    in_moves = False
+    for line in lines:
+        if _TAG_LINE.match(line):
+            if in_moves:
+                yield "\n".join(game).strip()
+                game, in_moves = [], False
+        elif line.strip():
+            in_moves = True
+        game.append(line)
+    if in_moves or any(line.strip() for line in game):
+        yield "\n".join(game).strip()
+
+
+def _chesscom_session() -> Any:
+    if _CURL_CFFI_AVAILABLE and netmode.mode() == "live" and not netmode.offline():
+        session = _CurlSession(impersonate="chrome124")
+    else:
+        # Recording, replay and the stand-in server need a requests session.
+        session = netmode.session()
+    session.headers.update(_CHESSCOM_HEADERS)
+    return session
+
+
+def _iter_chesscom_pgns(
     username: str,
     color: str,
     speeds: str,
-    max_games: int,
+    max_games: int | None,
     since_ts: int | None,
     show_progress: bool = True,
     progress_fn=None,
-) -> str:
-    """Download PGN text from Chess.com for one player/color/speeds combination."""
-    from calendar import monthrange
-
+    until_ts: int | None = None,
+) -> Iterator[str]:
+    """Yield the PGN of each matching Chess.com game, newest archives first.
+
+    Monthly archives are downloaded concurrently (:func:`_iter_archives`) and
+    consumed in order, so downloading stops as soon as *max_games* games have
+    been yielded.  *since_ts* selects whole monthly archives; *until_ts*
+    (Unix ms, inclusive) skips the games started after it.
+    """
     speeds_set = {s.strip().lower() for s in speeds.split(",")}
-    if _CURL_CFFI_AVAILABLE:
-        session = _CurlSession(impersonate="chrome124")
-        session.headers.update(_CHESSCOM_HEADERS)
-    else:
-        session = requests.Session()
-        session.headers.update(_CHESSCOM_HEADERS)
-
-    # Verify the player exists.
+    sides = _colors(color)
+    session = _chesscom_session()
     try:
-        profile_resp, _ = _chesscom_get_with_backoff(
-            session, _CHESSCOM_PLAYER_URL.format(username=username)
-        )
-    except requests.HTTPError as exc:
-        if exc.response is not None and exc.response.status_code == 404:
-            raise RuntimeError(
-                f"Chess.com user '{username}' not found (404). "
-                "Check the spelling — Chess.com usernames are case-insensitive."
-            ) from exc
-        raise RuntimeError(f"Could not verify Chess.com user '{username}': {exc}") from exc
-    except requests.RequestException as exc:
-        raise RuntimeError(f"Could not verify Chess.com user '{username}': {exc}") from exc
+        # Verify the player exists.
+        try:
+            profile_resp, _ = _chesscom_get_with_backoff(
+                session, _CHESSCOM_PLAYER_URL.format(username=username)
+            )
+        except requests.HTTPError as exc:
+            if exc.response is not None and exc.response.status_code == 404:
+                raise RuntimeError(
+                    f"Chess.com user '{username}' not found (404). "
+                    "Check the spelling — Chess.com usernames are case-insensitive."
+                ) from exc
+            raise RuntimeError(f"Could not verify Chess.com user '{username}': {exc}") from exc
+        except requests.RequestException as exc:
+            raise RuntimeError(f"Could not verify Chess.com user '{username}': {exc}") from exc
 
-    # Resolve the canonical username from the profile (preserves casing for matching).
-    canonical = profile_resp.json().get("username", username)
+        # Resolve the canonical username from the profile (preserves casing for matching).
+        canonical = profile_resp.json().get("username", username)
 
-    # Fetch archive list.
-    try:
-        arch_resp, _ = _chesscom_get_with_backoff(
-            session, _CHESSCOM_ARCHIVES_URL.format(username=canonical)
-        )
-        archive_urls: list[str] = arch_resp.json().get("archives", [])
-    except requests.RequestException as exc:
-        raise RuntimeError(
-            f"Failed to fetch Chess.com archives for {username}: {exc}"
-        ) from exc
+        # Fetch archive list.
+        try:
+            arch_resp, _ = _chesscom_get_with_backoff(
+                session, _CHESSCOM_ARCHIVES_URL.format(username=canonical)
+            )
+            archive_urls: list[str] = arch_resp.json().get("archives", [])
+        except requests.RequestException as exc:
+            raise RuntimeError(
+                f"Failed to fetch Chess.com archives for {username}: {exc}"
+            ) from exc
+    finally:
+        session.close()
 
-    # Filter archives by since_ts if provided.
+    # Filter archives by since_ts / until_ts if provided.
     if since_ts is not None:
         since_dt = datetime.fromtimestamp(since_ts / 1000, tz=timezone.utc)
         since_ym = (since_dt.year, since_dt.month)
@@ -368,60 +716,152 @@ def _download_chesscom_pgn(
             url for url in archive_urls
             if _parse_archive_ym(url) >= since_ym
         ]
+    until_ym = None
+    if until_ts is not None:
+        until_dt = datetime.fromtimestamp(until_ts / 1000, tz=timezone.utc)
+        until_ym = (until_dt.year, until_dt.month)
+        # A game is filed under the month it ended in, so keep one month more.
+        archive_urls = [
+            url for url in archive_urls
+            if _parse_archive_ym(url) <= (until_ym[0] + until_ym[1] // 12, until_ym[1] % 12 + 1)
+        ]
 
-    # Iterate newest → oldest, collecting PGN text up to max_games.
-    pgn_parts: list[str] = []
+    # Iterate newest → oldest, yielding games until max_games.
     collected = 0
     archives_reversed = list(reversed(archive_urls))
     n_archives = len(archives_reversed)
-    inter_delay = 2.0  # seconds between archive requests; Chess.com throttles hard
 
-    for i, url in enumerate(archives_reversed):
-        if collected >= max_games:
-            break
-        if i > 0:
-            time.sleep(inter_delay)
-        # Print progress every archive so the SSE stream stays alive.
-        ym = url.rstrip("/").split("/")[-2:]
-        ym_label = "/".join(ym) if len(ym) == 2 else url
-        print(
-            f"[fetch]  archive {i + 1}/{n_archives} ({ym_label}) — {collected} games so far …",
-            flush=True,
-        )
-        if progress_fn is not None:
-            progress_fn(i + 1, n_archives)
-        elif show_progress:
-            print(f"[progress:{username}] {i + 1}/{n_archives}", flush=True)
-        try:
-            resp, hit_429 = _chesscom_get_with_backoff(session, url)
-            if hit_429:
-                # We triggered the rate limiter; back off on subsequent archives.
-                inter_delay = min(inter_delay * 2, 10.0)
-            games = resp.json().get("games", [])
-        except requests.RequestException as exc:
-            print(f"[fetch]  Warning: skipping {url}: {exc}", flush=True)
-            continue
-
-        for game in games:
-            if collected >= max_games:
-                break
-            # Only standard chess.
-            if game.get("rules") != "chess":
-                continue
-            # Filter by time class.
-            if game.get("time_class", "").lower() not in speeds_set:
-                continue
-            # Filter by color (case-insensitive).
-            side_obj = game.get(color, {})
-            if side_obj.get("username", "").lower() != canonical.lower():
+    archives = _iter_archives(archives_reversed, _chesscom_session)
+    try:
+        for i, (url, payload, error) in enumerate(archives):
+            # Print progress every archive so the SSE stream stays alive.
+            ym = url.rstrip("/").split("/")[-2:]
+            ym_label = "/".join(ym) if len(ym) == 2 else url
+            print(
+                f"[fetch]  archive {i + 1}/{n_archives} ({ym_label}) — {collected} games so far …",
+                flush=True,
+            )
+            if progress_fn is not None:
+                progress_fn(i + 1, n_archives)
+            elif show_progress:
+                print(f"[progress:{username}] {i + 1}/{n_archives}", flush=True)
+            if payload is None:
+                print(f"[fetch]  Warning: skipping {url}: {error}", flush=True)
                 continue
-            pgn = game.get("pgn", "")
-            if pgn:
-                pgn_parts.append(pgn)
+
+            for game in payload.get("games", []):
+                # Only standard chess.
+                if game.get("rules") != "chess":
+                    continue
+                # Filter by time class.
+                if game.get("time_class", "").lower() not in speeds_set:
+                    continue
+                # Filter by color (case-insensitive).
+                if not any(
+                    game.get(side, {}).get("username", "").lower() == canonical.lower()
+                    for side in sides
+                ):
+                    continue
+                pgn = game.get("pgn", "")
+                if not pgn:
+                    continue
+                if until_ts is not None and _parse_archive_ym(url) >= until_ym:
+                    headers = chess.pgn.read_headers(io.StringIO(pgn))
+                    started = game_store.game_ts(headers) if headers is not None else None
+                    if started is not None and started > until_ts:
+                        continue
+                yield pgn
                 collected += 1
+                if max_games is not None and collected >= max_games:
+                    return
+    finally:
+        archives.close()   # cancels archives not yet downloaded
+
+
+def _iter_archives(
+    urls: list[str],
+    make_session: Callable[[], Any],
+    max_concurrency: int = _CHESSCOM_MAX_CONCURRENCY,
+) -> Iterator[tuple[str, Any, Exception | None]]:
+    """Download *urls* concurrently and yield ``(url, payload, error)`` in order.
+
+    *payload* is the archive's decoded JSON (see :func:`_fetch_archive`), or
+    None if the download failed with *error*.  The number of requests in flight follows AIMD: it grows by one after
+    each archive fetched without a 429 and halves after one that needed a
+    retry, between 1 and *max_concurrency*.  Each worker thread has its own
+    session.  Requests still pass through the shared ``chesscom`` rate limit.
+    Closing the generator cancels the downloads not yet started.
+    """
+    local = threading.local()
+    sessions: list[Any] = []
+    sessions_lock = threading.Lock()
+
+    def fetch(url: str) -> tuple[Any, bool]:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = make_session()
+            with sessions_lock:
+                sessions.append(session)
+        return _fetch_archive(session, url)
+
+    window = min(2, max_concurrency)
+    pending: dict[int, Future[tuple[Any, bool]]] = {}
+    submitted = 0
+    pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="chesscom-archive")
+    try:
+        for i, url in enumerate(urls):
+            while submitted < len(urls) and submitted - i < window:
+                pending[submitted] = pool.submit(fetch, urls[submitted])
+                submitted += 1
+            try:
+                payload, throttled = pending.pop(i).result()
+            except (requests.RequestException, ValueError) as exc:
+                yield url, None, exc
+                continue
+            window = max(1, window // 2) if throttled else min(max_concurrency, window + 1)
+            yield url, payload, None
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        for session in sessions:
+            session.close()
+
+
+def _fetch_archive(session: Any, url: str) -> tuple[dict[str, Any], bool]:
+    """Return the decoded JSON of a monthly archive, through the archive store.
+
+    Archives of completed months already in the
+    :mod:`~mysecond.chesscom_archives` store are returned without a request.
+    Others are fetched — conditionally, with the stored ``ETag`` /
+    ``Last-Modified`` validators, when an earlier copy exists — and stored;
+    a ``304 Not Modified`` returns the stored copy.
 
-    session.close()
-    return "\n\n".join(pgn_parts)
+    Returns (payload, hit_429) as :func:`_chesscom_get_with_backoff`.
+    """
+    key = chesscom_archives.archive_key(url)
+    if key is None:
+        resp, throttled = _chesscom_get_with_backoff(session, url)
+        return resp.json(), throttled
+
+    store = chesscom_archives.get_store()
+    stored = store.get(*key)
+    if stored is not None and stored.immutable:
+        return json.loads(stored.body), False
+
+    headers: dict[str, str] = {}
+    if stored is not None and stored.etag:
+        headers["If-None-Match"] = stored.etag
+    if stored is not None and stored.last_modified:
+        headers["If-Modified-Since"] = stored.last_modified
+    resp, throttled = _chesscom_get_with_backoff(session, url, headers=headers or None)
+    if resp.status_code == 304 and stored is not None:
+        body, etag, last_modified = stored.body, stored.etag, stored.last_modified
+    else:
+        body = resp.content
+        etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+    payload = json.loads(body)
+    # Re-stored on a 304 too: a month revalidated after it ended becomes immutable.
+    store.put(*key, body, etag, last_modified)
+    return payload, throttled
 
 
 def _parse_archive_ym(url: str) -> tuple[int, int]:
@@ -437,25 +877,23 @@ def _chesscom_get_with_backoff(
     session: requests.Session,
     url: str,
     max_retries: int = 8,
+    headers: dict[str, str] | None = None,
 ) -> tuple[requests.Response, bool]:
-    """GET with exponential backoff on 429.
+    """GET through the shared ``chesscom`` rate limit, retrying on 429.
+
+    A 429 (and its ``Retry-After``) throttles the shared bucket, so the retry
+    — and every other process's next Chess.com request — waits it out.
 
     Returns (response, hit_429) where hit_429 is True if any retry was needed.
     """
     for attempt in range(max_retries):
-        resp = session.get(url, timeout=30)
+        ratelimit.acquire("chesscom")
+        resp = session.get(url, headers=headers, timeout=30)
+        ratelimit.record_response("chesscom", resp)
         if resp.status_code == 429:
-            # Honour Retry-After if Chess.com provides it.
             retry_after = resp.headers.get("Retry-After")
-            if retry_after:
-                try:
-                    wait = int(retry_after)
-                except ValueError:
-                    wait = 2 ** attempt
-            else:
-                wait = 2 ** attempt
-            print(f"[fetch]  Chess.com rate limit (429) — retrying in {wait}s …", flush=True)
-            time.sleep(wait)
+            wait = f"{retry_after}s" if retry_after else "a moment"
+            print(f"[fetch]  Chess.com rate limit (429) — retrying in {wait} …", flush=True)
             continue
         resp.raise_for_status()
         return resp, attempt > 0
@@ -472,6 +910,7 @@ def _build_book(
     color: str,
     max_plies: int,
     verbose: bool = False,
+    workers: int | None = None,
 ) -> dict[str, dict[str, Any]]:
     """Parse PGN text and return per-position statistics.
 
@@ -493,80 +932,305 @@ def _build_book(
 
     Only positions where it is *the player's turn* are recorded, so
     ``moves`` always reflects the player's own choices.
+
+    Games are split into chunks and parsed by *workers* processes (default:
+    :func:`_parse_workers`); the partial books are merged in input order, so
+    the result does not depend on the number of workers.
     """
-    player_turn = chess.WHITE if color == "white" else chess.BLACK
+    if workers is None:
+        workers = _parse_workers()
+    chunks: list[str] = []
+    games: list[str] = []
+    for game in _split_games(pgn_text.splitlines()):
+        games.append(game)
+        if len(games) >= _PARSE_CHUNK_GAMES:
+            chunks.append("\n\n".join(games))
+            games = []
+    if games:
+        chunks.append("\n\n".join(games))
+
+    # Spawning processes only pays off with more than one chunk.
+    with _ParallelParser({color: color}, max_plies, workers if len(chunks) > 1 else 1) as parser:
+        for chunk in chunks:
+            parser.submit(chunk, color)
+        builder = parser.collect(verbose=verbose)[color]
+
+    if verbose:
+        print(
+            f"[fetch] {builder.processed} games parsed, {builder.skipped} skipped, "
+            f"{len(builder.book)} unique positions.",
+            flush=True,
+        )
 
-    # book: fen → {white, draws, black, moves: {uci → {white, draws, black}}}
-    book: dict[str, dict[str, Any]] = {}
+    return builder.book.to_dict()
 
-    buf = io.StringIO(pgn_text)
-    processed = 0
-    skipped = 0
 
-    while True:
-        try:
-            game = chess.pgn.read_game(buf)
-        except Exception:  # noqa: BLE001
-            skipped += 1
-            continue
-        if game is None:
-            break
+def _parse_workers() -> int:
+    """Processes for PGN parsing: the cores Stockfish is not using.
+
+    ``MYSECOND_PARSE_WORKERS`` overrides.  Otherwise, when
+    ``MYSECOND_STOCKFISH_THREADS`` reserves cores for engines running
+    alongside, the rest are used; by default all cores but one.
+    """
+    override = os.environ.get("MYSECOND_PARSE_WORKERS", "").strip()
+    if override:
+        return max(1, int(override))
+    cores = os.cpu_count() or 1
+    engine = os.environ.get("MYSECOND_STOCKFISH_THREADS", "").strip()
+    return max(1, cores - (int(engine) if engine else 1))
+
 
+def _parse_chunk(
+    pgn_text: str,
+    color: str,
+    max_plies: int,
+) -> tuple["_CompactBook", int, int]:
+    """Worker task: build a partial book from a chunk of whole games."""
+    builder = _BookBuilder(color, max_plies)
+    builder.add_pgn(pgn_text)
+    return builder.book, builder.processed, builder.skipped
+
+
+class _ParallelParser:
+    """Map PGN chunks to partial books over a process pool and reduce them.
+
+    One book is built for each key of *books*, which maps it to the colour
+    the player had in that book's games; every chunk belongs to one book.
+    With ``workers <= 1`` chunks are parsed in this process as they are
+    submitted.  Otherwise the pool is started by the first chunk submitted,
+    so games queued with :meth:`add` that never fill a chunk (a small fetch)
+    are parsed in this process without one.  :meth:`collect` merges the finished partial books into
+    :attr:`builders` in submission order, so the result is identical to
+    parsing the same games serially.
+    """
+
+    def __init__(self, books: dict[str, str], max_plies: int, workers: int) -> None:
+        self.builders = {key: _BookBuilder(color, max_plies) for key, color in books.items()}
+        self._colors = dict(books)
+        self._max_plies = max_plies
+        self._workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending: list[tuple[str, Future[tuple[_CompactBook, int, int]]]] = []
+        self._chunks: dict[str, list[str]] = {key: [] for key in self.builders}
+
+    def add(self, game_text: str, key: str) -> None:
+        """Queue one game for book *key*; full chunks are submitted."""
+        chunk = self._chunks[key]
+        chunk.append(game_text)
+        if len(chunk) >= _PARSE_CHUNK_GAMES:
+            self.submit("\n\n".join(chunk), key)
+            chunk.clear()
+
+    def submit(self, pgn_text: str, key: str) -> None:
+        if self._pool is None and self._workers > 1:
+            self._pool = ProcessPoolExecutor(self._workers)
+        if self._pool is None:
+            self.builders[key].add_pgn(pgn_text)
+        else:
+            self._pending.append((key, self._pool.submit(
+                _parse_chunk, pgn_text, self._colors[key], self._max_plies,
+            )))
+
+    def collect(self, verbose: bool = False) -> dict[str, "_BookBuilder"]:
+        """Submit queued games, wait for all chunks and merge them; return :attr:`builders`."""
+        for key, chunk in self._chunks.items():
+            if not chunk:
+                continue
+            text = "\n\n".join(chunk)
+            chunk.clear()
+            if self._pool is None:
+                self.builders[key].add_pgn(text)   # never start a pool for the remainder
+            else:
+                self.submit(text, key)
+        pending, self._pending = self._pending, []
+        for key, future in pending:
+            before = self.processed
+            self.builders[key].merge(*future.result())
+            if verbose and self.processed // 1000 > before // 1000:
+                positions = sum(len(b.book) for b in self.builders.values())
+                print(
+                    f"  … {self.processed} games, {positions} positions so far",
+                    flush=True,
+                )
+        return self.builders
+
+    @property
+    def processed(self) -> int:
+        return sum(b.processed for b in self.builders.values())
+
+    @property
+    def skipped(self) -> int:
+        return sum(b.skipped for b in self.builders.values())
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "_ParallelParser":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+
+class _BookBuilder:
+    """Accumulate per-position statistics (see :func:`_build_book`) game by game.
+
+    The counts are kept in a :class:`_CompactBook`.  :meth:`take` hands over
+    the counts gathered so far and starts afresh, so a streaming caller can
+    write the book out in chunks.
+    """
+
+    def __init__(self, color: str, max_plies: int) -> None:
+        self._player_turn = chess.WHITE if color == "white" else chess.BLACK
+        self._max_plies = max_plies
+        self.book = _CompactBook()
+        self.processed = 0
+        self.skipped = 0
+
+    def add_game(self, game: MainlineGame) -> None:
         result = game.headers.get("Result", "*")
         if result == "1-0":
-            w, d, b = 1, 0, 0
-        elif result == "0-1":
-            w, d, b = 0, 0, 1
+            outcome = 0
         elif result == "1/2-1/2":
-            w, d, b = 0, 1, 0
+            outcome = 1
+        elif result == "0-1":
+            outcome = 2
         else:
-            skipped += 1
-            continue  # unfinished / aborted game
+            self.skipped += 1
+            return  # unfinished / aborted game
 
-        board = game.board()
-        ply = 0
+        add = self.book.add
+        for board, move in game.positions():
+            # Record only the player's own moves at their turn.
+            if board.turn == self._player_turn:
+                add(board, move, outcome)
 
-        for move in game.mainline_moves():
-            if ply >= max_plies:
-                break
+        self.processed += 1
 
-            # Record only the player's own moves at their turn.
-            if board.turn == player_turn:
-                fen = _fen_cache_key(board.fen())
-                uci = move.uci()
+    def add_pgn(self, pgn_text: str) -> None:
+        """Add every game in *pgn_text*, parsing only the first ``max_plies`` moves."""
+        for game in iter_mainlines(io.StringIO(pgn_text), max_plies=self._max_plies):
+            self.add_game(game)
 
-                if fen not in book:
-                    book[fen] = {"white": 0, "draws": 0, "black": 0, "moves": {}}
+    def merge(self, book: "_CompactBook", processed: int, skipped: int) -> None:
+        """Add a partial book built by another builder (see :func:`_parse_chunk`)."""
+        self.book.update(book)
+        self.processed += processed
+        self.skipped += skipped
 
-                pos = book[fen]
-                pos["white"] += w
-                pos["draws"] += d
-                pos["black"] += b
+    def take(self) -> "_CompactBook":
+        """Return the book built since the last call and start a new one."""
+        book, self.book = self.book, _CompactBook()
+        return book
 
-                if uci not in pos["moves"]:
-                    pos["moves"][uci] = {"white": 0, "draws": 0, "black": 0}
-                pos["moves"][uci]["white"] += w
-                pos["moves"][uci]["draws"] += d
-                pos["moves"][uci]["black"] += b
 
-            board.push(move)
-            ply += 1
+class _CompactBook:
+    """Per-position game counts in packed form.
 
-        processed += 1
-        if verbose and processed % 1000 == 0:
-            print(
-                f"  … {processed} games, {len(book)} positions so far",
-                flush=True,
-            )
+    Positions are keyed by a 64-bit hash of their bitboards, side to move and
+    castling rights — the fields of :func:`_fen_cache_key`, so transpositions
+    share an entry — and numbered in order of first appearance.  The FEN key
+    is rendered once, when a position is first seen.  Moves are packed into
+    15-bit codes (from, to, promotion) and keyed by ``slot << 15 | code``.
+    White-win / draw / black-win counts live in flat arrays, three per
+    position and three per move.
 
-    if verbose:
-        print(
-            f"[fetch] {processed} games parsed, {skipped} skipped, "
-            f"{len(book)} unique positions.",
-            flush=True,
-        )
+    :meth:`items` rebuilds the ``fen → {white, draws, black, moves}`` entries
+    (see :func:`_build_book`) one position at a time when the book is stored.
+    """
 
-    return book
+    __slots__ = ("fens", "_keys", "_slots", "_counts", "_moves", "_move_counts")
+
+    def __init__(self) -> None:
+        self.fens: list[str] = []                   # slot → FEN cache key
+        self._keys: list[int] = []                  # slot → position hash
+        self._slots: dict[int, int] = {}            # position hash → slot
+        self._counts = array("I")                   # 3 × slot + outcome
+        self._moves: dict[int, int] = {}            # slot << 15 | move code → move slot
+        self._move_counts = array("I")              # 3 × move slot + outcome
+
+    def __len__(self) -> int:
+        return len(self.fens)
+
+    def add(self, board: chess.Board, move: chess.Move, outcome: int) -> None:
+        """Count *move* from *board*; *outcome* is 0 (1-0), 1 (draw) or 2 (0-1)."""
+        key = hash((
+            board.pawns, board.knights, board.bishops, board.rooks, board.queens,
+            board.kings, board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK],
+            board.turn, board.clean_castling_rights(),
+        ))
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._new_slot(key, _fen_cache_key(board.fen()))
+        self._counts[3 * slot + outcome] += 1
+
+        code = move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+        move_slot = self._moves.get(slot << 15 | code)
+        if move_slot is None:
+            move_slot = self._new_move(slot << 15 | code)
+        self._move_counts[3 * move_slot + outcome] += 1
+
+    def update(self, other: "_CompactBook") -> None:
+        """Add the counts of *other*; its new positions and moves keep their order."""
+        remap = array("I", bytes(4 * len(other.fens)))
+        counts = self._counts
+        for i, (key, fen) in enumerate(zip(other._keys, other.fens)):
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._new_slot(key, fen)
+            remap[i] = slot
+            for j in range(3):
+                counts[3 * slot + j] += other._counts[3 * i + j]
+        move_counts = self._move_counts
+        for packed, other_slot in other._moves.items():
+            packed = remap[packed >> 15] << 15 | packed & 0x7FFF
+            move_slot = self._moves.get(packed)
+            if move_slot is None:
+                move_slot = self._new_move(packed)
+            for j in range(3):
+                move_counts[3 * move_slot + j] += other._move_counts[3 * other_slot + j]
+
+    def items(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Yield ``(fen, {white, draws, black, moves: {uci → counts}})`` by first appearance."""
+        by_slot: list[list[tuple[int, int]]] = [[] for _ in self.fens]
+        for packed, move_slot in self._moves.items():
+            by_slot[packed >> 15].append((packed & 0x7FFF, move_slot))
+        counts, move_counts = self._counts, self._move_counts
+        for slot, fen in enumerate(self.fens):
+            moves = {}
+            for code, m in by_slot[slot]:
+                uci = chess.Move(code & 63, code >> 6 & 63, code >> 12 or None).uci()
+                moves[uci] = {
+                    "white": move_counts[3 * m],
+                    "draws": move_counts[3 * m + 1],
+                    "black": move_counts[3 * m + 2],
+                }
+            by_slot[slot] = []
+            yield fen, {
+                "white": counts[3 * slot],
+                "draws": counts[3 * slot + 1],
+                "black": counts[3 * slot + 2],
+                "moves": moves,
+            }
+
+    def to_dict(self) -> dict[str, dict[str, Any]]:
+        return dict(self.items())
+
+    def _new_slot(self, key: int, fen: str) -> int:
+        slot = len(self.fens)
+        self._slots[key] = slot
+        self._keys.append(key)
+        self.fens.append(fen)
+        self._counts.extend((0, 0, 0))
+        return slot
+
+    def _new_move(self, packed: int) -> int:
+        move_slot = len(self._moves)
+        self._moves[packed] = move_slot
+        self._move_counts.extend((0, 0, 0))
+        return move_slot
 
 
 # ---------------------------------------------------------------------------
@@ -575,33 +1239,58 @@ def _build_book(
 
 
 def _store_book(
-    book: dict[str, dict[str, Any]],
+    book: "_CompactBook",
     cache: Cache,
     backend: str,
     merge: bool,
 ) -> None:
-    """Write opening-book entries to the cache.
+    """Write opening-book entries for one backend (see :func:`_store_books`)."""
+    _store_books({backend: book}, cache, merge)
+
+
+def _store_books(
+    books: dict[str, "_CompactBook"],
+    cache: Cache,
+    merge: bool,
+) -> None:
+    """Write the opening books in *books* (backend → book) to the cache.
 
     In *merge* mode new counts are added to existing entries (for incremental
     updates).  In full mode existing entries are replaced.
-    All writes are batched into a single transaction.
+    All writes are batched into a single :meth:`~mysecond.cache.Cache.set_many`
+    call — one transaction per cache file.  When a backend is stored in the
+    relational book layout the merge is done in SQL instead of reading the
+    existing entries back.  Explorer payloads are built here, from the
+    packed counts, one position at a time.
     """
-    if merge:
-        # Load all existing entries for this backend once, merge in memory.
-        existing_map = dict(cache.scan_backend(backend))
-    else:
-        existing_map = {}
-
     entries: list[tuple[str, str, dict[str, Any]]] = []
-    for fen, pos in book.items():
-        payload = _to_payload(pos)
+    for backend, book in books.items():
+        if merge and cache.supports_merge(backend):
+            cache.merge_many(backend, [(fen, _to_payload(pos)) for fen, pos in book.items()])
+            continue
+
         if merge:
-            existing = existing_map.get(fen)
-            if existing is not None:
-                payload = _merge_payloads(existing, payload)
-        entries.append((fen, backend, payload))
+            # Stream the existing backend once, keeping only positions that
+            # the new games touch.
+            touched = set(book.fens)
+            existing_map = {
+                fen: payload
+                for fen, payload in cache.iter_backend(backend, exact=True)
+                if fen in touched
+            }
+        else:
+            existing_map = {}
+
+        for fen, pos in book.items():
+            payload = _to_payload(pos)
+            if merge:
+                existing = existing_map.get(fen)
+                if existing is not None:
+                    payload = _merge_payloads(existing, payload)
+            entries.append((fen, backend, payload))
 
-    cache.set_many(entries)
+    if entries:
+        cache.set_many(entries)
 
 
 def _to_payload(pos: dict[str, Any]) -> dict[str, Any]:
@@ -680,6 +1369,15 @@ def _backend_key(username: str, color: str, speeds: str, platform: str = "liches
     return f"{platform}_player_{username.lower()}_{color}_{speeds}"
 
 
+def _colors(color: str) -> tuple[str, ...]:
+    """Expand a colour argument; ``'both'`` indexes white and black in one pass."""
+    if color == "both":
+        return ("white", "black")
+    if color not in ("white", "black"):
+        raise ValueError(f"color must be 'white', 'black' or 'both', got {color!r}")
+    return (color,)
+
+
 def _fen_cache_key(fen: str) -> str:
     """Normalize a FEN for use as a cache key.
 
@@ -691,11 +1389,46 @@ def _fen_cache_key(fen: str) -> str:
     return " ".join(parts[:3]) + " -"
 
 
-def _write_fetch_meta(cache: Cache, backend: str) -> None:
-    """Record the current timestamp as the last successful fetch time."""
-    ts_ms = int(time.time() * 1000)
-    meta_key = f"_fetch_meta_{backend}"
-    cache.set(meta_key, "meta", {"ts_ms": ts_ms})
+def _partitions(
+    username: str, colors: Iterable[str], speeds: str, platform: str,
+) -> dict[str, tuple[str, str]]:
+    """Map the single-speed backend of each colour and speed to ``(color, speed)``.
+
+    Books are stored per speed; the cache adds up a combined speed set when
+    it is read (see :func:`mysecond.cache.speed_partitions`).
+    """
+    return {
+        _backend_key(username, c, speed.lower(), platform=platform): (c, speed)
+        for c in colors
+        for speed in _speed_list(speeds)
+    }
+
+
+def _speed_list(speeds: str) -> list[str]:
+    """The distinct speeds of a comma-separated list, as spelt in it."""
+    seen: dict[str, str] = {}
+    for speed in speeds.split(","):
+        if speed.strip():
+            seen.setdefault(speed.strip().lower(), speed.strip())
+    return list(seen.values())
+
+
+def _fetch_meta(cache: Cache, backend: str) -> dict[str, Any] | None:
+    return cache.get(f"_fetch_meta_{backend}", "meta")
+
+
+def _write_fetch_meta(cache: Cache, backend: str, games_ts: int | None = None) -> None:
+    """Record the current timestamp as the last successful fetch time.
+
+    *games_ts* is the start time of the newest game in the book; it is kept
+    from the previous fetch when None.
+    """
+    meta: dict[str, Any] = {"ts_ms": int(time.time() * 1000)}
+    if games_ts is None:
+        games_ts = (_fetch_meta(cache, backend) or {}).get("games_ts")
+    if games_ts is not None:
+        meta["games_ts"] = games_ts
+    cache.set(f"_fetch_meta_{backend}", "meta", meta)
 
 
 def import_pgn_player(
@@ -707,40 +1440,125 @@ def import_pgn_player(
     max_plies: int = 30,
     platform: str = "lichess",
     verbose: bool = True,
+    player: str | None = None,
+    batch_games: int = _IMPORT_BATCH_GAMES,
 ) -> int:
     """Index games from a local PGN file into the player cache.
 
     Useful when the player's Lichess account is inactive or you want
     to use OTB games obtained from chessgames.com, FIDE, TWIC, etc.
-    The data is stored under the same cache key as ``fetch_player_games``
-    so ``mysecond search --player <username>`` reads it transparently.
+    Each game is filed under the speed of its ``TimeControl`` tag, or the
+    last of *speeds* when that speed is not one of them (OTB controls,
+    games without the tag).  Imported games are kept in partitions of their
+    own that reads of the player's book add to the fetched games (see
+    :data:`mysecond.cache.IMPORTED_SUFFIX`), so ``mysecond search --player
+    <username>`` reads them transparently and a later fetch leaves them in
+    place.  Importing again replaces the previous import for these speeds.
+
+    The file (plain, ``.gz`` or ``.bz2``) is streamed, never read whole:
+    games are split off as they are read and parsed by the worker pool, and
+    the book is written to the cache every *batch_games* games, so memory
+    stays bounded by one batch however large the file is.
+
+    player:
+        Only index games in which this player (matched case-insensitively
+        against the ``White`` / ``Black`` tags) had *color*; other games are
+        skipped before any move is parsed.  Required for ``color='both'``,
+        which indexes the player's games with either colour.
     """
-    pgn_text = pgn_path.read_text(encoding="utf-8", errors="replace")
+    colors = _colors(color)
+    if len(colors) > 1 and not player:
+        raise ValueError("color='both' needs a player name to tell the colours apart")
+    speed_names = [speed.lower() for speed in _speed_list(speeds)]
+    if not speed_names:
+        raise ValueError("speeds must name at least one speed")
+    backends = {
+        (c, speed): _backend_key(username, c, speed, platform=platform) + IMPORTED_SUFFIX
+        for c in colors
+        for speed in speed_names
+    }
+    name = player.strip().lower() if player else None
+
     if verbose:
+        size_mb = pgn_path.stat().st_size / 1e6
+        only = f", games of {player}" if player else ""
         print(
-            f"[import] Reading {pgn_path.name}  ({len(pgn_text):,} chars) "
-            f"for {username} as {color} …",
+            f"[import] Reading {pgn_path.name}  ({size_mb:,.1f} MB) "
+            f"for {username} as {color}{only} …",
             flush=True,
         )
-
-    book = _build_book(pgn_text, color, max_plies, verbose=verbose)
-
-    if not book:
+    # A book stored under the combined speed set before imports had their
+    # own partitions would be read instead of them while it is present.
+    legacy = [_backend_key(username, c, speeds, platform=platform) for c in colors]
+    fetched = _partitions(username, colors, speeds, platform)
+    for backend in (*backends.values(), *(b for b in legacy if b not in fetched)):
+        cache.clear_backend(backend)
+
+    games = other = chars = 0
+    started = time.monotonic()
+
+    def flush() -> None:
+        books = {backend: builder.take() for backend, builder in parser.collect().items()}
+        _store_books({backend: book for backend, book in books.items() if book}, cache, merge=True)
         if verbose:
-            print("[import] No positions extracted.")
-        return 0
+            elapsed = max(time.monotonic() - started, 1e-9)
+            print(
+                f"[import] {games:,} games ({games / elapsed:,.0f} games/s, "
+                f"{chars / elapsed / 1e6:,.1f} MB/s)",
+                flush=True,
+            )
 
-    backend = _backend_key(username, color, speeds, platform=platform)
+    with _open_pgn(pgn_path) as handle, \
+            _ParallelParser({b: c for (c, _), b in backends.items()}, max_plies, _parse_workers()) as parser:
+        for game_text in _split_games(line.rstrip("\n") for line in handle):
+            chars += len(game_text) + 2
+            side = colors[0] if name is None else _player_side(game_text, name, colors)
+            if side is None:
+                other += 1
+                continue
+            parser.add(game_text, backends[side, _import_speed(game_text, speed_names, platform)])
+            games += 1
+            if games % batch_games == 0:
+                flush()
+        flush()
+
+    n_positions = sum(
+        cache.count_positions([b for (side, _), b in backends.items() if side == c])
+        for c in colors
+    )
     if verbose:
         print(
-            f"[import] Writing {len(book):,} positions to cache …",
+            f"[import] {parser.processed:,} games parsed, {parser.skipped:,} skipped"
+            + (f", {other:,} without {player}" if name is not None else "")
+            + f", {n_positions:,} unique positions.",
             flush=True,
         )
+    if not n_positions:
+        if verbose:
+            print("[import] No positions extracted.")
+        return 0
 
-    _store_book(book, cache, backend, merge=False)
-    _write_fetch_meta(cache, backend)
+    for backend in backends.values():
+        _write_fetch_meta(cache, backend)
 
     if verbose:
-        print(f"[import] Done. {len(book):,} positions cached for {username} ({color}).")
+        print(f"[import] Done. {n_positions:,} positions cached for {username} ({color}).")
+
+    return n_positions
+
+
+def _import_speed(game_text: str, speeds: list[str], platform: str) -> str:
+    """The speed in *speeds* an imported game is filed under (see :func:`import_pgn_player`)."""
+    match = _TIME_CONTROL_TAG.search(game_text)
+    speed = game_store.game_speed(platform, match.group(1).strip() if match else "")
+    return speed if speed in speeds else speeds[-1]
+
 
-    return len(book)
+def _player_side(game_text: str, name: str, colors: tuple[str, ...]) -> str | None:
+    """Return the colour in *colors* that player *name* had, read from the tag lines."""
+    for side, tag in (("white", _WHITE_TAG), ("black", _BLACK_TAG)):
+        if side in colors:
+            match = tag.search(game_text)
+            if match and match.group(1).strip().lower() == name:
+                return side
+    return None
@@ -13,9 +13,9 @@ import io
 from typing import Any
 
 import chess
-import chess.pgn
 
 from .fetcher import download_raw_pgn
+from .mainline import iter_mainlines
 
 # Non-pawn material values for phase detection.
 _PIECE_VALUES: dict[int, int] = {
@@ -37,6 +37,10 @@ def _non_pawn_material(board: chess.Board) -> int:
     return total
 
 
+def _is_endgame(board: chess.Board) -> bool:
+    return _non_pawn_material(board) <= _ENDGAME_THRESHOLD
+
+
 def _parse_result(result: str, color: str) -> str:
     """Return 'win', 'loss', or 'draw' from the player's perspective."""
     if result == "1/2-1/2":
@@ -123,30 +127,15 @@ def analyze_game_phases(
     if verbose:
         print(f"{tag} Parsing games and computing phase statistics …", flush=True)
 
-    while True:
-        try:
-            game = chess.pgn.read_game(buf)
-        except Exception:
-            continue
-        if game is None:
-            break
-
-        result  = game.headers.get("Result", "*")
-        outcome = _parse_result(result, color)
-        if outcome == "unknown":
-            continue
+    # Moves are only parsed until the endgame threshold is crossed; after
+    # that the rest of the game is just counted.
+    decided = lambda h: _parse_result(h.get("Result", "*"), color) != "unknown"  # noqa: E731
+    for game in iter_mainlines(buf, stop=_is_endgame, accept=decided):
+        outcome = _parse_result(game.headers.get("Result", "*"), color)
 
         speed = _speed_from_headers(game.headers)
-
-        board = game.board()
-        ply   = 0
-        reached_endgame = False
-
-        for move in game.mainline_moves():
-            board.push(move)
-            ply += 1
-            if not reached_endgame and _non_pawn_material(board) <= _ENDGAME_THRESHOLD:
-                reached_endgame = True
+        ply   = game.plies
+        reached_endgame = game.stopped
 
         games_processed += 1
         speed_plies.setdefault(speed, []).append(ply)
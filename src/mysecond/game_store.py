@@ -0,0 +1,326 @@
+"""Local store of downloaded games, shared by every command.
+
+Book building (``fetch-player-games`` and the commands that fetch on
+demand), game-phase analysis and the game browser all read a player's games
+from this store; the network is only used to add games it does not have yet
+(see :func:`mysecond.fetcher.sync_player_games`).
+
+Layout
+------
+A SQLite file (``MYSECOND_GAME_STORE``, default ``data/games.sqlite``):
+
+* ``games(platform, game_id, white, black, speed, ts, pgn)`` — one row per
+  game, keyed by the platform's game ID so a game downloaded twice (by two
+  commands, for both players, or by an overlapping request) is stored once.
+  ``white`` / ``black`` are lower-cased usernames, ``ts`` the start time in
+  Unix ms and ``pgn`` the zlib-compressed game text.  Indexed by player,
+  colour and date.
+* ``syncs(platform, username, speeds, newest_ts, oldest_ts, complete, resume)``
+  — which part of a player's history has been downloaded: every game
+  between ``oldest_ts`` and ``newest_ts`` is stored, and ``complete`` means
+  there is nothing older.  ``resume`` records an interrupted download.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import chess.pgn
+
+_DEFAULT_GAME_STORE = Path("data/games.sqlite")
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS games (
+    platform TEXT    NOT NULL,
+    game_id  TEXT    NOT NULL,
+    white    TEXT    NOT NULL,
+    black    TEXT    NOT NULL,
+    speed    TEXT    NOT NULL,
+    ts       INTEGER NOT NULL,
+    pgn      BLOB    NOT NULL,
+    PRIMARY KEY (platform, game_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_games_white ON games (platform, white, speed, ts);
+CREATE INDEX IF NOT EXISTS idx_games_black ON games (platform, black, speed, ts);
+CREATE TABLE IF NOT EXISTS syncs (
+    platform  TEXT    NOT NULL,
+    username  TEXT    NOT NULL,
+    speeds    TEXT    NOT NULL,
+    newest_ts INTEGER,
+    oldest_ts INTEGER,
+    complete  INTEGER NOT NULL DEFAULT 0,
+    resume    TEXT,
+    PRIMARY KEY (platform, username, speeds)
+);
+"""
+
+# Estimated duration (base + 40 × increment, seconds) below which a game
+# belongs to each speed, per platform.
+_SPEED_LIMITS = {
+    "lichess": ((30, "ultrabullet"), (180, "bullet"), (480, "blitz"), (1500, "rapid")),
+    "chesscom": ((180, "bullet"), (600, "blitz")),
+}
+_SLOWEST = {"lichess": "classical", "chesscom": "rapid"}
+
+
+@dataclass(slots=True)
+class GameRecord:
+    """One game as stored."""
+
+    game_id: str
+    white: str   # lower-cased username
+    black: str
+    speed: str   # lower-cased time class, e.g. "blitz"
+    ts: int      # start time, Unix ms (0 if unknown)
+    pgn: str
+
+
+@dataclass(slots=True)
+class SyncState:
+    """Downloaded part of a player's history (see the module docstring)."""
+
+    newest_ts: int | None = None
+    oldest_ts: int | None = None
+    complete: bool = False
+    resume: dict[str, Any] | None = None
+
+
+def game_record(platform: str, pgn: str) -> GameRecord | None:
+    """Build the store record for one game's PGN text, or None if it has no headers."""
+    headers = chess.pgn.read_headers(io.StringIO(pgn))
+    if headers is None:
+        return None
+    # Lichess: [Site "https://lichess.org/abcd1234"]; Chess.com: [Link ".../game/live/123"].
+    link = headers.get("Link") if platform == "chesscom" else headers.get("Site")
+    game_id = (link or "").rstrip("/").rsplit("/", 1)[-1]
+    if not game_id or game_id == "?":
+        game_id = hashlib.sha1(pgn.encode("utf-8")).hexdigest()
+    return GameRecord(
+        game_id=game_id,
+        white=headers.get("White", "").lower(),
+        black=headers.get("Black", "").lower(),
+        speed=game_speed(platform, headers.get("TimeControl", "")),
+        ts=game_ts(headers) or 0,
+        pgn=pgn,
+    )
+
+
+def game_ts(headers: chess.pgn.Headers) -> int | None:
+    """Return a game's start time (Unix ms) from its UTC headers, or None."""
+    try:
+        dt = datetime.strptime(
+            f"{headers['UTCDate']} {headers['UTCTime']}", "%Y.%m.%d %H:%M:%S",
+        )
+    except (KeyError, ValueError):
+        return None
+    return int(dt.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def game_speed(platform: str, time_control: str) -> str:
+    """Classify a PGN ``TimeControl`` the way *platform* does."""
+    if time_control in ("", "?"):
+        return "unknown"
+    if time_control == "-":
+        return "correspondence"
+    if "/" in time_control:
+        return "daily"
+    base, _, inc = time_control.partition("+")
+    try:
+        estimate = int(base) + 40 * int(inc or 0)
+    except ValueError:
+        return "unknown"
+    for limit, speed in _SPEED_LIMITS.get(platform, _SPEED_LIMITS["lichess"]):
+        if estimate < limit:
+            return speed
+    return _SLOWEST.get(platform, "classical")
+
+
+def speeds_key(speeds: str) -> str:
+    """Canonical form of a comma-separated speed list."""
+    return ",".join(sorted({s.strip().lower() for s in speeds.split(",") if s.strip()}))
+
+
+class GameStore:
+    """Games keyed by ``(platform, game_id)``; safe to share between threads."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(str(path), timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_DDL)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Games
+    # ------------------------------------------------------------------
+
+    def add(self, platform: str, records: Iterable[GameRecord]) -> int:
+        """Store *records* in one transaction; return how many were new."""
+        rows = [
+            (platform, r.game_id, r.white, r.black, r.speed, r.ts,
+             zlib.compress(r.pgn.encode("utf-8")))
+            for r in records
+        ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO games (platform, game_id, white, black, speed, ts, pgn)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    def iter_games(
+        self,
+        platform: str,
+        username: str,
+        color: str,
+        speeds: str,
+        since_ts: int | None = None,
+        limit: int | None = None,
+    ) -> Iterator[tuple[str, str]]:
+        """Yield ``(color, pgn)`` for *username*'s stored games, newest first.
+
+        *color* is ``'white'``, ``'black'`` or ``'both'``; the yielded colour
+        is the one the player had in that game.  *since_ts* (Unix ms,
+        inclusive) and *limit* restrict the selection.
+        """
+        name = username.lower()
+        for record in self.iter_records(platform, username, color, speeds, since_ts, limit):
+            yield ("white" if record.white == name else "black"), record.pgn
+
+    def iter_records(
+        self,
+        platform: str,
+        username: str,
+        color: str,
+        speeds: str,
+        since_ts: int | None = None,
+        limit: int | None = None,
+    ) -> Iterator[GameRecord]:
+        """Yield the :class:`GameRecord` of each game :meth:`iter_games` selects."""
+        where, params = self._selection(platform, username, color, speeds, since_ts)
+        sql = (
+            f"SELECT game_id, white, black, speed, ts, pgn FROM games WHERE {where}"
+            " ORDER BY ts DESC, game_id"
+        )
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for *fields, pgn in rows:
+            yield GameRecord(*fields, zlib.decompress(pgn).decode("utf-8"))
+
+    def count(
+        self,
+        platform: str,
+        username: str,
+        color: str,
+        speeds: str,
+        since_ts: int | None = None,
+    ) -> int:
+        """Number of stored games :meth:`iter_games` would yield without a limit."""
+        where, params = self._selection(platform, username, color, speeds, since_ts)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM games WHERE {where}", params,
+            ).fetchone()[0]
+
+    def newest_ts(
+        self,
+        platform: str,
+        username: str,
+        color: str,
+        speeds: str,
+    ) -> int | None:
+        """Start time (Unix ms) of the newest stored game :meth:`iter_games` would yield."""
+        where, params = self._selection(platform, username, color, speeds, None)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT MAX(ts) FROM games WHERE {where}", params,
+            ).fetchone()[0]
+
+    @staticmethod
+    def _selection(
+        platform: str,
+        username: str,
+        color: str,
+        speeds: str,
+        since_ts: int | None,
+    ) -> tuple[str, list[Any]]:
+        if color not in ("white", "black", "both"):
+            raise ValueError(f"color must be 'white', 'black' or 'both', got {color!r}")
+        speed_list = speeds_key(speeds).split(",")
+        name = username.lower()
+        sides = "(white = ? OR black = ?)" if color == "both" else f"{color} = ?"
+        where = (
+            f"platform = ? AND {sides}"
+            f" AND speed IN ({', '.join('?' * len(speed_list))})"
+        )
+        params: list[Any] = [platform, name, name] if color == "both" else [platform, name]
+        params += speed_list
+        if since_ts is not None:
+            where += " AND ts >= ?"
+            params.append(since_ts)
+        return where, params
+
+    # ------------------------------------------------------------------
+    # Sync state
+    # ------------------------------------------------------------------
+
+    def sync_state(self, platform: str, username: str, speeds: str) -> SyncState:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT newest_ts, oldest_ts, complete, resume FROM syncs"
+                " WHERE platform = ? AND username = ? AND speeds = ?",
+                (platform, username.lower(), speeds_key(speeds)),
+            ).fetchone()
+        if row is None:
+            return SyncState()
+        newest, oldest, complete, resume = row
+        return SyncState(newest, oldest, bool(complete), json.loads(resume) if resume else None)
+
+    def save_sync_state(
+        self, platform: str, username: str, speeds: str, state: SyncState,
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO syncs"
+                " (platform, username, speeds, newest_ts, oldest_ts, complete, resume)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    platform, username.lower(), speeds_key(speeds),
+                    state.newest_ts, state.oldest_ts, int(state.complete),
+                    json.dumps(state.resume) if state.resume is not None else None,
+                ),
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_stores: dict[Path, GameStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store() -> GameStore:
+    """Return the process-wide store for the configured path."""
+    raw = os.environ.get("MYSECOND_GAME_STORE", "").strip()
+    path = (Path(raw) if raw else _DEFAULT_GAME_STORE).resolve()
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = GameStore(path)
+        return store
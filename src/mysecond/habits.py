@@ -35,7 +35,7 @@ import chess.pgn
 from .cache import Cache
 from .engine import Engine
 from .eval_cache import EvalCache
-from .fetcher import _backend_key, fetch_player_games, fetch_player_games_chesscom
+from .fetcher import _backend_key, fetch_player_games, fetch_player_games_chesscom, last_fetch_ts
 
 
 @dataclass
@@ -87,8 +87,8 @@ def analyze_habits(
     cache:
         Shared :class:`~mysecond.cache.Cache` instance.
     speeds:
-        Time controls used when the cache was populated (must match the
-        ``fetch-player-games`` run).
+        Time controls to analyse; the books of these speeds are added up, and
+        any that have not been fetched yet are fetched first.
     min_games:
         Minimum times the player must have reached a position for it to count.
     max_positions:
@@ -113,14 +113,7 @@ def analyze_habits(
     if verbose:
         print(f"{tag} Scanning cache ({color}, {platform}, {speeds}) …", flush=True)
 
-    all_positions = cache.scan_backend(backend)
-    # Exclude metadata entries (keys starting with _).
-    all_positions = [(f, p) for f, p in all_positions if not f.startswith("_")]
-
-    if verbose:
-        print(f"{tag} {len(all_positions)} cached positions found.", flush=True)
-
-    if not all_positions:
+    if last_fetch_ts(username, color, speeds, cache, platform=platform) is None:
         if verbose:
             print(f"{tag} No cached data — fetching from {platform} …", flush=True)
         if platform == "chesscom":
@@ -139,9 +132,7 @@ def analyze_habits(
                 speeds=speeds,
                 verbose=verbose,
             )
-        all_positions = cache.scan_backend(backend)
-        all_positions = [(f, p) for f, p in all_positions if not f.startswith("_")]
-        if not all_positions:
+        if not cache.has_backend(backend):
             if verbose:
                 print(f"{tag} No games found after fetch — check username and speeds.", flush=True)
             return []
@@ -149,13 +140,13 @@ def analyze_habits(
     # Collect every (fen, payload, move_data) triple where the position was
     # reached >= min_games times AND the specific move was played >= min_games
     # times.  We check ALL qualifying moves, not just the dominant one, so
-    # secondary habits are not missed.
+    # secondary habits are not missed.  The total-games and side-to-move
+    # filters run in SQL, so only qualifying positions are decoded and kept.
     by_fen: dict[str, tuple[dict[str, Any], list[dict[str, Any]]]] = {}
     total_pairs = 0
-    for fen, payload in all_positions:
-        total = payload.get("white", 0) + payload.get("draws", 0) + payload.get("black", 0)
-        if total < min_games:
-            continue
+    for fen, payload in cache.iter_backend(
+        backend, min_games=min_games, turn=color, skip_meta=True,
+    ):
         qualifying_moves = [
             m for m in payload.get("moves", [])
             if m.get("white", 0) + m.get("draws", 0) + m.get("black", 0) >= min_games
@@ -0,0 +1,145 @@
+"""Fast PGN reading for callers that need headers and part of the mainline.
+
+``chess.pgn.read_game`` builds a full game tree — every move, comment, clock
+annotation and variation — before a caller looks at it.  Book building only
+needs the first ``max_plies`` moves, game-phase analysis stops looking at the
+position once an endgame is reached, and game listings need headers alone.
+:func:`iter_mainlines` reads each game with :class:`MainlineVisitor`, which
+skips variations, never builds nodes, and stops parsing SAN (the expensive
+part) as soon as the caller has what it needs.  The remaining movetext is
+still scanned, so :attr:`MainlineGame.plies` reports the full game length.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, TextIO
+
+import chess
+import chess.pgn
+
+
+@dataclass(slots=True)
+class MainlineGame:
+    """Headers and the parsed part of one game's mainline."""
+
+    headers: chess.pgn.Headers
+    board: chess.Board   # position after the last parsed move; move_stack = parsed moves
+    plies: int           # mainline half-moves in the game text, parsed or not
+    stopped: bool        # True if the *stop* condition was met
+
+    @property
+    def moves(self) -> list[chess.Move]:
+        """The parsed mainline moves."""
+        return self.board.move_stack
+
+    def positions(self) -> Iterator[tuple[chess.Board, chess.Move]]:
+        """Yield ``(board, move)`` for each parsed move, *board* being the
+        position before it.  The same board object is updated in place."""
+        board = self.board.root()
+        for move in self.board.move_stack:
+            yield board, move
+            board.push(move)
+
+
+# Returned by the visitor for games rejected by *accept*; never yielded.
+_REJECTED: Any = object()
+
+
+class MainlineVisitor(chess.pgn.BaseVisitor[Any]):
+    """Collect a game's headers and mainline without building a game tree.
+
+    max_plies:
+        Parse at most this many half-moves (``None`` = all).  ``0`` reads the
+        headers only and skips the movetext entirely, like
+        ``chess.pgn.read_headers``.
+    stop:
+        Called with the board after each parsed move; once it returns True no
+        further moves are parsed and the game is marked :attr:`~MainlineGame.stopped`.
+    accept:
+        Called with the headers; games for which it returns False are skipped
+        without reading their moves.
+
+    Illegal or ambiguous SAN ends the mainline at the last legal move, as the
+    standard game builder does.
+    """
+
+    def __init__(
+        self,
+        max_plies: int | None = None,
+        stop: Callable[[chess.Board], bool] | None = None,
+        accept: Callable[[chess.pgn.Headers], bool] | None = None,
+    ) -> None:
+        self._max_plies = max_plies
+        self._stop = stop
+        self._accept = accept
+
+    def begin_game(self) -> None:
+        self._headers = chess.pgn.Headers()
+        self._board: chess.Board | None = None
+        self._parsed = 0
+        self._plies = 0
+        self._stopped = False
+        self._rejected = False
+
+    def visit_header(self, tagname: str, tagvalue: str) -> None:
+        self._headers[tagname] = tagvalue
+
+    def end_headers(self) -> Any:
+        if self._accept is not None and not self._accept(self._headers):
+            self._rejected = True
+            return chess.pgn.SKIP
+        if self._max_plies == 0:
+            self._board = self._headers.board()
+            return chess.pgn.SKIP
+        return None
+
+    def visit_board(self, board: chess.Board) -> None:
+        # Called with the start position and after every SAN token; variations
+        # are skipped, so this is always the reader's mainline board.
+        self._board = board
+        if self._stop is not None and self._parsed and not self._stopped:
+            self._stopped = self._stop(board)
+
+    def begin_variation(self) -> Any:
+        return chess.pgn.SKIP
+
+    def begin_parse_san(self, board: chess.Board, san: str) -> Any:
+        self._plies += 1
+        if self._stopped or (self._max_plies is not None and self._parsed >= self._max_plies):
+            return chess.pgn.SKIP
+        return None
+
+    def visit_move(self, board: chess.Board, move: chess.Move) -> None:
+        self._parsed += 1
+
+    def handle_error(self, error: Exception) -> None:
+        # The reader skips the rest of the mainline; keep what was parsed.
+        self._plies -= 1
+
+    def result(self) -> Any:
+        if self._rejected:
+            return _REJECTED
+        board = self._board if self._board is not None else self._headers.board()
+        return MainlineGame(self._headers, board, self._plies, self._stopped)
+
+
+def iter_mainlines(
+    handle: TextIO,
+    max_plies: int | None = None,
+    stop: Callable[[chess.Board], bool] | None = None,
+    accept: Callable[[chess.pgn.Headers], bool] | None = None,
+) -> Iterator[MainlineGame]:
+    """Yield a :class:`MainlineGame` for each game in *handle*.
+
+    See :class:`MainlineVisitor` for the parameters.  Games rejected by
+    *accept* are not yielded.
+    """
+    while True:
+        game = chess.pgn.read_game(
+            handle, Visitor=lambda: MainlineVisitor(max_plies, stop, accept),
+        )
+        if game is None:
+            return
+        if game is not _REJECTED:
+            yield game
@@ -0,0 +1,368 @@
+"""Local masters opening index built from bulk PGN databases.
+
+``mysecond build-masters-db`` streams OTB collections (TWIC issues,
+federation exports, …) into a SQLite position index, and
+:class:`LocalMastersExplorer` serves :class:`~mysecond.models.ExplorerData`
+from it with the same interface as :class:`~mysecond.explorer.LichessExplorer`
+— so the theory walk can run without touching the rate-limited masters API
+(``SearchConfig.masters_db``).
+
+Index layout
+------------
+Positions are keyed by their Polyglot Zobrist hash (a signed 64-bit SQLite
+integer), which keeps the index a fraction of the size of FEN-keyed tables:
+
+* ``positions(key, white, draws, black)`` — games that reached the position;
+* ``moves(key, uci, white, draws, black, rating_sum, rating_games)`` — games
+  continuing with each move, plus the rating total behind ``averageRating``;
+* ``sources(name, size, mtime, games)`` — PGN files already imported, so
+  re-running the command over a growing directory only adds new files.
+
+Each file is imported atomically: its counts are staged in temporary tables
+and added to the index in the same transaction that records it in
+``sources``, so an interrupted run leaves no partial file behind to be
+counted twice when it is run again.
+
+Memory
+------
+Games are parsed one at a time and only the first ``max_plies`` half-moves
+are read.  Counts are aggregated in memory for ``batch_games`` games and then
+added to the staging tables with one upsert transaction, so memory stays
+bounded by the batch no matter how large the input is.
+"""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import IO, Callable, Iterable
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+from .mainline import iter_mainlines
+from .models import ExplorerData, MoveStats
+
+_DEFAULT_MASTERS_DB = Path("data/masters.sqlite")
+
+# Games aggregated in memory between index upserts.
+_BATCH_GAMES = 20_000
+
+_RESULTS = {"1-0": 0, "1/2-1/2": 1, "0-1": 2}   # → index into (white, draws, black)
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS positions (
+    key   INTEGER PRIMARY KEY,
+    white INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    black INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS moves (
+    key          INTEGER NOT NULL,
+    uci          TEXT    NOT NULL,
+    white        INTEGER NOT NULL,
+    draws        INTEGER NOT NULL,
+    black        INTEGER NOT NULL,
+    rating_sum   INTEGER NOT NULL,
+    rating_games INTEGER NOT NULL,
+    PRIMARY KEY (key, uci)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (
+    name  TEXT PRIMARY KEY,
+    size  INTEGER NOT NULL,
+    mtime REAL    NOT NULL,
+    games INTEGER NOT NULL
+);
+"""
+
+# One file's counts, merged into the index once the whole file is read.
+_STAGING_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS staged_positions (
+    key   INTEGER PRIMARY KEY,
+    white INTEGER NOT NULL,
+    draws INTEGER NOT NULL,
+    black INTEGER NOT NULL
+);
+CREATE TEMP TABLE IF NOT EXISTS staged_moves (
+    key          INTEGER NOT NULL,
+    uci          TEXT    NOT NULL,
+    white        INTEGER NOT NULL,
+    draws        INTEGER NOT NULL,
+    black        INTEGER NOT NULL,
+    rating_sum   INTEGER NOT NULL,
+    rating_games INTEGER NOT NULL,
+    PRIMARY KEY (key, uci)
+) WITHOUT ROWID;
+DELETE FROM staged_positions;
+DELETE FROM staged_moves;
+"""
+
+# The upserts take their target table and rows (a VALUES list or a SELECT;
+# "WHERE true" keeps SQLite from reading ON CONFLICT as a join clause).
+_POSITION_UPSERT = """
+INSERT INTO {table} (key, white, draws, black) {rows}
+ON CONFLICT(key) DO UPDATE SET
+    white = white + excluded.white,
+    draws = draws + excluded.draws,
+    black = black + excluded.black
+"""
+
+_MOVE_UPSERT = """
+INSERT INTO {table} (key, uci, white, draws, black, rating_sum, rating_games) {rows}
+ON CONFLICT(key, uci) DO UPDATE SET
+    white        = white + excluded.white,
+    draws        = draws + excluded.draws,
+    black        = black + excluded.black,
+    rating_sum   = rating_sum + excluded.rating_sum,
+    rating_games = rating_games + excluded.rating_games
+"""
+
+
+def _db_key(board: chess.Board) -> int:
+    """Zobrist hash of *board* as a signed 64-bit SQLite integer."""
+    key = chess.polyglot.zobrist_hash(board)
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+# ---------------------------------------------------------------------------
+# PGN reading
+# ---------------------------------------------------------------------------
+
+
+def _accept(min_elo: int) -> Callable[[chess.pgn.Headers], bool]:
+    """Header filter: decided or drawn standard games, both players >= *min_elo*."""
+
+    def accept(headers: chess.pgn.Headers) -> bool:
+        if headers.get("Result") not in _RESULTS or headers.get("Variant", "Standard") != "Standard":
+            return False
+        return not min_elo or min(_elo(headers, "WhiteElo"), _elo(headers, "BlackElo")) >= min_elo
+
+    return accept
+
+
+def _elo(headers: chess.pgn.Headers, name: str) -> int:
+    try:
+        return int(headers.get(name, ""))
+    except ValueError:
+        return 0
+
+
+def _open_pgn(path: Path) -> IO[str]:
+    """Open a plain, ``.gz`` or ``.bz2`` PGN file for streaming text reads."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    if path.suffix == ".bz2":
+        return bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+
+def build_masters_db(
+    pgn_paths: Iterable[Path],
+    db_path: Path = _DEFAULT_MASTERS_DB,
+    max_plies: int = 30,
+    min_elo: int = 2200,
+    batch_games: int = _BATCH_GAMES,
+    force: bool = False,
+    verbose: bool = True,
+) -> int:
+    """Add the games in *pgn_paths* to the local masters index at *db_path*.
+
+    Parameters
+    ----------
+    pgn_paths:
+        PGN files (plain, ``.gz`` or ``.bz2``).  Files already imported with
+        the same size and mtime are skipped unless *force* is set (which
+        counts their games again).
+    max_plies:
+        Index each game's first *max_plies* half-moves.
+    min_elo:
+        Skip games where either player is rated below this (or unrated).
+        ``0`` keeps every game.
+    batch_games:
+        Games aggregated in memory between index writes.
+
+    Returns
+    -------
+    int
+        Number of games added.
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_DDL)
+    total_games = 0
+    try:
+        for path in pgn_paths:
+            stat = path.stat()
+            row = conn.execute(
+                "SELECT size, mtime FROM sources WHERE name = ?", (str(path.resolve()),),
+            ).fetchone()
+            if row is not None and tuple(row) == (stat.st_size, stat.st_mtime) and not force:
+                if verbose:
+                    print(f"[masters-db] {path.name}: already imported, skipping", flush=True)
+                continue
+            games = _import_file(conn, path, max_plies, min_elo, batch_games, verbose)
+            with conn:
+                conn.execute(_POSITION_UPSERT.format(
+                    table="positions", rows="SELECT * FROM staged_positions WHERE true",
+                ))
+                conn.execute(_MOVE_UPSERT.format(
+                    table="moves", rows="SELECT * FROM staged_moves WHERE true",
+                ))
+                conn.execute(
+                    "INSERT OR REPLACE INTO sources (name, size, mtime, games)"
+                    " VALUES (?, ?, ?, ?)",
+                    (str(path.resolve()), stat.st_size, stat.st_mtime, games),
+                )
+            total_games += games
+    finally:
+        conn.close()
+    return total_games
+
+
+def _import_file(
+    conn: sqlite3.Connection,
+    path: Path,
+    max_plies: int,
+    min_elo: int,
+    batch_games: int,
+    verbose: bool,
+) -> int:
+    """Stage the counts of *path*'s games in the temporary tables; return the game count."""
+    # key → [white, draws, black]; (key, uci) → [white, draws, black, rating_sum, rating_games]
+    positions: dict[int, list[int]] = {}
+    moves: dict[tuple[int, str], list[int]] = {}
+    games = batch = 0
+    started = time.monotonic()
+    conn.executescript(_STAGING_DDL)
+
+    with _open_pgn(path) as handle:
+        for game in iter_mainlines(handle, max_plies=max_plies, accept=_accept(min_elo)):
+            if not game.moves:
+                continue
+            outcome = _RESULTS[game.headers["Result"]]
+            white, black = _elo(game.headers, "WhiteElo"), _elo(game.headers, "BlackElo")
+            rating = (white + black) // 2 if white and black else 0
+            keys: list[int] = []
+            ucis: list[str] = []
+            for board, move in game.positions():
+                keys.append(_db_key(board))
+                ucis.append(move.uci())
+            keys.append(_db_key(game.board))   # the position after the last move
+            for key in keys:
+                counts = positions.get(key)
+                if counts is None:
+                    counts = positions[key] = [0, 0, 0]
+                counts[outcome] += 1
+            for key, uci in zip(keys, ucis):
+                counts = moves.get((key, uci))
+                if counts is None:
+                    counts = moves[(key, uci)] = [0, 0, 0, 0, 0]
+                counts[outcome] += 1
+                if rating:
+                    counts[3] += rating
+                    counts[4] += 1
+            games += 1
+            batch += 1
+            if batch >= batch_games:
+                _flush(conn, positions, moves)
+                batch = 0
+                if verbose:
+                    rate = games / max(time.monotonic() - started, 1e-9)
+                    print(f"[masters-db] {path.name}: {games:,} games "
+                          f"({rate:,.0f} games/s)", flush=True)
+    _flush(conn, positions, moves)
+    if verbose:
+        print(f"[masters-db] {path.name}: {games:,} games indexed", flush=True)
+    return games
+
+
+def _flush(
+    conn: sqlite3.Connection,
+    positions: dict[int, list[int]],
+    moves: dict[tuple[int, str], list[int]],
+) -> None:
+    """Add the aggregated counts to the staging tables and clear them."""
+    if not positions:
+        return
+    with conn:
+        conn.executemany(
+            _POSITION_UPSERT.format(table="staged_positions", rows="VALUES (?, ?, ?, ?)"),
+            ((k, *c) for k, c in positions.items()),
+        )
+        conn.executemany(
+            _MOVE_UPSERT.format(table="staged_moves", rows="VALUES (?, ?, ?, ?, ?, ?, ?)"),
+            ((k, u, *c) for (k, u), c in moves.items()),
+        )
+    positions.clear()
+    moves.clear()
+
+
+# ---------------------------------------------------------------------------
+# Explorer backend
+# ---------------------------------------------------------------------------
+
+
+class LocalMastersExplorer:
+    """Drop-in replacement for :class:`~mysecond.explorer.LichessExplorer`.
+
+    Serves explorer data from an index built by :func:`build_masters_db`;
+    never touches the network.  Positions missing from the index are
+    reported with zero games, as the Lichess API does.
+    """
+
+    def __init__(self, db_path: Path = _DEFAULT_MASTERS_DB) -> None:
+        if not db_path.exists():
+            raise FileNotFoundError(
+                f"Masters index not found: {db_path} (run 'mysecond build-masters-db' first)"
+            )
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA query_only=ON")
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._lock = threading.Lock()
+
+    def get_data(self, fen: str) -> ExplorerData:
+        """Return explorer data for *fen* from the local index."""
+        key = _db_key(chess.Board(fen))
+        with self._lock:
+            pos = self._conn.execute(
+                "SELECT white, draws, black FROM positions WHERE key = ?", (key,),
+            ).fetchone()
+            rows = self._conn.execute(
+                "SELECT uci, white, draws, black, rating_sum, rating_games"
+                " FROM moves WHERE key = ?",
+                (key,),
+            ).fetchall() if pos else []
+        if pos is None:
+            return ExplorerData(white=0, draws=0, black=0, moves=[])
+        moves = [
+            MoveStats(
+                uci=uci, white=w, draws=d, black=b,
+                average_rating=rating_sum // rating_games if rating_games else 0,
+            )
+            for uci, w, d, b, rating_sum, rating_games in rows
+        ]
+        return ExplorerData(white=pos[0], draws=pos[1], black=pos[2], moves=moves)
+
+    def prefetch(self, fens: Iterable[str]) -> None:
+        """No-op: lookups are local."""
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "LocalMastersExplorer":
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
@@ -12,7 +12,7 @@ import chess
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class EngineEval:
     """Engine evaluation at a single depth."""
 
@@ -42,7 +42,7 @@ class EngineEval:
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class MoveStats:
     """Per-move statistics returned by the opening explorer."""
 
@@ -57,18 +57,29 @@ class MoveStats:
         return self.white + self.draws + self.black
 
 
-@dataclass
+@dataclass(slots=True)
 class ExplorerData:
     """Full opening-explorer response for a position.
 
     ``moves`` contains only moves that have been played in the reference
     database.  Any move *not* present in this list has **zero** master games.
+
+    ``moves`` is sorted by game count (descending, stable) and indexed by UCI
+    when the object is built, so the walk's per-candidate lookups are O(1).
+    Treat it as read-only.
     """
 
     white: int
     draws: int
     black: int
     moves: list[MoveStats] = field(default_factory=list)
+    _by_uci: dict[str, MoveStats] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.moves = sorted(self.moves, key=lambda m: -m.total)   # never the caller's list
+        self._by_uci = {}
+        for m in self.moves:
+            self._by_uci.setdefault(m.uci, m)
 
     @property
     def total(self) -> int:
@@ -76,14 +87,12 @@ class ExplorerData:
 
     def games_for_move(self, uci: str) -> int:
         """Return the number of master games for *uci*, 0 if not in database."""
-        for m in self.moves:
-            if m.uci == uci:
-                return m.total
-        return 0
+        m = self._by_uci.get(uci)
+        return m.total if m is not None else 0
 
     def top_moves(self, n: int) -> list[MoveStats]:
         """Return the *n* most-played moves, sorted by game count descending."""
-        return sorted(self.moves, key=lambda m: -m.total)[:n]
+        return self.moves[:n]
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,400 @@
+"""Record, replay or redirect every HTTP exchange with Lichess and Chess.com.
+
+All network clients (explorers, game downloads, profile lookups) create their
+sessions with :func:`session` — or call :func:`get` for one-off requests — so
+one environment variable switches the whole program between live and
+offline operation:
+
+``MYSECOND_NET_MODE=record``
+    Requests go to the live services as usual and every exchange is appended
+    to the archive.
+``MYSECOND_NET_MODE=replay``
+    Nothing leaves the host.  Each request is answered from the archive —
+    repeated requests get the recorded responses in recorded order, the last
+    one repeating once they run out — and a request that was never recorded
+    fails with :class:`requests.ConnectionError`, which every client already
+    treats as a network failure.  Shared rate limits are bypassed.
+``MYSECOND_NET_SERVER=http://127.0.0.1:8765``
+    Requests are sent to the stand-in server started with
+    ``mysecond net-serve`` (:func:`serve`) instead of the real hosts.
+
+Other settings:
+
+``MYSECOND_NET_ARCHIVE``
+    Archive path (default ``data/net-archive.sqlite``).
+``MYSECOND_NET_LATENCY``
+    In replay mode, delay each response by its recorded duration
+    (``recorded``) or by a fixed number of seconds (e.g. ``0.05``).
+
+Archive
+-------
+A SQLite file with one row per exchange: the request key (method and URL with
+sorted query parameters; credentials are never part of it), status, headers,
+the zlib-compressed body and the time the live request took.  Several
+processes may record into the same archive at once.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import IO, Any
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+_DEFAULT_ARCHIVE = Path("data/net-archive.sqlite")
+
+_MODES = ("live", "record", "replay")
+
+# Headers describing the wire encoding, which no longer applies once the body
+# has been decoded and stored.
+_WIRE_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection"})
+
+# Recorded bodies are copied in chunks of this size, and kept in memory only
+# up to _SPOOL_BYTES before spilling to a temporary file, so a large streamed
+# download (e.g. a player's game export) is never held whole.
+_CHUNK_BYTES = 64 * 1024
+_SPOOL_BYTES = 1024 * 1024
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS exchanges (
+    seq     INTEGER PRIMARY KEY AUTOINCREMENT,
+    key     TEXT NOT NULL,
+    status  INTEGER NOT NULL,
+    reason  TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    body    BLOB NOT NULL,
+    elapsed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_exchanges_key ON exchanges (key, seq);
+"""
+
+
+def mode() -> str:
+    """Return the current network mode: ``live``, ``record`` or ``replay``."""
+    value = os.environ.get("MYSECOND_NET_MODE", "").strip().lower() or "live"
+    if value not in _MODES:
+        raise ValueError(
+            f"MYSECOND_NET_MODE must be one of {', '.join(_MODES)}, got {value!r}"
+        )
+    return value
+
+
+def offline() -> bool:
+    """True if no request reaches the real services (replay or stand-in server)."""
+    return mode() == "replay" or bool(_server_url())
+
+
+def request_key(method: str, url: str) -> str:
+    """Return the archive key for a request: method plus canonical URL."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}" + (
+        f"?{query}" if query else ""
+    )
+
+
+def _server_url() -> str:
+    return os.environ.get("MYSECOND_NET_SERVER", "").strip().rstrip("/")
+
+
+def _archive_path() -> Path:
+    path = os.environ.get("MYSECOND_NET_ARCHIVE", "").strip()
+    return Path(path) if path else _DEFAULT_ARCHIVE
+
+
+def _latency(recorded: float) -> float:
+    value = os.environ.get("MYSECOND_NET_LATENCY", "").strip().lower()
+    if not value:
+        return 0.0
+    if value == "recorded":
+        return recorded
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return 0.0
+
+
+# ---------------------------------------------------------------------------
+# Archive
+# ---------------------------------------------------------------------------
+
+
+class Archive:
+    """Recorded HTTP exchanges, appended by *record* and consumed by *replay*.
+
+    Safe to share between threads.  Replay keeps one cursor per request key,
+    so a sequence of identical requests (e.g. retries after a 429) is served
+    the same sequence of responses it got when it was recorded.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(str(path), timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_DDL)
+        self._lock = threading.Lock()
+        self._cursors: dict[str, int] = {}
+
+    def append(
+        self,
+        key: str,
+        status: int,
+        reason: str,
+        headers: dict[str, str],
+        body: bytes | IO[bytes],
+        elapsed: float,
+    ) -> None:
+        """Record one exchange.
+
+        *body* is the decoded response body, either as bytes or as a file
+        read from its current position to the end.  A file is compressed and
+        written to the archive chunk by chunk.
+        """
+        kept = {k: v for k, v in headers.items() if k.lower() not in _WIRE_HEADERS}
+        if isinstance(body, bytes):
+            packed: IO[bytes] = tempfile.SpooledTemporaryFile(_SPOOL_BYTES)
+            packed.write(zlib.compress(body))
+        else:
+            packed = _compress(body)
+        size = packed.tell()
+        packed.seek(0)
+        with packed, self._lock, self._conn:
+            row = self._conn.execute(
+                "INSERT INTO exchanges (key, status, reason, headers, body, elapsed)"
+                " VALUES (?, ?, ?, ?, zeroblob(?), ?)",
+                (key, status, reason, json.dumps(kept), size, elapsed),
+            ).lastrowid
+            with self._conn.blobopen("exchanges", "body", row) as blob:
+                while chunk := packed.read(_CHUNK_BYTES):
+                    blob.write(chunk)
+
+    def next(self, key: str) -> tuple[int, str, dict[str, str], bytes, float] | None:
+        """Return the next recorded ``(status, reason, headers, body, elapsed)`` for *key*."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, reason, headers, body, elapsed FROM exchanges"
+                " WHERE key = ? ORDER BY seq",
+                (key,),
+            ).fetchall()
+            if not rows:
+                return None
+            i = self._cursors.get(key, 0)
+            self._cursors[key] = i + 1
+        status, reason, headers, body, elapsed = rows[min(i, len(rows) - 1)]
+        return status, reason, json.loads(headers), zlib.decompress(body), elapsed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM exchanges").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _compress(body: IO[bytes]) -> IO[bytes]:
+    """Return a temporary file holding *body* zlib-compressed, positioned at its end."""
+    packer = zlib.compressobj()
+    packed = tempfile.SpooledTemporaryFile(_SPOOL_BYTES)
+    while chunk := body.read(_CHUNK_BYTES):
+        packed.write(packer.compress(chunk))
+    packed.write(packer.flush())
+    return packed
+
+
+_archives: dict[Path, Archive] = {}
+_archives_lock = threading.Lock()
+
+
+def _archive() -> Archive:
+    path = _archive_path().resolve()
+    with _archives_lock:
+        archive = _archives.get(path)
+        if archive is None:
+            archive = _archives[path] = Archive(path)
+        return archive
+
+
+# ---------------------------------------------------------------------------
+# Client side
+# ---------------------------------------------------------------------------
+
+
+class _NetModeAdapter(HTTPAdapter):
+    """Transport adapter that records, replays or redirects each request."""
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        key = request_key(request.method or "GET", request.url or "")
+        current = mode()
+        if current == "replay":
+            return self._replay(request, key)
+
+        server = _server_url()
+        if server:
+            parts = urlsplit(request.url or "")
+            request.url = f"{server}/{parts.netloc}{parts.path}" + (
+                f"?{parts.query}" if parts.query else ""
+            )
+        started = time.monotonic()
+        resp = super().send(request, **kwargs)
+        if current == "record":
+            self._record(resp, key, started)
+        return resp
+
+    def _record(self, resp: requests.Response, key: str, started: float) -> None:
+        """Archive *resp* and leave its body readable by the caller.
+
+        The body is copied chunk by chunk into a spooled temporary file, which
+        then feeds the archive and replaces the response's raw stream, so
+        ``stream=True`` callers can still iterate it without the whole body
+        ever being held in memory.
+        """
+        spool = tempfile.SpooledTemporaryFile(_SPOOL_BYTES)
+        for chunk in resp.iter_content(_CHUNK_BYTES):
+            spool.write(chunk)
+        elapsed = time.monotonic() - started
+        spool.seek(0)
+        _archive().append(
+            key, resp.status_code, resp.reason or "", dict(resp.headers), spool, elapsed,
+        )
+        spool.seek(0)
+        resp.raw = spool
+        resp._content = False
+        resp._content_consumed = False
+
+    def _replay(self, request: requests.PreparedRequest, key: str) -> requests.Response:
+        recorded = _archive().next(key)
+        if recorded is None:
+            raise requests.ConnectionError(
+                f"No recorded response for {key} in {_archive_path()}", request=request,
+            )
+        status, reason, headers, body, elapsed = recorded
+        delay = _latency(elapsed)
+        if delay:
+            time.sleep(delay)
+        return _build_response(request, status, reason, headers, body, elapsed)
+
+
+def _build_response(
+    request: requests.PreparedRequest,
+    status: int,
+    reason: str,
+    headers: dict[str, str],
+    body: bytes,
+    elapsed: float,
+) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.reason = reason
+    resp.headers = CaseInsensitiveDict(headers)
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp.url = request.url or ""
+    resp.request = request
+    resp.elapsed = timedelta(seconds=elapsed)
+    resp._content = body
+    resp._content_consumed = True
+    return resp
+
+
+def session() -> requests.Session:
+    """Return a :class:`requests.Session` that honours the network mode.
+
+    In live mode without a stand-in server this is a plain session.
+    """
+    s = requests.Session()
+    if mode() != "live" or _server_url():
+        adapter = _NetModeAdapter()
+        s.mount("https://", adapter)
+        s.mount("http://", adapter)
+    return s
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    """One-off GET that honours the network mode (see :func:`session`)."""
+    if mode() == "live" and not _server_url():
+        return requests.get(url, **kwargs)
+    with session() as s:
+        return s.get(url, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Stand-in server
+# ---------------------------------------------------------------------------
+
+_EMPTY_EXPLORER = {"white": 0, "draws": 0, "black": 0, "moves": [], "topGames": []}
+
+
+def _fallback(host: str, path: str) -> tuple[int, str, bytes]:
+    """Minimal valid answer for a request the archive has no recording of.
+
+    Returns ``(status, content_type, body)``: an empty explorer position, an
+    empty game export, a Chess.com player with no archives, or 404.
+    """
+    segments = [s for s in path.split("/") if s]
+    if host == "explorer.lichess.ovh":
+        return 200, "application/json", json.dumps(_EMPTY_EXPLORER).encode()
+    if host == "lichess.org" and path.startswith("/api/games/user/"):
+        return 200, "application/x-chess-pgn", b""
+    if host == "api.chess.com" and segments[:2] == ["pub", "player"] and len(segments) >= 3:
+        rest = segments[3:]
+        if not rest:
+            return 200, "application/json", json.dumps({"username": segments[2]}).encode()
+        if rest == ["games", "archives"]:
+            return 200, "application/json", b'{"archives": []}'
+        if len(rest) == 3 and rest[0] == "games":
+            return 200, "application/json", b'{"games": []}'
+    return 404, "application/json", b'{"error": "Not found"}'
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Serve ``/<host>/<path>?<query>`` from the archive, else a fallback."""
+
+    archive: Archive
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        host, _, path = parts.path.lstrip("/").partition("/")
+        url = f"https://{host}/{path}" + (f"?{parts.query}" if parts.query else "")
+        recorded = self.archive.next(request_key("GET", url))
+        if recorded is not None:
+            status, _, headers, body, _ = recorded
+        else:
+            status, content_type, body = _fallback(host, "/" + path)
+            headers = {"Content-Type": content_type}
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        print(f"[net-serve] {self.address_string()} {format % args}", flush=True)
+
+
+def serve(
+    archive_path: Path = _DEFAULT_ARCHIVE,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+) -> ThreadingHTTPServer:
+    """Return a stand-in server for the Lichess and Chess.com endpoints.
+
+    Requests are answered from the archive at *archive_path* (which may be
+    empty or missing) and otherwise with :func:`_fallback`.  Call
+    ``serve_forever()`` on the result to run it.
+    """
+    handler = type("_Handler", (_StandInHandler,), {"archive": Archive(archive_path)})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,294 @@
+"""Host- or cluster-wide rate limiting for the Lichess and Chess.com APIs.
+
+Every outgoing HTTP request first takes a token from the bucket of its
+endpoint with :func:`acquire`, then reports the response with
+:func:`record_response`.  Buckets are shared by all processes using the same
+state store, so ten concurrent jobs together stay inside one limit instead of
+each assuming it has the whole budget.
+
+State store
+-----------
+``MYSECOND_RATE_LIMIT_REDIS=redis://…``
+    Buckets live in Redis and are shared across hosts.  Requires the
+    ``redis`` package (the ``web`` extra).
+otherwise
+    Buckets live in a small SQLite file (``MYSECOND_RATE_LIMIT_DB``, default
+    ``mysecond-ratelimit.sqlite`` in the system temp directory) and are shared
+    by every process on the host.  SQLite's write lock makes each
+    take-a-token step atomic.
+
+Adaptation
+----------
+A 429 halves the bucket's refill rate (down to a floor) and blocks the bucket
+until ``Retry-After`` — or a default pause when the header is missing — so
+every process waits out the penalty instead of each backing off blindly.
+Each successful response then adds back a small step, up to the endpoint's
+configured rate; once it is reached, successes are not written at all.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from . import netmode
+
+
+@dataclass(frozen=True)
+class _Limit:
+    rate: float        # tokens per second when healthy
+    burst: float       # bucket capacity
+    min_rate: float    # floor after repeated 429s
+    penalty: float     # pause (s) after a 429 without Retry-After
+
+
+# Endpoint name → limit.  Rates match the spacing the clients used before
+# limits were shared (e.g. 0.5 s between /player requests).  Chess.com limits
+# concurrency rather than rate; archive downloads adapt their parallelism to
+# its 429s, so its bucket only guards against bursts.
+_LIMITS: dict[str, _Limit] = {
+    "lichess-explorer": _Limit(rate=5.0, burst=5, min_rate=0.5, penalty=60.0),
+    "lichess-player":   _Limit(rate=2.0, burst=2, min_rate=0.2, penalty=60.0),
+    "lichess-api":      _Limit(rate=1.0, burst=3, min_rate=0.1, penalty=60.0),
+    "chesscom":         _Limit(rate=3.0, burst=3, min_rate=0.1, penalty=10.0),
+}
+
+# Rate regained per successful response after a 429, as a fraction of the
+# endpoint's healthy rate.
+_RECOVERY_STEP = 0.05
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name          TEXT PRIMARY KEY,
+    tokens        REAL NOT NULL,
+    rate          REAL NOT NULL,
+    updated       REAL NOT NULL,
+    blocked_until REAL NOT NULL
+)
+"""
+
+# Same token-bucket step as _SqliteStore.take, run atomically inside Redis.
+# Returns the seconds to wait (as a string), "0" if a token was taken.
+_REDIS_TAKE = """
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'rate', 'updated', 'blocked_until')
+local now, burst, max_rate = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local tokens = tonumber(b[1]) or burst
+local rate = tonumber(b[2]) or max_rate
+local updated = tonumber(b[3]) or now
+local blocked = tonumber(b[4]) or 0
+if now < blocked then return tostring(blocked - now) end
+tokens = math.min(burst, tokens + math.max(0, now - math.max(updated, blocked)) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'rate', rate, 'updated', now, 'blocked_until', blocked)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+_REDIS_ADJUST = """
+local now, max_rate, min_rate = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or max_rate
+if ARGV[4] ~= 'throttled' and rate >= max_rate then return 0 end
+local blocked = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+if ARGV[4] == 'throttled' then
+  rate = math.max(min_rate, rate / 2)
+  blocked = math.max(blocked, now + tonumber(ARGV[5]))
+  redis.call('HSET', KEYS[1], 'tokens', 0, 'updated', now)
+else
+  rate = math.min(max_rate, rate + max_rate * tonumber(ARGV[5]))
+end
+redis.call('HSET', KEYS[1], 'rate', rate, 'blocked_until', blocked)
+redis.call('EXPIRE', KEYS[1], 3600)
+return 1
+"""
+
+
+class _SqliteStore:
+    """Bucket state in a SQLite file shared by the processes on one host."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: transactions are managed explicitly below.
+        self._conn = sqlite3.connect(
+            str(path), timeout=60, check_same_thread=False, isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_DDL)
+        self._lock = threading.Lock()
+
+    def take(self, name: str, limit: _Limit, now: float) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, rate, updated, blocked = self._load(name, limit, now)
+                if now < blocked:
+                    wait = blocked - now
+                else:
+                    tokens = min(limit.burst, tokens + max(0.0, now - max(updated, blocked)) * rate)
+                    wait = 0.0
+                    if tokens >= 1:
+                        tokens -= 1
+                    else:
+                        wait = (1 - tokens) / rate
+                    self._save(name, tokens, rate, now, blocked)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    def adjust(self, name: str, limit: _Limit, now: float, throttled: bool, value: float) -> None:
+        with self._lock:
+            if not throttled:
+                # Nothing to recover: skip the write lock on the common path.
+                row = self._conn.execute(
+                    "SELECT rate FROM buckets WHERE name = ?", (name,),
+                ).fetchone()
+                if row is None or row[0] >= limit.rate:
+                    return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, rate, updated, blocked = self._load(name, limit, now)
+                if throttled:
+                    rate = max(limit.min_rate, rate / 2)
+                    blocked = max(blocked, now + value)
+                    tokens, updated = 0.0, now
+                else:
+                    rate = min(limit.rate, rate + limit.rate * value)
+                self._save(name, tokens, rate, updated, blocked)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _load(self, name: str, limit: _Limit, now: float) -> tuple[float, float, float, float]:
+        row = self._conn.execute(
+            "SELECT tokens, rate, updated, blocked_until FROM buckets WHERE name = ?", (name,),
+        ).fetchone()
+        return row if row is not None else (limit.burst, limit.rate, now, 0.0)
+
+    def _save(self, name: str, tokens: float, rate: float, updated: float, blocked: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO buckets (name, tokens, rate, updated, blocked_until)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (name, tokens, rate, updated, blocked),
+        )
+
+
+class _RedisStore:
+    """Bucket state in Redis, shared by every host using the same server."""
+
+    def __init__(self, url: str) -> None:
+        import redis  # optional dependency (web extra)
+
+        client = redis.Redis.from_url(url)
+        self._take = client.register_script(_REDIS_TAKE)
+        self._adjust = client.register_script(_REDIS_ADJUST)
+
+    def take(self, name: str, limit: _Limit, now: float) -> float:
+        return float(self._take(
+            keys=[f"mysecond:ratelimit:{name}"], args=[now, limit.burst, limit.rate],
+        ))
+
+    def adjust(self, name: str, limit: _Limit, now: float, throttled: bool, value: float) -> None:
+        self._adjust(
+            keys=[f"mysecond:ratelimit:{name}"],
+            args=[now, limit.rate, limit.min_rate, "throttled" if throttled else "ok", value],
+        )
+
+
+class RateLimiter:
+    """Shared token buckets, one per endpoint name in ``_LIMITS``.
+
+    Most code should use the module-level :func:`acquire` and
+    :func:`record_response`, which share one limiter per process.
+    """
+
+    def __init__(self, store: _SqliteStore | _RedisStore) -> None:
+        self._store = store
+
+    def acquire(self, endpoint: str) -> float:
+        """Block until a request to *endpoint* may be sent; return seconds waited."""
+        limit = _LIMITS[endpoint]
+        waited = 0.0
+        while True:
+            # Wall-clock time: it is compared across processes.
+            wait = self._store.take(endpoint, limit, time.time())
+            if wait <= 0:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+    def record_response(self, endpoint: str, resp: Any) -> None:
+        """Adapt *endpoint*'s rate to the status of *resp* (429 or not)."""
+        limit = _LIMITS[endpoint]
+        if resp.status_code == 429:
+            self._store.adjust(
+                endpoint, limit, time.time(), True, _retry_after(resp, limit.penalty),
+            )
+        elif resp.status_code < 400:
+            self._store.adjust(endpoint, limit, time.time(), False, _RECOVERY_STEP)
+
+
+def _retry_after(resp: Any, default: float) -> float:
+    """Seconds from a ``Retry-After`` header, or *default*."""
+    value = resp.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value else default
+    except (TypeError, ValueError):
+        return default
+
+
+# ---------------------------------------------------------------------------
+# Process-wide limiter
+# ---------------------------------------------------------------------------
+
+_limiter: RateLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """Return the process-wide limiter, creating it from the environment."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(_store_from_env())
+    return _limiter
+
+
+def _store_from_env() -> _SqliteStore | _RedisStore:
+    url = os.environ.get("MYSECOND_RATE_LIMIT_REDIS", "").strip()
+    if url:
+        return _RedisStore(url)
+    path = os.environ.get("MYSECOND_RATE_LIMIT_DB", "").strip()
+    return _SqliteStore(
+        Path(path) if path else Path(tempfile.gettempdir()) / "mysecond-ratelimit.sqlite"
+    )
+
+
+def acquire(endpoint: str) -> float:
+    """Block until a request to *endpoint* may be sent (see :class:`RateLimiter`).
+
+    Returns immediately when requests are answered offline (replay mode or
+    the stand-in server, see :mod:`mysecond.netmode`).
+    """
+    if netmode.offline():
+        return 0.0
+    return get_limiter().acquire(endpoint)
+
+
+def record_response(endpoint: str, resp: Any) -> None:
+    """Report *resp* so the shared bucket can adapt (see :class:`RateLimiter`).
+
+    Ignored when requests are answered offline, like :func:`acquire`.
+    """
+    if netmode.offline():
+        return
+    get_limiter().record_response(endpoint, resp)
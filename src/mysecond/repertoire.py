@@ -14,7 +14,9 @@ specific Lichess user with a specific colour.  We use this in two ways:
 Rate-limiting
 -------------
 The ``/player`` endpoint is more aggressively rate-limited than ``/masters``.
-A minimum inter-request delay of 0.5 s is enforced inside the class.
+Every request — foreground lookups and :meth:`PlayerExplorer.prefetch`
+workers alike — takes a token from the shared ``lichess-player`` bucket
+(:mod:`mysecond.ratelimit`, 2 requests/s across all processes by default).
 All responses are persisted in the shared SQLite cache so repeated runs
 avoid redundant HTTP calls.
 
@@ -23,21 +25,27 @@ Speed filter
 By default only ``rapid`` and ``classical`` games are included to keep the
 repertoire relevant to serious over-the-board preparation.  Pass
 ``speeds="bullet,blitz,rapid,classical"`` to include all time controls.
+Books indexed by ``fetch-player-games`` are stored per speed, so any
+combination of indexed speeds is answered from the cache.
 """
 
 from __future__ import annotations
 
 import time
-from typing import Any
+from typing import Any, Iterable
 
 import requests
 
+from . import netmode, ratelimit
 from .cache import Cache
+from .explorer import Prefetcher, fetch_once
 from .fetcher import _backend_key
 from .models import ExplorerData, MoveStats
 
 _LICHESS_PLAYER_URL = "https://explorer.lichess.ovh/player"
-_MIN_REQUEST_INTERVAL = 0.5  # seconds between /player requests (rate limit)
+
+# Appended to the player backend to name the cache key of explorer answers.
+_ANSWERS_SUFFIX = ":explorer"
 
 
 class PlayerExplorer:
@@ -70,14 +78,22 @@ class PlayerExplorer:
         self._color = color
         self._speeds = speeds
         self._platform = platform
-        # Cache key encodes all query dimensions so different configs don't collide.
+        # Cache key encodes all query dimensions; the cache adds up the
+        # per-speed books of a combined speed set on read.  Network answers
+        # are kept apart so they never mix with the indexed books.
         self._backend = _backend_key(username, color, speeds, platform=platform)
+        self._answers = self._backend + _ANSWERS_SUFFIX
         self._cache = cache
-        self._session = requests.Session()
-        self._session.headers.update(
-            {"Accept": "application/json", "User-Agent": "mysecond/0.1.0"}
+        self._session = _new_session()
+        self._prefetcher = Prefetcher(
+            fetch=lambda fen, session: fetch_once(
+                cache, fen, self._answers,
+                lambda: self._fetch(fen, max_retries=1, session=session),
+            ),
+            make_session=_new_session,
+            endpoint="lichess-player",
+            name="player-prefetch",
         )
-        self._last_ts: float = 0.0
 
     # ------------------------------------------------------------------
     # Public API
@@ -96,21 +112,27 @@ class PlayerExplorer:
             after running ``fetch-player-games``, so the theory walk never
             stalls on rate-limited HTTP calls for positions not in the local book.
         """
-        cached = self._cache.get(fen, self._backend)
+        cached = self._cached(fen)
         if cached is not None:
             return _parse(cached)
 
         if local_only:
             return None  # no local data → caller uses fallback behaviour
 
-        raw = self._fetch(fen)
+        # Joins an in-flight prefetch (or another job's fetch) of this FEN.
+        raw = fetch_once(self._cache, fen, self._answers, lambda: self._fetch(fen))
         if raw is None:
             return None
-
-        self._cache.set(fen, self._backend, raw)
         return _parse(raw)
 
+    def prefetch(self, fens: Iterable[str]) -> None:
+        """Start fetching uncached *fens* in the background."""
+        self._prefetcher.submit(
+            fen for fen in fens if self._cached(fen) is None
+        )
+
     def close(self) -> None:
+        self._prefetcher.close()
         self._session.close()
 
     def __enter__(self) -> "PlayerExplorer":
@@ -123,12 +145,20 @@ class PlayerExplorer:
     # Internals
     # ------------------------------------------------------------------
 
-    def _fetch(self, fen: str, max_retries: int = 5) -> dict[str, Any] | None:
-        # Respect the /player rate limit.
-        elapsed = time.monotonic() - self._last_ts
-        if elapsed < _MIN_REQUEST_INTERVAL:
-            time.sleep(_MIN_REQUEST_INTERVAL - elapsed)
+    def _cached(self, fen: str) -> dict[str, Any] | None:
+        """The indexed book entry for *fen*, else a cached explorer answer."""
+        cached = self._cache.get(fen, self._backend)
+        if cached is None:
+            cached = self._cache.get(fen, self._answers)
+        return cached
 
+    def _fetch(
+        self,
+        fen: str,
+        max_retries: int = 5,
+        session: requests.Session | None = None,
+    ) -> dict[str, Any] | None:
+        session = session or self._session
         params: dict[str, Any] = {
             "player": self._username,
             "color": self._color,
@@ -140,18 +170,19 @@ class PlayerExplorer:
             params["speeds[]"] = self._speeds
 
         for attempt in range(max_retries):
+            # Respect the /player rate limit.
+            self._prefetcher.pace()
             try:
-                resp = self._session.get(
+                resp = session.get(
                     _LICHESS_PLAYER_URL,
                     params=params,
                     timeout=15,
                 )
-                self._last_ts = time.monotonic()
+                ratelimit.record_response("lichess-player", resp)
                 if resp.status_code == 200:
                     return resp.json()
                 if resp.status_code == 429:
-                    time.sleep(2**attempt)
-                    continue
+                    continue   # the shared bucket now holds every caller back
                 return None
             except requests.RequestException:
                 if attempt < max_retries - 1:
@@ -159,6 +190,14 @@ class PlayerExplorer:
         return None
 
 
+def _new_session() -> requests.Session:
+    session = netmode.session()
+    session.headers.update(
+        {"Accept": "application/json", "User-Agent": "mysecond/0.1.0"}
+    )
+    return session
+
+
 # ---------------------------------------------------------------------------
 # Shared parser (same shape as LichessExplorer._parse)
 # ---------------------------------------------------------------------------
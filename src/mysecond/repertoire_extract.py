@@ -40,7 +40,7 @@ import chess
 import chess.pgn
 
 from .cache import Cache
-from .fetcher import _backend_key, fetch_player_games, fetch_player_games_chesscom
+from .fetcher import _backend_key, fetch_player_games, fetch_player_games_chesscom, last_fetch_ts
 
 
 @dataclass
@@ -77,7 +77,8 @@ def extract_repertoire(
     cache:
         Open :class:`~mysecond.cache.Cache` instance.
     speeds:
-        Time controls — must match the ``fetch-player-games`` run.
+        Time controls — the books of these speeds are added up (speeds not
+        fetched yet are fetched first).
     platform:
         ``'lichess'`` or ``'chesscom'`` — must match the fetch platform.
     min_games:
@@ -104,18 +105,7 @@ def extract_repertoire(
             flush=True,
         )
 
-    # Load the full backend into memory for O(1) lookup during traversal.
-    all_rows = cache.scan_backend(backend)
-    cache_index: dict[str, dict[str, Any]] = {
-        fen: payload
-        for fen, payload in all_rows
-        if not fen.startswith("_")   # exclude metadata entries
-    }
-
-    if verbose:
-        print(f"[repertoire] {len(cache_index)} cached positions loaded.", flush=True)
-
-    if not cache_index:
+    if last_fetch_ts(username, color, speeds, cache, platform=platform) is None:
         if verbose:
             print(
                 f"[repertoire] No cached data found — fetching games from {platform} …",
@@ -137,17 +127,21 @@ def extract_repertoire(
                 speeds=speeds,
                 verbose=verbose,
             )
-        all_rows = cache.scan_backend(backend)
-        cache_index = {
-            fen: payload
-            for fen, payload in all_rows
-            if not fen.startswith("_")
-        }
-        if not cache_index:
+        if not cache.has_backend(backend):
             raise RuntimeError(
                 f"No games found after fetch — check username and speeds."
             )
 
+    # Load the backend into memory for O(1) lookup during traversal.  The
+    # walk never enters a position with fewer than min_games games, so those
+    # rows are filtered out in SQL rather than decoded.
+    cache_index: dict[str, dict[str, Any]] = dict(
+        cache.iter_backend(backend, min_games=min_games, skip_meta=True)
+    )
+
+    if verbose:
+        print(f"[repertoire] {len(cache_index)} cached positions loaded.", flush=True)
+
     # Build the PGN game skeleton.
     game = chess.pgn.Game()
     game.headers["Event"]     = f"{username} Repertoire ({color.title()})"
@@ -4,6 +4,10 @@ Algorithm
 ---------
 Phase 1 – Theory walk (sequential, explorer-rate-limited):
 
+  While the walk works on a position, the explorer lookups for the children
+  it may recurse into are prefetched in the background (within each
+  endpoint's rate limit), so it mostly reads warm cache.
+
   Starting from the root FEN, traverse the opening tree:
 
   * At OUR side's turns
@@ -51,14 +55,19 @@ from pathlib import Path
 import chess
 import chess.engine
 
+from .binbook import PolyglotExplorer
 from .cache import Cache
 from .engine import Engine
 from .explorer import LichessExplorer
+from .masters_db import LocalMastersExplorer
 from .models import EngineEval, NoveltyLine
 from .repertoire import PlayerExplorer
 
 _DEFAULT_DB = Path("data/cache.sqlite")
 
+# Explorer responses buffered before the walk's cache commits them.
+_WALK_WRITE_BATCH = 64
+
 # Thread-safe printing for the parallel deep-eval phase.
 _PRINT_LOCK = threading.Lock()
 
@@ -103,15 +112,23 @@ class SearchConfig:
     opponent_platform: str = "lichess"
     player_local_only: bool = False
 
+    # --- Masters data source ---
+    # Local index built by 'mysecond build-masters-db'; None = Lichess API.
+    masters_db: Path | None = None
+    # Polyglot book used instead of masters data (e.g. a house repertoire).
+    polyglot_book: Path | None = None
+
 
 # ---------------------------------------------------------------------------
 # Internal staging type (between walk and evaluation phases)
 # ---------------------------------------------------------------------------
 
 
-@dataclass
+@dataclass(slots=True)
 class _PendingNovelty:
-    board: chess.Board        # position *before* the novelty move
+    # No board copy: _pending_board() replays book_moves from the root when
+    # the evaluation needs the move history.
+    fen: str                  # position *before* the novelty move
     book_moves: list[str]     # UCI path through theory
     book_moves_san: list[str] # SAN path through theory (for display)
     move: chess.Move          # the novelty move
@@ -156,35 +173,45 @@ def find_novelties(config: SearchConfig) -> list[NoveltyLine]:
     player_color   = "white" if config.side == chess.WHITE else "black"
     opponent_color = "black" if config.side == chess.WHITE else "white"
 
-    player_ctx: PlayerExplorer | nullcontext   # type: ignore[type-arg]
-    opponent_ctx: PlayerExplorer | nullcontext  # type: ignore[type-arg]
-
-    if config.player_name:
-        player_ctx = PlayerExplorer(
-            config.player_name, player_color, Cache(_DEFAULT_DB),
-            speeds=config.player_speeds,
-            platform=config.player_platform,
-        )
-    else:
-        player_ctx = nullcontext()
-
-    if config.opponent_name:
-        opponent_ctx = PlayerExplorer(
-            config.opponent_name, opponent_color, Cache(_DEFAULT_DB),
-            speeds=config.opponent_speeds,
-            platform=config.opponent_platform,
-        )
-    else:
-        opponent_ctx = nullcontext()
-
     # --- Phase 1: tree walk --------------------------------------------------
     pending: list[_PendingNovelty] = []
     visited: set[str] = set()
     positions_visited: list[int] = [0]
 
+    # One write-behind cache is shared by every explorer in the walk, so
+    # network misses are committed in batches rather than one fsync each.
     with Engine(config.engine_path) as eng:
-        with Cache(_DEFAULT_DB) as cache:
-            with LichessExplorer(cache) as explorer:
+        with Cache(_DEFAULT_DB, write_batch=_WALK_WRITE_BATCH) as cache:
+            player_ctx: PlayerExplorer | nullcontext   # type: ignore[type-arg]
+            opponent_ctx: PlayerExplorer | nullcontext  # type: ignore[type-arg]
+
+            if config.player_name:
+                player_ctx = PlayerExplorer(
+                    config.player_name, player_color, cache,
+                    speeds=config.player_speeds,
+                    platform=config.player_platform,
+                )
+            else:
+                player_ctx = nullcontext()
+
+            if config.opponent_name:
+                opponent_ctx = PlayerExplorer(
+                    config.opponent_name, opponent_color, cache,
+                    speeds=config.opponent_speeds,
+                    platform=config.opponent_platform,
+                )
+            else:
+                opponent_ctx = nullcontext()
+
+            explorer_ctx: LichessExplorer | LocalMastersExplorer | PolyglotExplorer
+            if config.polyglot_book is not None:
+                explorer_ctx = PolyglotExplorer(config.polyglot_book)
+            elif config.masters_db is not None:
+                explorer_ctx = LocalMastersExplorer(config.masters_db)
+            else:
+                explorer_ctx = LichessExplorer(cache)
+
+            with explorer_ctx as explorer:
                 with player_ctx as player_explorer:
                     with opponent_ctx as opponent_explorer:
                         _walk(
@@ -259,7 +286,7 @@ def _walk(
     book_moves_san: list[str],
     config: SearchConfig,
     eng: Engine,
-    explorer: LichessExplorer,
+    explorer: LichessExplorer | LocalMastersExplorer | PolyglotExplorer,
     pending: list[_PendingNovelty],
     visited: set[str],
     positions_visited: list[int],
@@ -316,6 +343,18 @@ def _walk(
             _p(f"[walk]       player {config.player_name}: "
                f"{player_data.total} games at this position")
 
+        # Warm the cache for the in-book moves we may recurse into.
+        _prefetch_children(
+            board,
+            [
+                info["pv"][0] for info in infos
+                if info.get("pv")
+                and data.games_for_move(info["pv"][0].uci()) > config.novelty_threshold
+                and _player_plays_move(info["pv"][0], player_data, config.min_player_games)
+            ],
+            config, explorer, opponent_explorer,
+        )
+
         for info in infos:
             if "pv" not in info or not info["pv"]:
                 continue
@@ -335,7 +374,7 @@ def _walk(
                        f"[{label}]  → queued for deep eval")
                     pending.append(
                         _PendingNovelty(
-                            board=board.copy(),
+                            fen=board.fen(),
                             book_moves=list(book_moves),
                             book_moves_san=list(book_moves_san),
                             move=move,
@@ -400,6 +439,15 @@ def _walk(
            f"[{opp_label} to move | {data.total:,} master games | "
            f"following {source}: {moves_str or '(none)'}]")
 
+        _prefetch_children(
+            board,
+            [
+                chess.Move.from_uci(ms.uci) for ms in move_list
+                if chess.Move.from_uci(ms.uci) in board.legal_moves
+            ],
+            config, explorer, player_explorer,
+        )
+
         for move_stats in move_list:
             move = chess.Move.from_uci(move_stats.uci)
             if move not in board.legal_moves:
@@ -427,6 +475,30 @@ def _walk(
 # ---------------------------------------------------------------------------
 
 
+def _prefetch_children(
+    board: chess.Board,
+    moves: list[chess.Move],
+    config: SearchConfig,
+    explorer: LichessExplorer | LocalMastersExplorer | PolyglotExplorer,
+    player_explorer: PlayerExplorer | None,
+) -> None:
+    """Start fetching the positions after *moves* before the walk reaches them.
+
+    *player_explorer* is the player explorer the walk will consult at those
+    positions (the opponent's at our turns, ours at theirs).
+    """
+    fens = []
+    for move in moves:
+        child = board.copy(stack=False)
+        child.push(move)
+        fens.append(child.fen())
+    if not fens:
+        return
+    explorer.prefetch(fens)
+    if player_explorer is not None and not config.player_local_only:
+        player_explorer.prefetch(fens)
+
+
 def _player_plays_move(
     move: chess.Move,
     player_data: object,  # ExplorerData | None
@@ -478,6 +550,14 @@ def _opponent_moves_with_source(
 # ---------------------------------------------------------------------------
 
 
+def _pending_board(p: _PendingNovelty, config: SearchConfig) -> chess.Board:
+    """Rebuild the position before *p*'s novelty, with its move history."""
+    board = chess.Board(config.fen)
+    for uci in p.book_moves:
+        board.push_uci(uci)
+    return board
+
+
 def _evaluate_candidate(
     p: _PendingNovelty,
     config: SearchConfig,
@@ -485,8 +565,9 @@ def _evaluate_candidate(
     total_candidates: int,
 ) -> NoveltyLine | None:
     """Evaluate one novelty candidate deeply; return None if below eval floor."""
+    post_board = _pending_board(p, config)
     path = _path_str(p.book_moves_san)
-    san  = p.board.san(p.move)
+    san  = post_board.san(p.move)
     full_line = f"{path} {san}".strip() if path != "starting position" else san
     prefix = f"[eval] {candidate_num:>3}/{total_candidates}"
 
@@ -495,7 +576,6 @@ def _evaluate_candidate(
        f"post={p.post_novelty_games}, quick={_cp_str(p.quick_eval_cp)}cp)")
 
     with Engine(config.engine_path) as eng:
-        post_board = p.board.copy()
         post_board.push(p.move)
 
         evals: dict[int, EngineEval] = {}
@@ -31,7 +31,7 @@ import chess
 from .cache import Cache
 from .engine import Engine
 from .eval_cache import EvalCache
-from .fetcher import _backend_key, fetch_player_games, fetch_player_games_chesscom
+from .fetcher import _backend_key, fetch_player_games, fetch_player_games_chesscom, last_fetch_ts
 from .game_phases import analyze_game_phases
 from .habits import HabitInaccuracy, analyze_habits
 
@@ -80,13 +80,13 @@ def strategise(
     player_index   = _load_index(cache, player_backend)
     opponent_index = _load_index(cache, opponent_backend)
 
-    if not player_index:
+    if not player_index or last_fetch_ts(player, player_color, player_speeds, cache, player_platform) is None:
         _log(verbose, f"[strategise] No cache for {player} ({player_platform}, {player_color}, {player_speeds}) — fetching …")
         _fetch(player, player_color, player_platform, player_speeds, cache, verbose)
         player_index = _load_index(cache, player_backend)
         _progress(verbose, "step", 1, 10)   # player fetched
 
-    if not opponent_index:
+    if not opponent_index or last_fetch_ts(opponent, opponent_color, opponent_speeds, cache, opponent_platform) is None:
         _log(verbose, f"[strategise] No cache for {opponent} ({opponent_platform}, {opponent_color}, {opponent_speeds}) — fetching …")
         _fetch(opponent, opponent_color, opponent_platform, opponent_speeds, cache, verbose)
         opponent_index = _load_index(cache, opponent_backend)
@@ -241,8 +241,7 @@ def strategise(
 
 
 def _load_index(cache: Cache, backend: str) -> dict[str, dict[str, Any]]:
-    rows = cache.scan_backend(backend)
-    return {fen: payload for fen, payload in rows if not fen.startswith("_")}
+    return dict(cache.iter_backend(backend, skip_meta=True))
 
 
 def _fetch(username: str, color: str, platform: str, speeds: str,
@@ -0,0 +1,17 @@
+"""Fixtures shared by every test module."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from mysecond import ratelimit
+
+
+@pytest.fixture(autouse=True)
+def _local_rate_limits(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep rate-limit buckets out of the host-wide file in the temp directory."""
+    monkeypatch.setenv("MYSECOND_RATE_LIMIT_DB", str(tmp_path / "ratelimit.sqlite"))
+    monkeypatch.delenv("MYSECOND_RATE_LIMIT_REDIS", raising=False)
+    monkeypatch.setattr(ratelimit, "_limiter", None)
@@ -0,0 +1,86 @@
+"""Tests for the memory-mapped binary opening-book format."""
+
+from __future__ import annotations
+
+import json
+import struct
+from pathlib import Path
+
+import chess
+import chess.polyglot
+
+from mysecond.binbook import (
+    BinaryBook,
+    PolyglotExplorer,
+    ensure_binary_book,
+    write_binary_book,
+)
+
+_START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+_AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq -"
+_CASTLE = "r3k2r/pppqbppp/2npbn2/4p3/4P3/2NPBN2/PPPQBPPP/R3K2R w KQkq -"
+
+
+def test_roundtrip_orders_moves_by_games(tmp_path: Path) -> None:
+    path = tmp_path / "book.bin"
+    written = write_binary_book(path, {
+        _START: [{"uci": "d2d4", "games": 5}, {"uci": "e2e4", "games": 70_000}],
+        _AFTER_E4: [{"uci": "c7c5", "games": 3}],
+    })
+    assert written == 3
+    with BinaryBook(path) as book:
+        assert book.moves(_START) == [
+            {"uci": "e2e4", "games": 70_000},
+            {"uci": "d2d4", "games": 5},
+        ]
+        # Lookups ignore the en-passant square and move counters.
+        assert book.moves(_AFTER_E4.replace(" -", " e3 0 1")) == [{"uci": "c7c5", "games": 3}]
+        assert book.moves("8/8/8/8/8/8/8/K6k w - -") == []
+
+
+def test_castling_readable_by_polyglot_tools(tmp_path: Path) -> None:
+    path = tmp_path / "book.bin"
+    write_binary_book(path, {_CASTLE: [{"uci": "e1g1", "games": 4}, {"uci": "e1c1", "games": 2}]})
+    with BinaryBook(path) as book:
+        assert [m["uci"] for m in book.moves(_CASTLE)] == ["e1g1", "e1c1"]
+    with chess.polyglot.open_reader(path) as reader:
+        assert reader.find(chess.Board(_CASTLE)).move == chess.Move.from_uci("e1g1")
+
+
+def test_illegal_moves_skipped(tmp_path: Path) -> None:
+    path = tmp_path / "book.bin"
+    assert write_binary_book(path, {_START: [{"uci": "e2e5", "games": 9}]}) == 0
+
+
+def test_ensure_builds_from_json(tmp_path: Path) -> None:
+    json_path = tmp_path / "player-white.json"
+    json_path.write_text(json.dumps({"positions": {_START: [{"uci": "e2e4", "games": 12}]}}))
+    bin_path = ensure_binary_book(json_path)
+    assert bin_path == tmp_path / "player-white.bin"
+    with BinaryBook(bin_path) as book:
+        assert book.moves(_START) == [{"uci": "e2e4", "games": 12}]
+
+
+def test_polyglot_explorer_reads_external_books(tmp_path: Path) -> None:
+    # An external book: weights only, learn = 0.
+    path = tmp_path / "house.bin"
+    key = chess.polyglot.zobrist_hash(chess.Board())
+    e2e4 = chess.E4 | (chess.E2 << 6)
+    d2d4 = chess.D4 | (chess.D2 << 6)
+    path.write_bytes(
+        struct.pack(">QHHI", key, e2e4, 30, 0) + struct.pack(">QHHI", key, d2d4, 10, 0)
+    )
+    with PolyglotExplorer(path) as explorer:
+        data = explorer.get_data(chess.STARTING_FEN)
+        assert [(m.uci, m.total) for m in data.moves] == [("e2e4", 30), ("d2d4", 10)]
+        assert data.total == 40
+        assert explorer.get_data(_AFTER_E4 + " 0 1").total == 0
+
+
+def test_polyglot_explorer_uses_game_counts_from_own_books(tmp_path: Path) -> None:
+    path = tmp_path / "book.bin"
+    write_binary_book(path, {_AFTER_E4: [{"uci": "c7c5", "games": 70_000}]})
+    with PolyglotExplorer(path) as explorer:
+        # Normalised-FEN books still match positions with an e.p. square.
+        data = explorer.get_data(_AFTER_E4.replace(" -", " e3 0 1"))
+    assert data.games_for_move("c7c5") == 70_000
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import sqlite3
+import threading
+import weakref
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
-from mysecond.cache import Cache
+from mysecond.cache import Cache, compress_cold_shards, shard_dir_for
 
 _FEN = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
 _BACKEND = "lichess_masters"
@@ -62,3 +66,289 @@ def test_cache_creates_parent_directory(tmp_path: Path) -> None:
     with Cache(nested_db) as cache:
         cache.set("fen", "backend", {"ok": True})
     assert nested_db.exists()
+
+
+def test_cache_reads_from_other_threads(tmp_path: Path) -> None:
+    payload = {"white": 1, "draws": 2, "black": 3}
+    results: list[object] = []
+    with Cache(tmp_path / "threads.sqlite") as cache:
+        cache.set(_FEN, _BACKEND, payload)
+
+        def _read() -> None:
+            results.append(cache.get(_FEN, _BACKEND))
+
+        threads = [threading.Thread(target=_read) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert results == [payload] * 8
+
+
+def test_readers_of_finished_threads_are_closed(tmp_path: Path) -> None:
+    with Cache(tmp_path / "threads.sqlite") as cache:
+        for _ in range(5):
+            t = threading.Thread(target=cache.get, args=(_FEN, _BACKEND))
+            t.start()
+            t.join()
+        cache.get(_FEN, _BACKEND)
+        assert len(cache._main._readers) == 1     # only this thread's reader
+
+
+def test_cache_reader_sees_later_writes(tmp_path: Path) -> None:
+    with Cache(tmp_path / "test.sqlite") as cache:
+        assert cache.get(_FEN, _BACKEND) is None
+        cache.set(_FEN, _BACKEND, {"v": 1})
+        assert cache.get(_FEN, _BACKEND) == {"v": 1}
+
+
+def test_write_behind_reads_through_buffer(tmp_path: Path) -> None:
+    db = tmp_path / "wb.sqlite"
+    with Cache(db, write_batch=10, flush_interval=3600) as cache:
+        cache.set(_FEN, _BACKEND, {"v": 1})
+        assert cache.get(_FEN, _BACKEND) == {"v": 1}
+        # Not yet committed: a second instance cannot see it.
+        with Cache(db) as other:
+            assert other.get(_FEN, _BACKEND) is None
+    with Cache(db) as other:
+        assert other.get(_FEN, _BACKEND) == {"v": 1}
+
+
+def test_write_behind_flushes_by_count(tmp_path: Path) -> None:
+    db = tmp_path / "wb.sqlite"
+    fens = [f"fen{i} w - -" for i in range(3)]
+    with Cache(db, write_batch=3, flush_interval=3600) as cache:
+        for i, fen in enumerate(fens):
+            cache.set(fen, _BACKEND, {"i": i})
+        with Cache(db) as other:
+            assert [other.get(f, _BACKEND) for f in fens] == [{"i": 0}, {"i": 1}, {"i": 2}]
+
+
+def test_write_behind_flushes_before_scan(tmp_path: Path) -> None:
+    with Cache(tmp_path / "wb.sqlite", write_batch=100) as cache:
+        cache.set(_FEN, _BACKEND, {"v": 1})
+        assert len(cache.scan_backend(_BACKEND)) == 1
+
+
+def test_write_behind_defers_lease_release(tmp_path: Path) -> None:
+    db = tmp_path / "wb.sqlite"
+    with Cache(db, write_batch=10, flush_interval=3600) as cache, Cache(db) as other:
+        assert cache.try_fetch_lease(_FEN, _BACKEND, ttl=60)
+        cache.release_fetch_lease(_FEN, _BACKEND, {"v": 1})
+        # Dropped together with the buffered result, not on its own.
+        assert other.fetch_lease_active(_FEN, _BACKEND)
+        assert other.get(_FEN, _BACKEND) is None
+        cache.flush()
+        assert not other.fetch_lease_active(_FEN, _BACKEND)
+        assert other.get(_FEN, _BACKEND) == {"v": 1}
+
+
+def test_write_behind_releases_waited_lease_at_once(tmp_path: Path) -> None:
+    db = tmp_path / "wb.sqlite"
+    with Cache(db, write_batch=10, flush_interval=3600) as cache, Cache(db) as other:
+        assert cache.try_fetch_lease(_FEN, _BACKEND, ttl=60)
+        assert other.wait_on_fetch_lease(_FEN, _BACKEND)
+        cache.release_fetch_lease(_FEN, _BACKEND, {"v": 1})
+        assert not other.fetch_lease_active(_FEN, _BACKEND)
+        assert other.get(_FEN, _BACKEND) == {"v": 1}
+
+
+def test_iter_backend_filters(tmp_path: Path) -> None:
+    white_fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+    with Cache(tmp_path / "scan.sqlite") as cache:
+        cache.set(white_fen, "book", {"white": 5, "draws": 1, "black": 0})
+        cache.set(_FEN, "book", {"white": 1, "draws": 0, "black": 0})
+        cache.set("_meta_key", "book", {"ts_ms": 1})
+        cache.set(_FEN, "other", {"white": 9, "draws": 9, "black": 9})
+
+        assert len(list(cache.iter_backend("book"))) == 3
+        assert len(list(cache.iter_backend("book", skip_meta=True))) == 2
+        assert [f for f, _ in cache.iter_backend("book", min_games=3)] == [
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+        ]
+        black = list(cache.iter_backend("book", turn="black", skip_meta=True))
+        assert [p for _, p in black] == [{"white": 1, "draws": 0, "black": 0}]
+        assert cache.has_backend("book")
+        assert not cache.has_backend("missing")
+
+
+# ---------------------------------------------------------------------------
+# Per-backend shards
+# ---------------------------------------------------------------------------
+
+_PLAYER_BACKEND = "lichess_player_someone_white_blitz,rapid"
+
+
+def test_player_backend_stored_in_shard(tmp_path: Path) -> None:
+    db = tmp_path / "cache.sqlite"
+    with Cache(db) as cache:
+        cache.set(_FEN, _PLAYER_BACKEND, {"white": 1})
+        cache.set(_FEN, _BACKEND, {"white": 2})
+        assert cache.get(_FEN, _PLAYER_BACKEND) == {"white": 1}
+        assert cache.get(_FEN, _BACKEND) == {"white": 2}
+        assert cache.scan_backend(_BACKEND) == [(_FEN.rsplit(" ", 3)[0] + " -", {"white": 2})]
+    assert len(list(shard_dir_for(db).glob("*.sqlite"))) == 1
+
+
+def test_least_recently_used_shard_is_closed(tmp_path: Path) -> None:
+    backends = [f"lichess_player_p{i}_white_blitz" for i in range(3)]
+    with Cache(tmp_path / "cache.sqlite", max_open_shards=2) as cache:
+        for i, backend in enumerate(backends):
+            cache.set(_FEN, backend, {"white": i})
+        assert list(cache._shards) == backends[1:]
+        oldest = weakref.ref(cache._shards[backends[1]])
+        assert cache.get(_FEN, backends[0]) == {"white": 0}     # reopened
+        assert oldest() is None             # nothing else held it: closed
+        assert cache.get(_FEN, backends[1]) == {"white": 1}
+
+
+def test_legacy_player_rows_migrate_into_shard(tmp_path: Path) -> None:
+    db = tmp_path / "cache.sqlite"
+    with Cache(db):
+        pass
+    conn = sqlite3.connect(db)
+    conn.execute(
+        "INSERT INTO explorer_cache (fen, backend, payload, ts) VALUES (?, ?, ?, 0)",
+        ("x w - -", _PLAYER_BACKEND, '{"white": 7}'),
+    )
+    conn.commit()
+    conn.close()
+
+    with Cache(db) as cache:
+        assert cache.get("x w - -", _PLAYER_BACKEND) == {"white": 7}
+    conn = sqlite3.connect(db)
+    assert conn.execute("SELECT COUNT(*) FROM explorer_cache").fetchone()[0] == 0
+    conn.close()
+
+
+def test_combined_speeds_add_up_partitions(tmp_path: Path) -> None:
+    blitz, rapid = "lichess_player_someone_white_blitz", "lichess_player_someone_white_rapid"
+    with Cache(tmp_path / "cache.sqlite") as cache:
+        cache.set("a w - -", blitz, {"white": 2, "draws": 0, "black": 0, "moves": [
+            {"uci": "e2e4", "white": 2, "draws": 0, "black": 0, "averageRating": 0},
+        ]})
+        cache.set("a w - -", rapid, {"white": 0, "draws": 0, "black": 1, "moves": [
+            {"uci": "d2d4", "white": 0, "draws": 0, "black": 1, "averageRating": 0},
+        ]})
+        cache.set("b w - -", rapid, {"white": 1, "draws": 0, "black": 0, "moves": []})
+        cache.set("b w - -", blitz + ":import", {"white": 1, "draws": 0, "black": 0, "moves": []})
+
+        combined = cache.get("a w - -", _PLAYER_BACKEND)
+        assert (combined["white"], combined["black"]) == (2, 1)
+        assert [m["uci"] for m in combined["moves"]] == ["e2e4", "d2d4"]
+        assert cache.get("b w - -", _PLAYER_BACKEND)["white"] == 2
+        assert cache.get("b w - -", blitz)["white"] == 1     # imports count per speed too
+        assert cache.has_backend(_PLAYER_BACKEND)
+        # min_games applies to the summed counts.
+        rows = list(cache.iter_backend(_PLAYER_BACKEND, min_games=3, skip_meta=True))
+        assert [fen for fen, _ in rows] == ["a w - -"]
+        assert [fen for fen, _ in cache.iter_backend(_PLAYER_BACKEND)] == ["a w - -", "b w - -"]
+        assert [fen for fen, _ in cache.iter_backend(blitz, exact=True)] == ["a w - -"]
+
+
+def test_combined_read_remembers_missing_partitions(tmp_path: Path) -> None:
+    rapid = "lichess_player_someone_white_rapid"
+    with Cache(tmp_path / "cache.sqlite") as cache:
+        assert cache.get("a w - -", _PLAYER_BACKEND) is None
+        with patch.object(Path, "exists") as exists, \
+                patch.object(cache._main, "has_rows") as has_rows:
+            assert cache.get("a w - -", _PLAYER_BACKEND) is None
+        exists.assert_not_called()
+        has_rows.assert_not_called()
+        # Writing a partition makes it visible straight away.
+        cache.set("a w - -", rapid, {"white": 1})
+        assert cache.get("a w - -", _PLAYER_BACKEND) == {"white": 1}
+
+
+def test_count_positions_across_partitions(tmp_path: Path) -> None:
+    blitz, rapid = "lichess_player_someone_white_blitz", "lichess_player_someone_white_rapid"
+    with Cache(tmp_path / "cache.sqlite", write_batch=10) as cache:
+        cache.set("a w - -", blitz, {"white": 1})
+        cache.set("a w - -", rapid, {"white": 1})
+        cache.set("b w - -", rapid, {"white": 1})
+        cache.set("_meta", rapid, {"ts_ms": 1})
+        cache.set("c w - -", _BACKEND, {"white": 1})
+        assert cache.count_positions([blitz, rapid]) == 2
+        assert cache.count_positions([blitz, _BACKEND, blitz + ":import"]) == 2
+        assert cache.count_positions(["lichess_player_nobody_white_blitz"]) == 0
+
+
+def test_legacy_combined_book_read_whole(tmp_path: Path) -> None:
+    with Cache(tmp_path / "cache.sqlite") as cache:
+        cache.set("a w - -", _PLAYER_BACKEND, {"white": 9})    # stored before partitioning
+        cache.set("b w - -", _PLAYER_BACKEND, {"white": 4})
+        assert cache.get("a w - -", _PLAYER_BACKEND) == {"white": 9}
+
+        # Once a partition has entries the legacy book is no longer consulted,
+        # not even for positions the partitions lack.
+        cache.set("b w - -", "lichess_player_someone_white_rapid", {"white": 1})
+        assert cache.get("a w - -", _PLAYER_BACKEND) is None
+        assert cache.get("b w - -", _PLAYER_BACKEND) == {"white": 1}
+        assert [fen for fen, _ in cache.iter_backend(_PLAYER_BACKEND)] == ["b w - -"]
+
+
+def test_cold_shard_compressed_and_restored(tmp_path: Path) -> None:
+    db = tmp_path / "cache.sqlite"
+    with Cache(db) as cache:
+        cache.set(_FEN, _PLAYER_BACKEND, {"white": 3})
+
+    written = compress_cold_shards(db, max_idle_days=-1)
+    assert len(written) == 1
+    assert not list(shard_dir_for(db).glob("*.sqlite"))
+
+    with Cache(db) as cache:
+        assert cache.get(_FEN, _PLAYER_BACKEND) == {"white": 3}
+    assert not list(shard_dir_for(db).glob("*.gz"))
+
+
+def test_open_shard_is_not_compressed(tmp_path: Path) -> None:
+    db = tmp_path / "cache.sqlite"
+    with Cache(db) as cache:
+        cache.set(_FEN, _PLAYER_BACKEND, {"white": 3})
+        assert compress_cold_shards(db, max_idle_days=-1) == []
+        assert cache.get(_FEN, _PLAYER_BACKEND) == {"white": 3}
+    assert len(compress_cold_shards(db, max_idle_days=-1)) == 1
+
+
+# Relational book layout
+# ---------------------------------------------------------------------------
+
+_BOOK = {
+    "white": 3, "draws": 1, "black": 2,
+    "moves": [
+        {"uci": "e7e5", "white": 2, "draws": 1, "black": 1, "averageRating": 0},
+        {"uci": "c7c5", "white": 1, "draws": 0, "black": 1, "averageRating": 0},
+    ],
+}
+
+
+def test_relational_layout_roundtrip(tmp_path: Path) -> None:
+    with Cache(tmp_path / "cache.sqlite", book_layout="relational") as cache:
+        cache.set(_FEN, _PLAYER_BACKEND, _BOOK)
+        assert cache.get(_FEN, _PLAYER_BACKEND) == _BOOK
+        assert cache.scan_backend(_PLAYER_BACKEND)[0][1] == _BOOK
+        assert list(cache.iter_backend(_PLAYER_BACKEND, min_games=7)) == []
+
+
+def test_relational_merge_adds_counts(tmp_path: Path) -> None:
+    with Cache(tmp_path / "cache.sqlite", book_layout="relational") as cache:
+        assert cache.supports_merge(_PLAYER_BACKEND)
+        assert not cache.supports_merge(_BACKEND)
+        cache.set(_FEN, _PLAYER_BACKEND, _BOOK)
+        cache.merge_many(_PLAYER_BACKEND, [(_FEN, {
+            "white": 0, "draws": 0, "black": 3,
+            "moves": [{"uci": "c7c5", "white": 0, "draws": 0, "black": 3}],
+        })])
+        merged = cache.get(_FEN, _PLAYER_BACKEND)
+    assert (merged["white"], merged["draws"], merged["black"]) == (3, 1, 5)
+    # c7c5 now has 5 games and is listed first.
+    assert [m["uci"] for m in merged["moves"]] == ["c7c5", "e7e5"]
+
+
+def test_existing_shard_keeps_its_layout(tmp_path: Path) -> None:
+    db = tmp_path / "cache.sqlite"
+    with Cache(db) as cache:
+        cache.set(_FEN, _PLAYER_BACKEND, _BOOK)
+    with Cache(db, book_layout="relational") as cache:
+        assert not cache.supports_merge(_PLAYER_BACKEND)
+        assert cache.get(_FEN, _PLAYER_BACKEND) == _BOOK
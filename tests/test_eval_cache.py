@@ -0,0 +1,113 @@
+"""Tests for the Stockfish eval cache and its snapshot export/import."""
+
+from __future__ import annotations
+
+import gzip
+import json
+from pathlib import Path
+
+import pytest
+
+from mysecond.eval_cache import EvalCache, read_snapshot_header
+
+_FEN_A = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+_FEN_B = "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq d3 0 1"
+_MOVES = [{"uci": "e7e5", "white_cp": 20}, {"uci": "c7c5", "white_cp": 35}]
+
+
+def test_put_deeper_wins(tmp_path: Path) -> None:
+    ec = EvalCache(tmp_path / "evals.sqlite")
+    ec.put(_FEN_A, 20, _MOVES)
+    ec.put(_FEN_A, 12, [{"uci": "a7a6", "white_cp": 80}])
+    assert ec.get(_FEN_A, 20, 1) == _MOVES[:1]
+
+
+def test_snapshot_roundtrip(tmp_path: Path) -> None:
+    src = EvalCache(tmp_path / "a.sqlite")
+    src.put(_FEN_B, 18, _MOVES)
+    src.put(_FEN_A, 20, _MOVES)
+    snap = tmp_path / "snap.jsonl.gz"
+    result = src.export_snapshot(snap)
+    assert result["rows"] == 2
+
+    # Rows are sorted by FEN after the header line.
+    with gzip.open(snap, "rt", encoding="utf-8") as fh:
+        lines = fh.read().splitlines()
+    fens = [json.loads(line)[0] for line in lines[1:]]
+    assert fens == sorted(fens)
+
+    dst = EvalCache(tmp_path / "b.sqlite")
+    assert dst.import_snapshot(snap)["rows"] == 2
+    assert dst.get(_FEN_A, 20, 2) == _MOVES
+    assert dst.get(_FEN_B, 18, 2) == _MOVES
+
+
+def test_import_keeps_deeper_local_row(tmp_path: Path) -> None:
+    src = EvalCache(tmp_path / "a.sqlite")
+    src.put(_FEN_A, 12, [{"uci": "a7a6", "white_cp": 80}])
+    snap = tmp_path / "snap.jsonl.gz"
+    src.export_snapshot(snap)
+
+    dst = EvalCache(tmp_path / "b.sqlite")
+    dst.put(_FEN_A, 24, _MOVES)
+    dst.import_snapshot(snap)
+    assert dst.get(_FEN_A, 24, 2) == _MOVES
+
+
+def test_import_replaces_shallower_local_row(tmp_path: Path) -> None:
+    src = EvalCache(tmp_path / "a.sqlite")
+    src.put(_FEN_A, 24, _MOVES)
+    snap = tmp_path / "snap.jsonl.gz"
+    src.export_snapshot(snap)
+
+    dst = EvalCache(tmp_path / "b.sqlite")
+    dst.put(_FEN_A, 12, [{"uci": "a7a6", "white_cp": 80}])
+    dst.import_snapshot(snap)
+    assert dst.get(_FEN_A, 24, 2) == _MOVES
+
+
+def test_equal_depth_keeps_more_lines(tmp_path: Path) -> None:
+    src = EvalCache(tmp_path / "a.sqlite")
+    src.put(_FEN_A, 20, _MOVES[:1])
+    snap = tmp_path / "snap.jsonl.gz"
+    src.export_snapshot(snap)
+
+    dst = EvalCache(tmp_path / "b.sqlite")
+    dst.put(_FEN_A, 20, _MOVES)
+    dst.import_snapshot(snap)
+    dst.put(_FEN_A, 20, _MOVES[:1])
+    assert dst.get(_FEN_A, 20, 2) == _MOVES
+
+    # … and the wider row wins an import at equal depth.
+    src.put(_FEN_B, 20, _MOVES)
+    src.export_snapshot(snap)
+    dst.put(_FEN_B, 20, _MOVES[:1])
+    dst.import_snapshot(snap)
+    assert dst.get(_FEN_B, 20, 2) == _MOVES
+
+
+def test_incremental_export_uses_watermark(tmp_path: Path) -> None:
+    ec = EvalCache(tmp_path / "evals.sqlite")
+    ec.put(_FEN_A, 20, _MOVES)
+    full = tmp_path / "full.jsonl.gz"
+    ec.export_snapshot(full)
+
+    ec.put(_FEN_B, 20, _MOVES)
+    delta = tmp_path / "delta.jsonl.gz"
+    watermark = read_snapshot_header(full)["watermark"]
+    result = ec.export_snapshot(delta, since_ts=watermark)
+    assert result["rows"] == 1
+
+    dst = EvalCache(tmp_path / "b.sqlite")
+    dst.import_snapshot(delta)
+    assert dst.get(_FEN_A, 1, 1) is None
+    assert dst.get(_FEN_B, 20, 1) is not None
+
+
+def test_import_rejects_non_snapshot(tmp_path: Path) -> None:
+    bogus = tmp_path / "bogus.jsonl.gz"
+    with gzip.open(bogus, "wt", encoding="utf-8") as fh:
+        fh.write('{"hello": "world"}\n')
+    ec = EvalCache(tmp_path / "evals.sqlite")
+    with pytest.raises(ValueError):
+        ec.import_snapshot(bogus)
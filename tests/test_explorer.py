@@ -0,0 +1,189 @@
+"""Tests for the Lichess masters explorer client."""
+
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from mysecond.cache import Cache
+from mysecond.explorer import LichessExplorer
+
+_FEN = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+_RESPONSE = {
+    "white": 10, "draws": 5, "black": 3,
+    "moves": [{"uci": "e7e5", "white": 6, "draws": 3, "black": 1, "averageRating": 2500}],
+}
+
+
+def _resp(status: int, payload: dict | None = None) -> MagicMock:
+    resp = MagicMock()
+    resp.status_code = status
+    resp.json.return_value = payload
+    return resp
+
+
+def test_get_data_caches_success(tmp_path: Path) -> None:
+    with Cache(tmp_path / "c.sqlite") as cache:
+        with LichessExplorer(cache) as explorer:
+            with patch.object(explorer._session, "get", return_value=_resp(200, _RESPONSE)) as get:
+                assert explorer.get_data(_FEN).total == 18
+                assert explorer.get_data(_FEN).total == 18
+    assert get.call_count == 1
+
+
+def test_failed_lookup_is_negatively_cached(tmp_path: Path) -> None:
+    with Cache(tmp_path / "c.sqlite") as cache:
+        with LichessExplorer(cache) as explorer:
+            with patch.object(explorer._session, "get", return_value=_resp(404)) as get:
+                assert explorer.get_data(_FEN) is None
+                assert explorer.get_data(_FEN) is None
+    assert get.call_count == 1
+
+
+def test_rate_limited_lookup_is_not_negatively_cached(tmp_path: Path) -> None:
+    with Cache(tmp_path / "c.sqlite") as cache:
+        with LichessExplorer(cache) as explorer:
+            with patch.object(explorer._session, "get", return_value=_resp(429)) as get, \
+                    patch.object(explorer._prefetcher, "pace"), \
+                    patch("mysecond.explorer.ratelimit.record_response"):
+                assert explorer.get_data(_FEN) is None
+                assert explorer.get_data(_FEN) is None
+            assert cache.get(_FEN, "lichess_masters:failed") is None
+    assert get.call_count == 10   # retried in full both times
+
+
+def test_server_error_is_not_negatively_cached(tmp_path: Path) -> None:
+    with Cache(tmp_path / "c.sqlite") as cache:
+        with LichessExplorer(cache) as explorer:
+            with patch.object(explorer._session, "get", return_value=_resp(503)) as get:
+                assert explorer.get_data(_FEN) is None
+                assert explorer.get_data(_FEN) is None
+    assert get.call_count == 2
+
+
+def test_negative_entry_expires(tmp_path: Path) -> None:
+    with Cache(tmp_path / "c.sqlite") as cache:
+        with LichessExplorer(cache, negative_ttl=0.01) as explorer:
+            with patch.object(explorer._session, "get", return_value=_resp(404)) as get:
+                assert explorer.get_data(_FEN) is None
+                time.sleep(0.02)
+                assert explorer.get_data(_FEN) is None
+    assert get.call_count == 2
+
+
+def test_negative_entry_removed_by_success_or_purge(tmp_path: Path) -> None:
+    failed = "lichess_masters:failed"
+    with Cache(tmp_path / "c.sqlite") as cache:
+        with LichessExplorer(cache, negative_ttl=0.01) as explorer:
+            with patch.object(explorer._session, "get", side_effect=[_resp(404), _resp(200, _RESPONSE)]):
+                assert explorer.get_data(_FEN) is None
+                time.sleep(0.02)
+                assert explorer.get_data(_FEN).total == 18
+        assert cache.get(_FEN, failed) is None
+
+        cache.set(_FEN, failed, {"failed": True})
+        time.sleep(0.02)
+        LichessExplorer(cache, negative_ttl=0.01).close()
+        assert cache.get(_FEN, failed) is None
+
+
+def test_stale_entry_served_then_revalidated(tmp_path: Path) -> None:
+    fresh = dict(_RESPONSE, white=100)
+    with Cache(tmp_path / "c.sqlite") as cache:
+        cache.set(_FEN, "lichess_masters", _RESPONSE)
+        with LichessExplorer(cache) as explorer:
+            explorer._ttl = 0.0   # everything is stale
+            with patch("mysecond.explorer.requests.Session.get", return_value=_resp(200, fresh)):
+                # Stale data comes back immediately …
+                assert explorer.get_data(_FEN).white == 10
+                explorer._revalidator.shutdown(wait=True)
+                explorer._revalidator = None
+        # … and the background refresh has replaced it.
+        assert cache.get(_FEN, "lichess_masters")["white"] == 100
+
+
+def test_prefetch_warms_cache(tmp_path: Path) -> None:
+    with Cache(tmp_path / "c.sqlite") as cache:
+        with LichessExplorer(cache) as explorer:
+            with patch("mysecond.explorer.requests.Session.get", return_value=_resp(200, _RESPONSE)) as get:
+                explorer.prefetch([_FEN])
+                # Waits for the in-flight prefetch instead of fetching again.
+                assert explorer.get_data(_FEN).total == 18
+                explorer.prefetch([_FEN])   # cached: nothing queued
+                assert explorer.get_data(_FEN).total == 18
+    assert get.call_count == 1
+
+
+def test_prefetch_failure_falls_back_to_foreground_fetch(tmp_path: Path) -> None:
+    with Cache(tmp_path / "c.sqlite") as cache:
+        with LichessExplorer(cache) as explorer:
+            responses = [_resp(500), _resp(200, _RESPONSE)]
+            with patch("mysecond.explorer.requests.Session.get", side_effect=responses) as get:
+                explorer.prefetch([_FEN])
+                explorer._prefetcher.close()   # let the failing prefetch finish
+                assert explorer.get_data(_FEN).total == 18
+    assert get.call_count == 2
+
+
+def test_concurrent_lookups_share_one_request(tmp_path: Path) -> None:
+    def slow_get(*_args: object, **_kwargs: object) -> MagicMock:
+        time.sleep(0.1)
+        return _resp(200, _RESPONSE)
+
+    with Cache(tmp_path / "c.sqlite") as cache:
+        explorers = [LichessExplorer(cache) for _ in range(3)]
+        with patch("mysecond.explorer.requests.Session.get", side_effect=slow_get) as get:
+            threads = [threading.Thread(target=e.get_data, args=(_FEN,)) for e in explorers]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        for e in explorers:
+            e.close()
+    assert get.call_count == 1
+
+
+def test_waits_for_other_process_lease(tmp_path: Path) -> None:
+    db = tmp_path / "c.sqlite"
+    with Cache(db) as other, Cache(db) as cache:
+        # Another process holds the lease, then publishes its result.
+        assert other.try_fetch_lease(_FEN, "lichess_masters", ttl=10)
+        with LichessExplorer(cache) as explorer:
+            with patch.object(explorer._session, "get") as get:
+                timer = threading.Timer(
+                    0.2, other.release_fetch_lease, (_FEN, "lichess_masters", _RESPONSE),
+                )
+                timer.start()
+                assert explorer.get_data(_FEN).total == 18
+                timer.join()
+    get.assert_not_called()
+
+
+def test_waiter_finds_failure_of_other_process(tmp_path: Path) -> None:
+    db = tmp_path / "c.sqlite"
+    with Cache(db) as other, Cache(db) as cache:
+        # Another process's fetch fails: it records the failure, then releases.
+        assert other.try_fetch_lease(_FEN, "lichess_masters", ttl=10)
+        with LichessExplorer(cache) as explorer:
+            with patch.object(explorer._session, "get") as get:
+                timer = threading.Timer(0.2, lambda: (
+                    other.set(_FEN, "lichess_masters:failed", {"failed": True}),
+                    other.release_fetch_lease(_FEN, "lichess_masters"),
+                ))
+                timer.start()
+                assert explorer.get_data(_FEN) is None
+                timer.join()
+    get.assert_not_called()
+
+
+def test_miss_stores_result_with_lease_release(tmp_path: Path) -> None:
+    with Cache(tmp_path / "c.sqlite") as cache:
+        with LichessExplorer(cache) as explorer:
+            with patch.object(explorer._session, "get", return_value=_resp(200, _RESPONSE)), \
+                    patch.object(cache, "set") as set_:
+                assert explorer.get_data(_FEN).total == 18
+            set_.assert_not_called()   # written by release_fetch_lease instead
+            assert cache.get(_FEN, "lichess_masters") == _RESPONSE
+            assert not cache.fetch_lease_active(_FEN, "lichess_masters")
@@ -2,21 +2,38 @@
 
 from __future__ import annotations
 
+import gzip
 import io
+import json
 import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import chess
 import chess.pgn
 import pytest
+import requests
 
+from mysecond import game_store
+from mysecond.cache import Cache
 from mysecond.fetcher import (
+    _backend_key,
     _build_book,
+    _CompactBook,
+    _fetch_archive,
+    _iter_archives,
+    _iter_chesscom_pgns,
+    _ParallelParser,
     _merge_payloads,
     _to_payload,
+    download_raw_pgn,
     fetch_player_games,
+    import_pgn_player,
     last_fetch_ts,
+    sync_player_games,
 )
 
 
@@ -28,7 +45,7 @@ from mysecond.fetcher import (
 def _make_pgn(games: list[tuple[list[str], str]]) -> str:
     """Build a PGN string from a list of (move_ucis, result) tuples."""
     parts: list[str] = []
-    for moves, result in games:
+    for i, (moves, result) in enumerate(games):
         board = chess.Board()
         san_moves: list[str] = []
         move_num = 1
@@ -40,13 +57,21 @@ def _make_pgn(games: list[tuple[list[str], str]]) -> str:
             san_moves.append(board.san(m))
             board.push(m)
         parts.append(
-            f'[Event "Test"]\n[White "A"]\n[Black "B"]\n[Result "{result}"]\n\n'
+            f'[Event "Test"]\n[Site "https://lichess.org/{i}-{"-".join(moves)}"]\n'
+            f'[White "A"]\n[Black "B"]\n[Result "{result}"]\n[TimeControl "300+0"]\n\n'
             + " ".join(san_moves)
             + f" {result}\n\n"
         )
     return "\n".join(parts)
 
 
+@pytest.fixture(autouse=True)
+def _local_stores(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Keep the game store and Chess.com archive store out of data/."""
+    monkeypatch.setenv("MYSECOND_GAME_STORE", str(tmp_path / "games.sqlite"))
+    monkeypatch.setenv("MYSECOND_CHESSCOM_ARCHIVE_DB", str(tmp_path / "archives.sqlite"))
+
+
 def _mock_cache() -> MagicMock:
     cache = MagicMock()
     cache.get.return_value = None
@@ -160,6 +185,72 @@ def test_build_book_skips_unfinished_games() -> None:
     assert len(book) == 0
 
 
+def test_build_book_parallel_matches_serial() -> None:
+    pgn = _make_pgn([
+        (["e2e4", "e7e5", "g1f3", "b8c6"], "1-0"),
+        (["d2d4", "d7d5", "c2c4"], "1/2-1/2"),
+        (["e2e4", "c7c5", "g1f3"], "0-1"),
+        (["e2e4", "e7e5"], "*"),
+        (["e2e4", "e7e5", "f1c4"], "1-0"),
+    ] * 3)
+    serial = _build_book(pgn, "white", max_plies=6, workers=1)
+    with patch("mysecond.fetcher._PARSE_CHUNK_GAMES", 2):
+        parallel = _build_book(pgn, "white", max_plies=6, workers=2)
+    assert parallel == serial
+    assert list(parallel) == list(serial)
+
+
+def test_parallel_parser_starts_pool_on_first_full_chunk() -> None:
+    game = _make_pgn([(["e2e4", "e7e5"], "1-0")])
+    with _ParallelParser({"w": "white"}, 4, workers=2) as parser:
+        for _ in range(3):
+            parser.add(game, "w")
+        assert parser.collect()["w"].processed == 3
+        assert parser._pool is None   # a small fetch is parsed in-process
+    with patch("mysecond.fetcher._PARSE_CHUNK_GAMES", 2), \
+            _ParallelParser({"w": "white"}, 4, workers=2) as parser:
+        for _ in range(3):
+            parser.add(game, "w")
+        assert parser._pool is not None
+        assert parser.collect()["w"].processed == 3
+
+
+def test_build_book_merges_transpositions() -> None:
+    pgn = _make_pgn([
+        (["g1f3", "g8f6", "b1c3", "b8c6", "d2d4"], "1-0"),
+        (["b1c3", "b8c6", "g1f3", "g8f6", "e2e4"], "0-1"),
+    ])
+    book = _build_book(pgn, "white", max_plies=5)
+    b = chess.Board()
+    for uci in ("g1f3", "g8f6", "b1c3", "b8c6"):
+        b.push(chess.Move.from_uci(uci))
+    pos = book[" ".join(b.fen().split(" ")[:3]) + " -"]
+    assert (pos["white"], pos["draws"], pos["black"]) == (1, 0, 1)
+    assert set(pos["moves"]) == {"d2d4", "e2e4"}
+
+
+def test_compact_book_update_and_promotions() -> None:
+    board = chess.Board("k7/4P3/8/8/8/8/8/K7 w - - 0 1")
+    first, second = _CompactBook(), _CompactBook()
+    first.add(board, chess.Move.from_uci("e7e8q"), 0)
+    second.add(chess.Board(), chess.Move.from_uci("e2e4"), 1)
+    second.add(board, chess.Move.from_uci("e7e8n"), 2)
+    first.update(second)
+
+    book = first.to_dict()
+    promo_fen = "k7/4P3/8/8/8/8/8/K7 w - -"
+    start_fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+    assert list(book) == [promo_fen, start_fen]
+    assert book[promo_fen] == {
+        "white": 1, "draws": 0, "black": 1,
+        "moves": {
+            "e7e8q": {"white": 1, "draws": 0, "black": 0},
+            "e7e8n": {"white": 0, "draws": 0, "black": 1},
+        },
+    }
+    assert book[start_fen]["moves"] == {"e2e4": {"white": 0, "draws": 1, "black": 0}}
+
+
 # ---------------------------------------------------------------------------
 # _to_payload
 # ---------------------------------------------------------------------------
@@ -243,7 +334,7 @@ def test_fetch_player_games_writes_to_cache(tmp_path: Path) -> None:
 
     mock_resp = MagicMock()
     mock_resp.status_code = 200
-    mock_resp.text = pgn
+    mock_resp.iter_lines.return_value = pgn.splitlines()
     mock_resp.raise_for_status = MagicMock()
 
     from mysecond.cache import Cache
@@ -255,7 +346,7 @@ def test_fetch_player_games_writes_to_cache(tmp_path: Path) -> None:
 
         with Cache(tmp_path / "cache.sqlite") as cache:
             count = fetch_player_games(
-                "testuser", "white", cache,
+                "A", "white", cache,
                 speeds="blitz", max_plies=6, max_games=100,
                 verbose=False,
             )
@@ -267,7 +358,7 @@ def test_fetch_player_games_returns_zero_on_empty_response(tmp_path: Path) -> No
     """Empty PGN response should return 0 and not crash."""
     mock_resp = MagicMock()
     mock_resp.status_code = 200
-    mock_resp.text = ""
+    mock_resp.iter_lines.return_value = []
     mock_resp.raise_for_status = MagicMock()
 
     from mysecond.cache import Cache
@@ -300,6 +391,74 @@ def test_fetch_player_games_raises_on_http_error(tmp_path: Path) -> None:
                 fetch_player_games("ghost", "white", cache, verbose=False)
 
 
+def test_fetch_both_colors_downloads_once(tmp_path: Path) -> None:
+    """color='both' routes each game to the book of the colour A played."""
+    pgn = _make_pgn([(["e2e4", "e7e5"], "1-0")]) + "\n" + _make_pgn(
+        [(["d2d4", "d7d5"], "0-1")]).replace('[White "A"]\n[Black "B"]', '[White "B"]\n[Black "A"]')
+    mock_resp = MagicMock()
+    mock_resp.status_code = 200
+    mock_resp.iter_lines.return_value = pgn.splitlines()
+
+    with patch("mysecond.fetcher.requests.Session") as mock_cls:
+        mock_session = MagicMock()
+        mock_session.get.return_value = mock_resp
+        mock_cls.return_value = mock_session
+
+        with Cache(tmp_path / "cache.sqlite") as cache:
+            fetch_player_games("a", "both", cache, speeds="blitz", max_plies=4, verbose=False)
+            white = dict(cache.iter_backend(_backend_key("a", "white", "blitz"), skip_meta=True))
+            black = dict(cache.iter_backend(_backend_key("a", "black", "blitz"), skip_meta=True))
+            assert last_fetch_ts("a", "both", "blitz", cache) is not None
+
+    assert mock_session.get.call_count == 1
+    assert "color" not in mock_session.get.call_args.kwargs["params"]
+    start = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+    assert [m["uci"] for m in white[start]["moves"]] == ["e2e4"]
+    after_d4 = "rnbqkbnr/pppppppp/8/8/3P4/8/PPP1PPPP/RNBQKBNR b KQkq -"
+    assert [m["uci"] for m in black[after_d4]["moves"]] == ["d7d5"]
+
+
+def test_overlapping_speed_sets_share_downloads_and_books(tmp_path: Path) -> None:
+    """Each speed is downloaded and indexed once; speed sets add them up."""
+    games = {
+        "blitz": _make_pgn([(["e2e4", "e7e5"], "1-0")]),
+        "rapid": _make_pgn([(["d2d4", "d7d5"], "0-1")]).replace('"300+0"', '"900+10"'),
+    }
+
+    def get(url: str, params: dict, **_: object) -> MagicMock:
+        resp = MagicMock()
+        resp.status_code = 200
+        # Every game is older than the newest stored one after the first sync.
+        pgn = "" if "since" in params else games[params["perfType"]]
+        resp.iter_lines.return_value = pgn.splitlines()
+        return resp
+
+    start = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+    with patch("mysecond.fetcher.requests.Session") as mock_cls, \
+            Cache(tmp_path / "cache.sqlite") as cache:
+        mock_session = MagicMock()
+        mock_session.get.side_effect = get
+        mock_cls.return_value = mock_session
+
+        fetch_player_games("A", "white", cache, speeds="blitz", verbose=False)
+        fetch_player_games("A", "white", cache, speeds="blitz,rapid", verbose=False)
+        # A merge adds only games the partition does not hold yet.
+        fetch_player_games("A", "white", cache, speeds="blitz", since_ts=0, verbose=False)
+
+        combined = cache.get(start, "lichess_player_a_white_blitz,rapid")
+        blitz = cache.get(start, "lichess_player_a_white_blitz")
+        assert last_fetch_ts("A", "white", "blitz,rapid", cache) is not None
+
+    full_downloads = [
+        c.kwargs["params"]["perfType"] for c in mock_session.get.call_args_list
+        if "since" not in c.kwargs["params"]
+    ]
+    assert full_downloads == ["blitz", "rapid"]
+    assert (combined["white"], combined["black"]) == (1, 1)
+    assert {m["uci"] for m in combined["moves"]} == {"e2e4", "d2d4"}
+    assert blitz["white"] == 1
+
+
 # ---------------------------------------------------------------------------
 # last_fetch_ts
 # ---------------------------------------------------------------------------
@@ -317,7 +476,7 @@ def test_last_fetch_ts_set_after_fetch(tmp_path: Path) -> None:
     pgn = _make_pgn([(["e2e4"], "1-0")])
     mock_resp = MagicMock()
     mock_resp.status_code = 200
-    mock_resp.text = pgn
+    mock_resp.iter_lines.return_value = pgn.splitlines()
     mock_resp.raise_for_status = MagicMock()
 
     from mysecond.cache import Cache
@@ -329,10 +488,260 @@ def test_last_fetch_ts_set_after_fetch(tmp_path: Path) -> None:
 
         with Cache(tmp_path / "cache.sqlite") as cache:
             fetch_player_games(
-                "testuser", "white", cache,
+                "A", "white", cache,
                 speeds="blitz", verbose=False,
             )
-            ts = last_fetch_ts("testuser", "white", "blitz", cache)
+            ts = last_fetch_ts("A", "white", "blitz", cache)
 
     assert ts is not None
     assert ts > 0
+
+
+# ---------------------------------------------------------------------------
+# Streaming download and resume
+# ---------------------------------------------------------------------------
+
+
+def _lichess_game(game_id: str, hhmmss: str, result: str = "1-0") -> list[str]:
+    return [
+        f'[Site "https://lichess.org/{game_id}"]',
+        '[White "u"]',
+        '[Black "v"]',
+        f'[Result "{result}"]',
+        '[TimeControl "300+0"]',
+        '[UTCDate "2024.05.01"]',
+        f'[UTCTime "{hhmmss}"]',
+        "",
+        f"1. e4 e5 {result}",
+        "",
+    ]
+
+
+def _streaming_session(lines_or_error: list) -> MagicMock:
+    def iter_lines(**_kwargs: object):
+        for item in lines_or_error:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    resp = MagicMock()
+    resp.status_code = 200
+    resp.encoding = "utf-8"
+    resp.iter_lines.side_effect = iter_lines
+    session = MagicMock()
+    session.get.return_value = resp
+    return session
+
+
+def test_interrupted_fetch_resumes_from_checkpoint(tmp_path: Path) -> None:
+    start = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+    # Newest first; g2 and g3 were created in the same second.
+    first = (_lichess_game("g1", "12:00:03") + _lichess_game("g2", "12:00:02")
+             + _lichess_game("g3", "12:00:02")[:2] + [requests.ConnectionError("reset")])
+    second = (_lichess_game("g2", "12:00:02") + _lichess_game("g3", "12:00:02")
+              + _lichess_game("g4", "12:00:01"))
+
+    with Cache(tmp_path / "cache.sqlite") as cache, \
+            patch("mysecond.fetcher._CHECKPOINT_GAMES", 2), \
+            patch("mysecond.fetcher.requests.Session") as mock_cls:
+        mock_cls.return_value = _streaming_session(first)
+        with pytest.raises(RuntimeError, match="Failed to download"):
+            fetch_player_games("u", "white", cache, speeds="blitz", verbose=False)
+        assert last_fetch_ts("u", "white", "blitz", cache) is None
+
+        session = _streaming_session(second)
+        mock_cls.return_value = session
+        fetch_player_games("u", "white", cache, speeds="blitz", verbose=False)
+
+        # The resumed request asks for what was left of max_games.
+        params = session.get.call_args_list[0].kwargs["params"]
+        assert params["until"] == 1714564802000
+        assert params["max"] == 10_000 - 2
+        # g2 is not counted twice; g1..g4 each once.
+        assert cache.get(start, "lichess_player_u_white_blitz")["white"] == 4
+        assert last_fetch_ts("u", "white", "blitz", cache) is not None
+
+
+def test_stored_games_are_not_downloaded_again() -> None:
+    lines = _lichess_game("g2", "12:00:02") + _lichess_game("g1", "12:00:01")
+    with patch("mysecond.fetcher.requests.Session") as mock_cls:
+        session = _streaming_session(lines)
+        mock_cls.return_value = session
+        first = download_raw_pgn("u", "white", speeds="blitz", max_games=10)
+        session.get.return_value.iter_lines.side_effect = lambda **_: iter([])
+        second = download_raw_pgn("u", "white", speeds="blitz", max_games=2)
+
+    assert first == second
+    assert first.index("g2") < first.index("g1")        # newest first
+    # The history was exhausted on the first call; the second only asks
+    # for games played since the newest stored one.
+    params = session.get.call_args.kwargs["params"]
+    assert params["since"] == 1714564802000 and "max" not in params
+
+
+def test_max_games_caps_the_whole_speed_set() -> None:
+    """max_games is shared by the speeds: 4 games over blitz and rapid, not 4 each."""
+    def game(speed: str, n: int) -> tuple[int, list[str]]:
+        lines = _lichess_game(f"{speed}{n}", f"12:00:{n:02d}")
+        if speed == "rapid":
+            lines = [line.replace('"300+0"', '"900+10"') for line in lines]
+        return 1714564800000 + n * 1000, lines
+
+    history = {speed: [game(speed, n) for n in range(9, 0, -1)] for speed in ("blitz", "rapid")}
+
+    def get(url: str, params: dict, **_: object) -> MagicMock:
+        until = params.get("until", float("inf"))
+        games = [lines for ts, lines in history[params["perfType"]] if ts <= until]
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.iter_lines.return_value = [line for g in games[:params.get("max")] for line in g]
+        return resp
+
+    with patch("mysecond.fetcher.requests.Session") as mock_cls:
+        mock_cls.return_value.get.side_effect = get
+        added = sync_player_games("u", color="both", speeds="blitz,rapid", max_games=4,
+                                  verbose=False, show_progress=False)
+
+    store = game_store.get_store()
+    assert added == 4
+    assert [store.count("lichess", "u", "both", s) for s in ("blitz", "rapid")] == [2, 2]
+
+
+# ---------------------------------------------------------------------------
+# Chess.com archives
+# ---------------------------------------------------------------------------
+
+
+def _archive_resp(payload: dict, status: int = 200, headers: dict | None = None) -> MagicMock:
+    resp = MagicMock()
+    resp.status_code = status
+    resp.headers = headers or {}
+    resp.content = json.dumps(payload).encode()
+    resp.json.return_value = payload
+    return resp
+
+
+def test_chesscom_archives_fetched_concurrently_in_order() -> None:
+    active = peak = 0
+    lock = threading.Lock()
+
+    def fake_get(_session: object, url: str, **_kwargs: object) -> tuple[MagicMock, bool]:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return _archive_resp({"games": [], "url": url}), False
+
+    urls = [f"https://api.chess.com/pub/player/u/games/2024/{m:02d}" for m in range(12, 0, -1)]
+    with patch("mysecond.fetcher._chesscom_get_with_backoff", side_effect=fake_get):
+        got = [url for url, resp, error in _iter_archives(urls, MagicMock, max_concurrency=4)]
+    assert got == urls
+    assert 1 < peak <= 4
+
+
+def test_chesscom_download_stops_at_max_games() -> None:
+    archives = [f"https://api.chess.com/pub/player/u/games/2024/{m:02d}" for m in range(1, 13)]
+    fetched: list[str] = []
+
+    def fake_get(_session: object, url: str, **_kwargs: object) -> tuple[MagicMock, bool]:
+        if url.endswith("/u"):
+            return _archive_resp({"username": "U"}), False
+        if url.endswith("/archives"):
+            return _archive_resp({"archives": archives}), False
+        fetched.append(url)
+        game = {"rules": "chess", "time_class": "blitz", "white": {"username": "u"},
+                "pgn": f'[Event "{url[-7:]}"]\n\n1. e4 *'}
+        return _archive_resp({"games": [game, game]}), False
+
+    with patch("mysecond.fetcher._chesscom_get_with_backoff", side_effect=fake_get), \
+            patch("mysecond.fetcher._chesscom_session", MagicMock):
+        pgns = list(_iter_chesscom_pgns("u", "white", "blitz", 3, None, show_progress=False))
+
+    assert len(pgns) == 3
+    assert '"2024/12"' in pgns[0]           # newest archive first
+    assert len(fetched) < len(archives)     # older archives never downloaded
+
+
+def test_completed_chesscom_month_is_never_refetched() -> None:
+    url = "https://api.chess.com/pub/player/U/games/2024/03"
+    with patch("mysecond.fetcher._chesscom_get_with_backoff",
+               return_value=(_archive_resp({"games": [{"pgn": "x"}]}), False)) as get:
+        assert _fetch_archive(MagicMock(), url)[0]["games"] == [{"pgn": "x"}]
+        assert _fetch_archive(MagicMock(), url)[0]["games"] == [{"pgn": "x"}]
+    assert get.call_count == 1
+
+
+def test_current_chesscom_month_is_revalidated() -> None:
+    now = datetime.now(timezone.utc)
+    url = f"https://api.chess.com/pub/player/u/games/{now.year}/{now.month:02d}"
+    first = _archive_resp({"games": [{"pgn": "x"}]}, headers={"ETag": '"v1"'})
+    with patch("mysecond.fetcher._chesscom_get_with_backoff",
+               side_effect=[(first, False), (_archive_resp({}, status=304), False)]) as get:
+        _fetch_archive(MagicMock(), url)
+        payload, _ = _fetch_archive(MagicMock(), url)
+    assert payload["games"] == [{"pgn": "x"}]       # served from the store on 304
+    assert get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+
+# ---------------------------------------------------------------------------
+# import_pgn_player
+# ---------------------------------------------------------------------------
+
+
+def test_import_filters_player_and_writes_in_batches(tmp_path: Path) -> None:
+    pgn = _make_pgn([(["e2e4", "e7e5"], "1-0"), (["d2d4", "d7d5"], "0-1"),
+                     (["c2c4", "e7e5"], "1-0")])
+    pgn = pgn.replace('[White "A"]', '[White "Other"]', 1)   # first game is not A's
+    path = tmp_path / "db.pgn.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as fh:
+        fh.write(pgn)
+
+    start = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+    with Cache(tmp_path / "cache.sqlite") as cache:
+        count = import_pgn_player(path, "a", "white", cache, speeds="otb",
+                                  verbose=False, player="a", batch_games=1)
+        entry = cache.get(start, _backend_key("a", "white", "otb"))
+
+    assert count > 0
+    # Two games of A, written in two batches and merged.
+    assert sorted(m["uci"] for m in entry["moves"]) == ["c2c4", "d2d4"]
+    assert (entry["white"], entry["black"]) == (1, 1)
+
+
+def test_import_after_fetch_adds_to_fetched_games(tmp_path: Path) -> None:
+    """Imported games sit in their own partitions: a fetch never shadows them."""
+    fetched = _make_pgn([(["e2e4", "e7e5"], "1-0")])
+    imported = _make_pgn([(["e2e4", "c7c5", "g1f3"], "1-0"), (["d2d4", "d7d5", "c2c4"], "0-1")])
+    path = tmp_path / "otb.pgn"
+    path.write_text(imported.replace('"300+0"', '"5400+30"', 1), encoding="utf-8")
+
+    def get(url: str, params: dict, **_: object) -> MagicMock:
+        resp = MagicMock()
+        resp.status_code = 200
+        resp.iter_lines.return_value = fetched.splitlines() if params["perfType"] == "blitz" else []
+        return resp
+
+    start = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+    speeds = "blitz,rapid,classical"
+    with patch("mysecond.fetcher.requests.Session") as mock_cls, \
+            Cache(tmp_path / "cache.sqlite") as cache:
+        mock_cls.return_value.get.side_effect = get
+        fetch_player_games("A", "white", cache, speeds=speeds, verbose=False)
+        counts = [
+            import_pgn_player(path, "A", "white", cache, speeds=speeds, verbose=False)
+            for _ in range(2)
+        ]
+        fetch_player_games("A", "white", cache, speeds=speeds, since_ts=0, verbose=False)
+
+        combined = cache.get(start, "lichess_player_a_white_" + speeds)
+        classical = cache.get(start, "lichess_player_a_white_classical")
+
+    # The start position plus the position after each game's first move pair.
+    assert counts == [3, 3]
+    assert combined["white"] == 2 and combined["black"] == 1
+    assert {m["uci"]: m["white"] + m["black"] for m in combined["moves"]} == {"e2e4": 2, "d2d4": 1}
+    # The first imported game is classical by its TimeControl, the second blitz.
+    assert classical["white"] == 1 and classical["moves"][0]["uci"] == "e2e4"
@@ -0,0 +1,51 @@
+"""Tests for the local game store."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from mysecond.game_store import GameStore, SyncState, game_record, game_speed
+
+
+def _pgn(game_id: str, white: str, black: str, time: str, tc: str = "300+0") -> str:
+    return (
+        f'[Site "https://lichess.org/{game_id}"]\n[White "{white}"]\n[Black "{black}"]\n'
+        f'[Result "1-0"]\n[UTCDate "2024.05.01"]\n[UTCTime "{time}"]\n'
+        f'[TimeControl "{tc}"]\n\n1. e4 e5 1-0'
+    )
+
+
+def test_games_are_deduplicated_by_id(tmp_path: Path) -> None:
+    store = GameStore(tmp_path / "games.sqlite")
+    record = game_record("lichess", _pgn("abc", "Alice", "Bob", "12:00:00"))
+    assert store.add("lichess", [record]) == 1
+    assert store.add("lichess", [record]) == 0
+    assert store.count("lichess", "alice", "both", "blitz") == 1
+
+
+def test_iter_games_filters_by_colour_and_speed(tmp_path: Path) -> None:
+    store = GameStore(tmp_path / "games.sqlite")
+    store.add("lichess", [
+        game_record("lichess", _pgn("g1", "Alice", "Bob", "12:00:01")),
+        game_record("lichess", _pgn("g2", "Bob", "Alice", "12:00:03")),
+        game_record("lichess", _pgn("g3", "Alice", "Carol", "12:00:02", tc="60+0")),
+    ])
+    both = list(store.iter_games("lichess", "ALICE", "both", "blitz,bullet"))
+    assert [color for color, _ in both] == ["black", "white", "white"]   # newest first
+    assert len(list(store.iter_games("lichess", "alice", "white", "blitz"))) == 1
+    assert len(list(store.iter_games("lichess", "alice", "both", "blitz", limit=1))) == 1
+
+
+def test_sync_state_round_trips(tmp_path: Path) -> None:
+    store = GameStore(tmp_path / "games.sqlite")
+    assert store.sync_state("lichess", "alice", "blitz") == SyncState()
+    state = SyncState(newest_ts=2, oldest_ts=1, resume={"kind": "older", "until": 1})
+    store.save_sync_state("lichess", "Alice", "rapid,blitz", state)
+    assert store.sync_state("lichess", "alice", "blitz,rapid") == state
+
+
+def test_game_speed_follows_platform_rules() -> None:
+    assert game_speed("lichess", "180+2") == "blitz"
+    assert game_speed("lichess", "1800+20") == "classical"
+    assert game_speed("chesscom", "600") == "rapid"
+    assert game_speed("chesscom", "1/86400") == "daily"
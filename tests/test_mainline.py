@@ -0,0 +1,55 @@
+"""Tests for the mainline-only PGN reader."""
+
+from __future__ import annotations
+
+import io
+
+import chess
+
+from mysecond.mainline import iter_mainlines
+
+_PGN = """\
+[Event "A"]
+[Result "1-0"]
+
+1. e4 {book} e5 (1... c5 2. Nf3) 2. Nf3 Nc6 3. Bb5 a6 1-0
+
+[Event "B"]
+[Result "*"]
+
+1. d4 d5 2. Qxx7 Nf6 *
+"""
+
+
+def _games(**kwargs: object) -> list:
+    return list(iter_mainlines(io.StringIO(_PGN), **kwargs))
+
+
+def test_stops_parsing_at_max_plies_but_counts_all() -> None:
+    a, b = _games(max_plies=3)
+    assert [m.uci() for m in a.moves] == ["e2e4", "e7e5", "g1f3"]
+    assert a.plies == 6          # variation not counted
+    # Illegal SAN ends the mainline at the last legal move.
+    assert [m.uci() for m in b.moves] == ["d2d4", "d7d5"]
+    assert b.plies == 2
+
+
+def test_positions_replay_from_start() -> None:
+    a = _games(max_plies=2)[0]
+    fens = [board.fen() for board, _ in a.positions()]
+    assert fens[0] == chess.STARTING_FEN
+    assert len(fens) == 2
+
+
+def test_headers_only() -> None:
+    games = _games(max_plies=0)
+    assert [g.headers["Event"] for g in games] == ["A", "B"]
+    assert all(not g.moves for g in games)
+
+
+def test_stop_condition_and_accept_filter() -> None:
+    (a,) = _games(stop=lambda board: board.fullmove_number >= 2,
+                  accept=lambda h: h["Result"] != "*")
+    assert a.stopped
+    assert [m.uci() for m in a.moves] == ["e2e4", "e7e5"]
+    assert a.plies == 6
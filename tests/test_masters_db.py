@@ -0,0 +1,128 @@
+"""Tests for the local masters index."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import patch
+
+import chess
+import pytest
+
+from mysecond.mainline import iter_mainlines
+from mysecond.masters_db import LocalMastersExplorer, build_masters_db
+
+_PGN = """\
+[Event "A"]
+[White "X"]
+[Black "Y"]
+[Result "1-0"]
+[WhiteElo "2600"]
+[BlackElo "2500"]
+
+1. e4 e5 2. Nf3 Nc6 1-0
+
+[Event "B"]
+[White "X"]
+[Black "Y"]
+[Result "1/2-1/2"]
+[WhiteElo "2400"]
+[BlackElo "2400"]
+
+1. e4 c5 (1... e5 2. Nf3) 2. Nf3 1/2-1/2
+
+[Event "C"]
+[White "X"]
+[Black "Y"]
+[Result "0-1"]
+[WhiteElo "2700"]
+[BlackElo "1800"]
+
+1. d4 d5 0-1
+
+[Event "D"]
+[White "X"]
+[Black "Y"]
+[Result "*"]
+[WhiteElo "2700"]
+[BlackElo "2700"]
+
+1. c4 *
+"""
+
+_START = chess.STARTING_FEN
+
+
+def _after(*ucis: str) -> str:
+    board = chess.Board()
+    for uci in ucis:
+        board.push_uci(uci)
+    return board.fen()
+
+
+@pytest.fixture()
+def pgn(tmp_path: Path) -> Path:
+    path = tmp_path / "games.pgn"
+    path.write_text(_PGN)
+    return path
+
+
+def test_build_counts_results_and_orders_moves(tmp_path: Path, pgn: Path) -> None:
+    db = tmp_path / "masters.sqlite"
+    assert build_masters_db([pgn], db, verbose=False) == 2
+
+    with LocalMastersExplorer(db) as explorer:
+        root = explorer.get_data(_START)
+        assert (root.white, root.draws, root.black) == (1, 1, 0)
+        assert [m.uci for m in root.moves] == ["e2e4"]
+        assert root.moves[0].average_rating == 2475
+
+        after_e4 = explorer.get_data(_after("e2e4"))
+        assert {m.uci: m.total for m in after_e4.moves} == {"e7e5": 1, "c7c5": 1}
+        # Variations are not indexed.
+        assert explorer.get_data(_after("e2e4", "e7e5")).total == 1
+
+
+def test_unknown_position_has_no_games(tmp_path: Path, pgn: Path) -> None:
+    db = tmp_path / "masters.sqlite"
+    build_masters_db([pgn], db, verbose=False)
+    with LocalMastersExplorer(db) as explorer:
+        data = explorer.get_data(_after("g2g3"))
+    assert data.total == 0
+    assert data.moves == []
+
+
+def test_min_elo_and_max_plies(tmp_path: Path, pgn: Path) -> None:
+    db = tmp_path / "masters.sqlite"
+    assert build_masters_db([pgn], db, min_elo=0, max_plies=1, verbose=False) == 3
+    with LocalMastersExplorer(db) as explorer:
+        assert {m.uci for m in explorer.get_data(_START).moves} == {"e2e4", "d2d4"}
+        assert explorer.get_data(_after("e2e4")).moves == []
+
+
+def test_rebuild_skips_imported_files(tmp_path: Path, pgn: Path) -> None:
+    db = tmp_path / "masters.sqlite"
+    build_masters_db([pgn], db, verbose=False)
+    assert build_masters_db([pgn], db, verbose=False) == 0
+    with LocalMastersExplorer(db) as explorer:
+        assert explorer.get_data(_START).total == 2
+
+
+def test_interrupted_import_is_not_counted_twice(tmp_path: Path, pgn: Path) -> None:
+    def crash_after_first_game(*args, **kwargs):
+        games = iter_mainlines(*args, **kwargs)
+        yield next(games)
+        raise KeyboardInterrupt
+
+    db = tmp_path / "masters.sqlite"
+    with patch("mysecond.masters_db.iter_mainlines", crash_after_first_game), \
+            pytest.raises(KeyboardInterrupt):
+        build_masters_db([pgn], db, batch_games=1, verbose=False)
+
+    assert build_masters_db([pgn], db, batch_games=1, verbose=False) == 2
+    with LocalMastersExplorer(db) as explorer:
+        assert explorer.get_data(_START).total == 2
+
+
+def test_missing_index_raises(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        LocalMastersExplorer(tmp_path / "missing.sqlite")
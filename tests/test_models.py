@@ -0,0 +1,43 @@
+"""Tests for the shared data-model types."""
+
+from __future__ import annotations
+
+import pytest
+
+from mysecond.models import ExplorerData, MoveStats
+
+
+def _data() -> ExplorerData:
+    return ExplorerData(
+        white=10, draws=5, black=5,
+        moves=[
+            MoveStats(uci="d2d4", white=1, draws=1, black=0),
+            MoveStats(uci="e2e4", white=6, draws=2, black=2),
+            MoveStats(uci="c2c4", white=1, draws=1, black=0),
+        ],
+    )
+
+
+def test_moves_sorted_by_games_on_construction() -> None:
+    data = _data()
+    # Stable: d2d4 stays ahead of c2c4 on equal counts.
+    assert [m.uci for m in data.moves] == ["e2e4", "d2d4", "c2c4"]
+    assert [m.uci for m in data.top_moves(2)] == ["e2e4", "d2d4"]
+
+
+def test_callers_move_list_left_unsorted() -> None:
+    moves = [MoveStats("d2d4", 1, 0, 0), MoveStats("e2e4", 5, 0, 0)]
+    ExplorerData(white=6, draws=0, black=0, moves=moves)
+    assert [m.uci for m in moves] == ["d2d4", "e2e4"]
+
+
+def test_games_for_move_uses_index() -> None:
+    data = _data()
+    assert data.games_for_move("e2e4") == 10
+    assert data.games_for_move("g1f3") == 0
+
+
+def test_models_are_slotted() -> None:
+    with pytest.raises(AttributeError):
+        MoveStats(uci="e2e4", white=0, draws=0, black=0).extra = 1  # type: ignore[attr-defined]
+    assert not hasattr(_data(), "__dict__")
@@ -0,0 +1,96 @@
+"""Tests for network record/replay and the stand-in server."""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+import requests
+
+from mysecond import netmode
+from mysecond.netmode import Archive, request_key, serve
+
+
+@pytest.fixture()
+def server(tmp_path: Path) -> Iterator[str]:
+    """A stand-in server with an empty archive, on a free port."""
+    srv = serve(tmp_path / "served.sqlite", port=0)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_request_key_sorts_query() -> None:
+    assert request_key("get", "https://h/p?b=2&a=1") == "GET https://h/p?a=1&b=2"
+
+
+def test_live_session_is_plain(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("MYSECOND_NET_MODE", raising=False)
+    monkeypatch.delenv("MYSECOND_NET_SERVER", raising=False)
+    assert not isinstance(netmode.session().get_adapter("https://x"), netmode._NetModeAdapter)
+
+
+def test_stand_in_server_fallbacks(server: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("MYSECOND_NET_MODE", raising=False)
+    monkeypatch.setenv("MYSECOND_NET_SERVER", server)
+    with netmode.session() as s:
+        data = s.get("https://explorer.lichess.ovh/masters", params={"fen": "x"}).json()
+        assert data["moves"] == [] and data["white"] == 0
+        assert s.get("https://api.chess.com/pub/player/bob/games/archives").json() == {"archives": []}
+        assert s.get("https://example.com/nothing").status_code == 404
+    assert netmode.offline()
+
+
+def test_record_then_replay(server: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    archive = tmp_path / "net.sqlite"
+    monkeypatch.setenv("MYSECOND_NET_ARCHIVE", str(archive))
+    monkeypatch.setenv("MYSECOND_NET_MODE", "record")
+    monkeypatch.setenv("MYSECOND_NET_SERVER", server)
+    url = "https://api.chess.com/pub/player/alice"
+    assert netmode.get(url).json() == {"username": "alice"}
+    assert len(Archive(archive)) == 1
+
+    # Replay answers from the archive without any server.
+    monkeypatch.setenv("MYSECOND_NET_MODE", "replay")
+    monkeypatch.delenv("MYSECOND_NET_SERVER")
+    with netmode.session() as s:
+        resp = s.get(url)
+        assert resp.status_code == 200
+        assert resp.json() == {"username": "alice"}
+        with pytest.raises(requests.ConnectionError):
+            s.get("https://api.chess.com/pub/player/unknown")
+
+
+def test_record_keeps_streamed_body(server: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    url = "https://lichess.org/api/games/user/alice"
+    pgn = b"".join(b'[Event "Game %d"]\n\n1. e4 e5 *\n\n' % i for i in range(20_000))
+    Archive(tmp_path / "served.sqlite").append(
+        request_key("GET", url), 200, "OK", {"Content-Type": "application/x-chess-pgn"}, pgn, 0.0,
+    )
+    archive = tmp_path / "net.sqlite"
+    monkeypatch.setenv("MYSECOND_NET_ARCHIVE", str(archive))
+    monkeypatch.setenv("MYSECOND_NET_MODE", "record")
+    monkeypatch.setenv("MYSECOND_NET_SERVER", server)
+    with netmode.session() as s, s.get(url, stream=True) as resp:
+        lines = list(resp.iter_lines())
+    assert lines == pgn.split(b"\n")[:-1]
+    assert Archive(archive).next(request_key("GET", url))[3] == pgn
+
+
+def test_replay_serves_responses_in_order(tmp_path: Path) -> None:
+    archive = Archive(tmp_path / "net.sqlite")
+    key = request_key("GET", "https://h/p")
+    archive.append(key, 429, "Too Many Requests", {}, b"", 0.0)
+    archive.append(key, 200, "OK", {}, b"ok", 0.0)
+    assert [archive.next(key)[0] for _ in range(3)] == [429, 200, 200]
+    assert archive.next("GET https://h/other") is None
+
+
+def test_invalid_mode_rejected(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("MYSECOND_NET_MODE", "offline")
+    with pytest.raises(ValueError):
+        netmode.mode()
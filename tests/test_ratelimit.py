@@ -0,0 +1,84 @@
+"""Tests for the shared token-bucket rate limiter."""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from mysecond import ratelimit
+from mysecond.ratelimit import _LIMITS, RateLimiter, _Limit, _SqliteStore
+
+
+def _resp(status: int, retry_after: str | None = None) -> MagicMock:
+    resp = MagicMock()
+    resp.status_code = status
+    resp.headers = {"Retry-After": retry_after} if retry_after else {}
+    return resp
+
+
+def _limiter(tmp_path: Path) -> RateLimiter:
+    return RateLimiter(_SqliteStore(tmp_path / "rl.sqlite"))
+
+
+_FAST = _Limit(rate=20.0, burst=2, min_rate=1.0, penalty=0.05)
+
+
+def test_burst_then_paced(tmp_path: Path) -> None:
+    with patch.dict(_LIMITS, {"test": _FAST}):
+        limiter = _limiter(tmp_path)
+        assert limiter.acquire("test") == 0
+        assert limiter.acquire("test") == 0
+        # Bucket empty: the third request waits for one refill (1/20 s).
+        assert limiter.acquire("test") > 0
+
+
+def test_bucket_shared_between_limiters(tmp_path: Path) -> None:
+    # Two limiters on one file stand in for two processes.
+    with patch.dict(_LIMITS, {"test": _FAST}):
+        a, b = _limiter(tmp_path), _limiter(tmp_path)
+        a.acquire("test")
+        a.acquire("test")
+        assert b.acquire("test") > 0
+
+
+def test_429_blocks_for_retry_after_and_halves_rate(tmp_path: Path) -> None:
+    with patch.dict(_LIMITS, {"test": _FAST}):
+        store = _SqliteStore(tmp_path / "rl.sqlite")
+        limiter = RateLimiter(store)
+        limiter.acquire("test")
+        limiter.record_response("test", _resp(429, retry_after="0.1"))
+        start = time.monotonic()
+        limiter.acquire("test")
+        assert time.monotonic() - start >= 0.09
+        _, rate, _, _ = store._load("test", _FAST, time.time())
+        assert rate == 10.0
+
+        # Successful responses recover the rate gradually.
+        limiter.record_response("test", _resp(200))
+        _, rate, _, _ = store._load("test", _FAST, time.time())
+        assert rate == 11.0
+
+
+def test_429_without_retry_after_uses_penalty(tmp_path: Path) -> None:
+    with patch.dict(_LIMITS, {"test": _FAST}):
+        limiter = _limiter(tmp_path)
+        limiter.record_response("test", _resp(429))
+        assert limiter.acquire("test") >= 0.04
+
+
+def test_success_at_full_rate_is_not_written(tmp_path: Path) -> None:
+    with patch.dict(_LIMITS, {"test": _FAST}):
+        store = _SqliteStore(tmp_path / "rl.sqlite")
+        limiter = RateLimiter(store)
+        limiter.acquire("test")
+        with patch.object(store, "_save") as save:
+            limiter.record_response("test", _resp(200))
+        save.assert_not_called()
+
+
+def test_replayed_responses_are_not_recorded(monkeypatch) -> None:
+    monkeypatch.setenv("MYSECOND_NET_MODE", "replay")
+    with patch.object(ratelimit, "get_limiter") as get_limiter:
+        ratelimit.record_response("lichess-api", _resp(429))
+    get_limiter.assert_not_called()
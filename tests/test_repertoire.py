@@ -101,7 +101,8 @@ def test_get_data_cache_miss_fetches_and_stores() -> None:
         data = exp.get_data(chess.STARTING_FEN)
 
     assert data is not None
-    cache.set.assert_called_once()
+    # Stored together with the release of the fetch lease.
+    cache.release_fetch_lease.assert_called_once_with(chess.STARTING_FEN, exp._answers, raw)
     exp.close()
 
 
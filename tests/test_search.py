@@ -10,7 +10,7 @@ import chess.engine
 import pytest
 
 from mysecond.models import ExplorerData, MoveStats
-from mysecond.search import SearchConfig, _PendingNovelty, _walk
+from mysecond.search import SearchConfig, _PendingNovelty, _pending_board, _walk
 
 
 # ---------------------------------------------------------------------------
@@ -109,6 +109,31 @@ def test_move_with_zero_games_becomes_candidate() -> None:
     assert pending[0].post_novelty_games == 0
 
 
+def test_candidate_board_rebuilt_with_move_history() -> None:
+    """A queued candidate's position is rebuilt with the moves that led to it."""
+    board = chess.Board()
+    for uci in ("e2e4", "e7e5"):
+        board.push_uci(uci)
+
+    pending: list[_PendingNovelty] = []
+    _walk(
+        board=board,
+        book_moves=["e2e4", "e7e5"],
+        book_moves_san=["e4", "e5"],
+        config=_config(engine_candidates=1, novelty_threshold=0),
+        eng=_mock_engine(["g1f3"]),
+        explorer=_explorer_with({"d2d4": 3000}),
+        pending=pending,
+        visited=set(),
+        positions_visited=[0],
+    )
+
+    assert len(pending) == 1
+    rebuilt = _pending_board(pending[0], _config())
+    assert rebuilt.fen() == pending[0].fen
+    assert [m.uci() for m in rebuilt.move_stack] == ["e2e4", "e7e5"]
+
+
 def test_in_book_move_causes_recursion() -> None:
     """A move with many games must trigger recursion, not become a candidate."""
     # 1.e4 is in the book (5000 games); after 1.e4 the position has <min_book_games
@@ -92,6 +92,12 @@ def _fake_job(command: str = "fetch") -> MagicMock:
 # ---------------------------------------------------------------------------
 
 
+@pytest.fixture(autouse=True)
+def _tmp_uploads(monkeypatch, tmp_path):
+    """Save uploaded PGNs under the test's temp directory, not data/uploads."""
+    monkeypatch.setattr(server, "UPLOADS_DIR", tmp_path)
+
+
 @pytest.fixture()
 def mock_registry(monkeypatch):
     """Replace server.registry with a controllable MagicMock.
@@ -343,7 +349,7 @@ class TestImportPgnRoute:
 
     def test_rpush_called_on_success(self, monkeypatch, mock_registry, mock_redis):
         reg, job = mock_registry
-        # The route saves the PGN file to UPLOADS_DIR; mock pgn_file.save() too.
+        # The route saves the PGN file to UPLOADS_DIR (tmp_path, see _tmp_uploads).
         monkeypatch.setattr(server, "get_current_user", lambda: _fake_user(role="admin"))
 
         with server.app.test_client() as client:
@@ -555,3 +561,42 @@ class TestJobLimitGating:
 
         assert resp.status_code == 401
         mock_redis.rpush.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# GET /api/players/<slug>/book/<color>/<position>
+# ---------------------------------------------------------------------------
+
+
+class TestPlayerBookPosition:
+    _START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq -"
+
+    def _player(self, monkeypatch, tmp_path):
+        book = tmp_path / "magnus-white.json"
+        book.write_text(json.dumps({"positions": {self._START: [
+            {"uci": "e2e4", "games": 40}, {"uci": "d2d4", "games": 12},
+        ]}}))
+        fpm = MagicMock()
+        fpm.get.return_value = {"status": "ready", "white_book_path": str(book)}
+        monkeypatch.setattr(server, "featured_player_manager", fpm)
+
+    def test_returns_moves_for_one_position(self, authed_client, monkeypatch, tmp_path):
+        client, _, _ = authed_client
+        self._player(monkeypatch, tmp_path)
+        resp = client.get(f"/api/players/magnus/book/white/{self._START}")
+        assert resp.status_code == 200
+        assert resp.get_json()["moves"] == [
+            {"uci": "e2e4", "games": 40}, {"uci": "d2d4", "games": 12},
+        ]
+        assert (tmp_path / "magnus-white.bin").exists()
+
+    def test_unknown_position_returns_empty(self, authed_client, monkeypatch, tmp_path):
+        client, _, _ = authed_client
+        self._player(monkeypatch, tmp_path)
+        resp = client.get("/api/players/magnus/book/white/8/8/8/8/8/8/8/K6k w - -")
+        assert resp.get_json() == {"moves": []}
+
+    def test_bad_color_returns_400(self, authed_client):
+        client, _, _ = authed_client
+        resp = client.get(f"/api/players/magnus/book/green/{self._START}")
+        assert resp.status_code == 400
@@ -17,6 +17,7 @@ PLAYERS_DIR = DATA_DIR / "players"
 PHOTOS_DIR = REPO_ROOT / "web" / "static" / "player-photos"
 OUTPUT_DIR = DATA_DIR / "output"   # bot model JSONs live here as {job_id}.json
 CACHE_DB = DATA_DIR / "cache.sqlite"  # opening explorer cache (accumulated from API calls)
+CACHE_SHARDS_DIR = DATA_DIR / "cache-shards"  # per-player opening books (mysecond.cache)
 
 _status: dict = {}
 _lock = threading.Lock()
@@ -114,6 +115,18 @@ def create_backup(description: str = "") -> dict:
                 src.backup(dst)
                 dst.close()
                 src.close()
+            if CACHE_SHARDS_DIR.exists():
+                shards_backup_dir = backup_path / "cache-shards"
+                shards_backup_dir.mkdir(parents=True, exist_ok=True)
+                for shard in sorted(CACHE_SHARDS_DIR.iterdir()):
+                    if shard.suffix == ".sqlite":
+                        src = sqlite3.connect(str(shard))
+                        dst = sqlite3.connect(str(shards_backup_dir / shard.name))
+                        src.backup(dst)
+                        dst.close()
+                        src.close()
+                    elif shard.name.endswith(".sqlite.gz"):   # cold shard
+                        shutil.copy2(str(shard), str(shards_backup_dir / shard.name))
 
             # 5. meta.json
             db_size = db_path.stat().st_size if db_path.exists() else 0
@@ -229,6 +242,11 @@ def restore_backup(backup_id: str) -> dict:
             if cache_backup.exists():
                 _update(op_id, message="Restoring cache database…")
                 shutil.copy2(str(cache_backup), str(CACHE_DB))
+            shards_backup_dir = backup_path / "cache-shards"
+            if shards_backup_dir.exists():
+                if CACHE_SHARDS_DIR.exists():
+                    shutil.rmtree(CACHE_SHARDS_DIR)
+                shutil.copytree(str(shards_backup_dir), str(CACHE_SHARDS_DIR))
 
             # 4. Read git commit from meta
             meta_path = backup_path / "meta.json"
@@ -64,9 +64,10 @@ function randomColor() { return Math.random() < 0.5 ? 'white' : 'black' }
 const STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
 const normFen = fen => fen.split(' ').slice(0, 3).join(' ') + ' -'
 
-function getBookMove(fen, book) {
-  if (!book) return null
-  const all = book[normFen(fen)] || []
+async function getBookMove(slug, color, fen) {
+  const res = await fetch(`/api/players/${slug}/book/${color}/${encodeURIComponent(normFen(fen))}`)
+  if (!res.ok) return null
+  const all = (await res.json()).moves || []
   const moves = all.filter(m => m.games >= 10)
   const pool = moves.length ? moves : (all.length ? all.slice(0, 1) : [])
   if (!pool.length) return null
@@ -435,9 +436,8 @@ export default function PlayerProfileApp({ slug, displayName, elo, title, logged
   const [activeTab, setActiveTab] = useState('overview')
 
   // Data
-  const [whiteBook, setWhiteBook] = useState(null)
-  const [blackBook, setBlackBook] = useState(null)
-  const [bookError, setBookError] = useState(false)
+  const [booksLoaded, setBooksLoaded] = useState(false)
+  const [bookError,   setBookError]   = useState(false)
   const [profile,   setProfile]   = useState(null)
 
   // Practice state
@@ -455,13 +455,13 @@ export default function PlayerProfileApp({ slug, displayName, elo, title, logged
   const isLoggedIn = loggedIn === 'true'
 
   useEffect(() => {
-    Promise.all([
-      fetch(`/api/players/${slug}/book/white`).then(r => r.json()),
-      fetch(`/api/players/${slug}/book/black`).then(r => r.json()),
-    ]).then(([w, b]) => {
-      setWhiteBook(w.positions || {})
-      setBlackBook(b.positions || {})
-    }).catch(() => setBookError(true))
+    // Books are queried one position at a time; probing the start position
+    // checks both are reachable without downloading them.
+    const startFen = encodeURIComponent(normFen(STARTING_FEN))
+    Promise.all(['white', 'black'].map(c =>
+      fetch(`/api/players/${slug}/book/${c}/${startFen}`).then(r => { if (!r.ok) throw new Error(r.status) })
+    )).then(() => setBooksLoaded(true))
+      .catch(() => setBookError(true))
 
     fetch(`/api/players/${slug}/profile`)
       .then(r => r.ok ? r.json() : null)
@@ -477,8 +477,6 @@ export default function PlayerProfileApp({ slug, displayName, elo, title, logged
       .catch(() => {})
   }, [slug])
 
-  const booksLoaded = whiteBook !== null && blackBook !== null
-
   useEffect(() => {
     setFen(STARTING_FEN); setLastMove(null); setGameOver(null)
     setMoveSource(null); setMoves([]); setResetKey(k => k + 1)
@@ -501,8 +499,7 @@ export default function PlayerProfileApp({ slug, displayName, elo, title, logged
     }
 
     try {
-      const botBook = botColor === 'white' ? whiteBook : blackBook
-      const bookMove = getBookMove(currentFen, botBook)
+      const bookMove = await getBookMove(slug, botColor, currentFen)
       if (bookMove) { applyMove(bookMove, 'opening'); return }
       const controller = new AbortController()
       const abortTimer = setTimeout(() => controller.abort(), 10_000)
@@ -520,7 +517,7 @@ export default function PlayerProfileApp({ slug, displayName, elo, title, logged
     } finally {
       thinkingRef.current = false; setThinking(false)
     }
-  }, [slug, userColor, whiteBook, blackBook])
+  }, [slug, userColor])
 
   useEffect(() => {
     if (fen !== STARTING_FEN) return
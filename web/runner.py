@@ -249,6 +249,8 @@ def build_import_argv(params: dict, pgn_path: str) -> list[str]:
     cmd += ["--color", params["color"]]
     if params.get("max_plies"):
         cmd += ["--max-plies", str(params["max_plies"])]
+    if params.get("player"):
+        cmd += ["--player", params["player"]]
     return cmd
 
 
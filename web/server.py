@@ -123,10 +123,34 @@ PLAYERS_DIR = DATA_DIR / "players"
 PLAYERS_DIR.mkdir(parents=True, exist_ok=True)
 
 
+# Header/mainline-only PGN reader for game listings.
+from mysecond.mainline import iter_mainlines as _iter_mainlines
+
 # Opening-book cache for bot move lookup (same SQLite file as the CLI uses).
 from mysecond.cache import Cache as _OpeningCache
 _opening_cache = _OpeningCache(DATA_DIR / "cache.sqlite")
 
+# Memory-mapped featured-player books, keyed by JSON book path.  Reopened when
+# the binary file changes (e.g. after retraining).
+from mysecond.binbook import BinaryBook as _BinaryBook, ensure_binary_book as _ensure_binary_book
+_binary_books: dict[str, tuple[float, _BinaryBook]] = {}
+_binary_books_lock = threading.Lock()
+
+
+def _player_binary_book(book_path: str) -> _BinaryBook:
+    """Return the open binary book for a featured player's JSON book."""
+    with _binary_books_lock:
+        bin_path = _ensure_binary_book(Path(book_path))
+        mtime = bin_path.stat().st_mtime
+        hit = _binary_books.get(book_path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+        book = _BinaryBook(bin_path)
+        # The old mapping is left to the garbage collector: another request
+        # may still be reading from it.
+        _binary_books[book_path] = (mtime, book)
+        return book
+
 DIST_DIR = REPO_ROOT / "web" / "static" / "dist"
 
 # ---------------------------------------------------------------------------
@@ -937,6 +961,20 @@ def api_player_book(slug: str, color: str):
     return send_file(book_path, mimetype="application/json")
 
 
+@app.get("/api/players/<slug>/book/<color>/<path:position>")
+def api_player_book_position(slug: str, color: str, position: str):
+    """Return the player's book moves for one position (a URL-encoded FEN)."""
+    if color not in ("white", "black"):
+        return jsonify({"error": "color must be white or black"}), 400
+    player = featured_player_manager.get(slug)
+    if player is None or player["status"] != "ready":
+        return jsonify({"error": "player not found"}), 404
+    book_path = player.get(f"{color}_book_path")
+    if not book_path or not Path(book_path).exists():
+        return jsonify({"moves": []})
+    return jsonify({"moves": _player_binary_book(book_path).moves(position)})
+
+
 @app.get("/api/players/<slug>/repertoire/<color>")
 def api_player_repertoire(slug: str, color: str):
     """Convert a player's opening book into a navigable repertoire tree."""
@@ -949,9 +987,7 @@ def api_player_repertoire(slug: str, color: str):
     if not book_path or not Path(book_path).exists():
         return jsonify({"error": "book not found"}), 404
 
-    with open(book_path, encoding="utf-8") as f:
-        book = json.load(f)
-    positions = book.get("positions", {})
+    book = _player_binary_book(book_path)
 
     import chess as _chess
     from collections import deque as _deque
@@ -990,7 +1026,7 @@ def api_player_repertoire(slug: str, color: str):
 
         nfen           = _nfen(board)
         is_player_turn = board.turn == player_color
-        book_moves     = positions.get(nfen, [])
+        book_moves     = book.moves(nfen)
 
         if book_moves:
             # Use top-N moves from the book.
@@ -1007,7 +1043,7 @@ def api_player_repertoire(slug: str, color: str):
             for opp_move in board.legal_moves:
                 b2 = board.copy()
                 b2.push(opp_move)
-                sub = positions.get(_nfen(b2), [])
+                sub = book.moves(_nfen(b2))
                 if sub:
                     total = sum(s.get("games", 0) for s in sub)
                     candidates.append({"uci": opp_move.uci(), "games": total})
@@ -1357,11 +1393,9 @@ def api_pgn_games_list(job_id: str):
     buf = _io.StringIO(pgn_text)
 
     all_games = []
-    idx = 0
-    while True:
-        headers = chess.pgn.read_headers(buf)
-        if headers is None:
-            break
+    # Headers only: the movetext of each game is skipped, not parsed.
+    for idx, game in enumerate(_iter_mainlines(buf, max_plies=0)):
+        headers = game.headers
         white  = headers.get("White", "?")
         black  = headers.get("Black", "?")
         result = headers.get("Result", "*")
@@ -1399,7 +1433,6 @@ def api_pgn_games_list(job_id: str):
             "eco":           headers.get("ECO", ""),
             "opening":       headers.get("Opening", headers.get("Variant", "")),
         })
-        idx += 1
 
     # Apply filters.
     filtered = all_games
@@ -1706,6 +1739,7 @@ def api_import_pgn():
     username = request.form.get("username", "").strip()
     color = request.form.get("color", "white")
     max_plies = request.form.get("max_plies", "")
+    player = request.form.get("player", "").strip()
     pgn_file = request.files.get("pgn_file")
 
     if not username or not pgn_file or not pgn_file.filename:
@@ -1718,6 +1752,8 @@ def api_import_pgn():
     }
     if max_plies.isdigit():
         params["max_plies"] = int(max_plies)
+    if player:
+        params["player"] = player
 
     user = get_current_user()
     if err := _check_user_job_limit(user): return err
@@ -1906,6 +1942,7 @@ def api_admin_players_delete(slug: str):
         if p:
             try:
                 Path(p).unlink(missing_ok=True)
+                Path(p).with_suffix(".bin").unlink(missing_ok=True)
             except OSError:
                 pass
     featured_player_manager.delete(slug)